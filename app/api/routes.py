@@ -1,19 +1,32 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from uuid import UUID
 import uuid
 from datetime import datetime
 import os
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.responses import RedirectResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
-from app.core.rule_engine import RuleEngine
+from app.core.database import (
+    get_async_read_db,
+    get_db,
+    get_pool_metrics,
+    get_read_db,
+    get_write_db,
+)
+from app.core.result_cache import rule_result_cache
+from app.core.serialization import FastJSONResponse
 from app.models.rule import Rule
 from app.models.email import Email
 from app.schemas.rule import Rule as RuleSchema, RuleCreate, RuleUpdate
-from app.services.rule import RuleService
-from app.services.email import EmailService
+from app.services.rule import AsyncRuleService, RuleService
+from app.services.email import AsyncEmailService, EmailService
+from app.services.job_queue import JobQueue
+from app.services.processing import ProcessingService
+from app.services.retention import RETENTION_MODES, AsyncRetentionService
+from app.services.scheduler import SchedulerService
+from app.services.thread import ThreadService
 
 # Create API router
 api_router = APIRouter()
@@ -40,21 +53,46 @@ async def gmail_authorize():
     }
 
 
+@api_router.get("/metrics/db-pool", response_model=Dict[str, Any])
+def db_pool_metrics():
+    """
+    Get database connection pool metrics.
+
+    Returns:
+        Dict[str, Any]: Pool size, checked-out connections, overflow and
+        checkout wait times
+    """
+    return get_pool_metrics()
+
+
+@api_router.get("/metrics/rule-cache", response_model=Dict[str, Any])
+def rule_cache_metrics():
+    """
+    Get hit and miss metrics of the rule evaluation result cache.
+
+    Returns:
+        Dict[str, Any]: Cache size, hits, misses and hit rate
+    """
+    return rule_result_cache.metrics()
+
+
 @api_router.get("/rules", response_model=List[RuleSchema])
-def get_rules(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_rules(
+    skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)
+):
     """
     Get all rules.
     """
-    rules = RuleService.get_rules(db, skip=skip, limit=limit)
+    rules = await AsyncRuleService.get_rules(db, skip=skip, limit=limit)
     return rules
 
 
 @api_router.get("/rules/{rule_id}", response_model=RuleSchema)
-def get_rule(rule_id: UUID, db: Session = Depends(get_db)):
+async def get_rule(rule_id: UUID, db: AsyncSession = Depends(get_async_read_db)):
     """
     Get a rule by ID.
     """
-    rule = RuleService.get_rule(db, rule_id=rule_id)
+    rule = await AsyncRuleService.get_rule(db, rule_id=rule_id)
     if not rule:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Rule not found"
@@ -65,16 +103,19 @@ def get_rule(rule_id: UUID, db: Session = Depends(get_db)):
 @api_router.post(
     "/rules", response_model=RuleSchema, status_code=status.HTTP_201_CREATED
 )
-def create_rule(rule_in: RuleCreate, db: Session = Depends(get_db)):
+def create_rule(rule_in: RuleCreate, db: Session = Depends(get_write_db)):
     """
     Create a new rule.
     """
     rule = RuleService.create_rule(db, rule_in=rule_in)
+    JobQueue.enqueue(db, "reschedule_emails", deduplicate=True)
     return rule
 
 
 @api_router.put("/rules/{rule_id}", response_model=RuleSchema)
-def update_rule(rule_id: UUID, rule_in: RuleUpdate, db: Session = Depends(get_db)):
+def update_rule(
+    rule_id: UUID, rule_in: RuleUpdate, db: Session = Depends(get_write_db)
+):
     """
     Update a rule.
     """
@@ -83,11 +124,12 @@ def update_rule(rule_id: UUID, rule_in: RuleUpdate, db: Session = Depends(get_db
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Rule not found"
         )
+    JobQueue.enqueue(db, "reschedule_emails", deduplicate=True)
     return rule
 
 
 @api_router.delete("/rules/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_rule(rule_id: UUID, db: Session = Depends(get_db)):
+def delete_rule(rule_id: UUID, db: Session = Depends(get_write_db)):
     """
     Delete a rule.
     """
@@ -96,11 +138,14 @@ def delete_rule(rule_id: UUID, db: Session = Depends(get_db)):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Rule not found"
         )
+    JobQueue.enqueue(db, "reschedule_emails", deduplicate=True)
     return None
 
 
 @api_router.post("/process-email", response_model=List[Dict[str, Any]])
-def process_email(email: Dict[str, Any], db: Session = Depends(get_db)):
+async def process_email(
+    email: Dict[str, Any], db: AsyncSession = Depends(get_async_read_db)
+):
     """
     Process an email against all rules.
 
@@ -124,17 +169,17 @@ def process_email(email: Dict[str, Any], db: Session = Depends(get_db)):
             email["received_date"] = datetime.utcnow()
 
     # Get all rules
-    rules = RuleService.get_rules(db)
+    rules = await AsyncRuleService.get_rules(db)
 
     # Process email against rules
-    actions = RuleEngine.process_email(rules, email)
+    actions = rule_result_cache.process_emails(rules, [email])[0]
 
-    return actions
+    return FastJSONResponse(actions)
 
 
 @api_router.get("/gmail/messages", response_model=List[Dict[str, Any]])
 def get_gmail_messages(
-    max_results: int = 10, query: str = "in:inbox", db: Session = Depends(get_db)
+    max_results: int = 10, query: str = "in:inbox", db: Session = Depends(get_read_db)
 ):
     """
     Fetch messages from Gmail inbox using the Gmail API.
@@ -152,27 +197,24 @@ def get_gmail_messages(
     # Fetch messages from Gmail
     messages = GmailService.list_messages(max_results=max_results, query=query)
 
-    # Process messages against rules
+    # Process messages against rules, reusing cached results
+    rules = RuleService.get_rules(db)
     processed_messages = []
-    for message in messages:
-        # Get all rules
-        rules = RuleService.get_rules(db)
-
-        # Process email against rules
-        actions = RuleEngine.process_email(rules, message)
-
+    for message, actions in zip(
+        messages, rule_result_cache.process_emails(rules, messages)
+    ):
         # Add actions to the message
         message["actions"] = actions
         processed_messages.append(message)
 
-    return processed_messages
+    return FastJSONResponse(processed_messages)
 
 
 @api_router.get("/gmail/fetch", response_model=List[Dict[str, Any]])
 def fetch_gmail_messages(
     max_results: int = 10,
     query: str = "in:inbox",
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Fetch messages from Gmail using the API.
@@ -190,20 +232,58 @@ def fetch_gmail_messages(
     # Fetch messages from Gmail
     messages = GmailService.fetch_emails(max_results=max_results, query=query)
 
-    # Process messages against rules
+    # Process messages against rules, reusing cached results
+    rules = RuleService.get_rules(db)
     processed_messages = []
-    for message in messages:
-        # Get all rules
-        rules = RuleService.get_rules(db)
-
-        # Process email against rules
-        actions = RuleEngine.process_email(rules, message)
-
+    for message, actions in zip(
+        messages, rule_result_cache.process_emails(rules, messages)
+    ):
         # Add actions to the message
         message["actions"] = actions
         processed_messages.append(message)
 
-    return processed_messages
+    return FastJSONResponse(processed_messages)
+
+
+@api_router.post("/gmail/process", response_model=Dict[str, Any])
+def process_gmail_messages(
+    max_results: int = 10,
+    query: str = "in:inbox",
+    reprocess: bool = False,
+    by_thread: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Fetch messages from Gmail, evaluate rules and apply the resulting actions.
+
+    Actions for all fetched messages are grouped by the label changes they make
+    and applied with batched Gmail modifies. Every action is logged with an
+    idempotency key, so an action is never applied to the same email twice.
+
+    Args:
+        max_results: Maximum number of messages to process
+        query: Gmail search query
+        reprocess: Evaluate emails whose logged actions were all applied again
+        by_thread: Evaluate the latest fetched message of each thread and
+            apply its actions to the thread's other fetched messages
+        db: Database session
+
+    Returns:
+        Dict[str, Any]: Actions per message and the execution summary
+    """
+    from app.services.gmail_service import GmailService
+
+    # Fetch messages from Gmail, without bodies if no rule reads them
+    messages = GmailService.list_messages(
+        max_results=max_results,
+        query=query,
+        headers_only=not ProcessingService.rules_read_body(db),
+    )
+
+    result = ProcessingService.process_messages(
+        db, messages, reprocess=reprocess, by_thread=by_thread
+    )
+    return FastJSONResponse(result)
 
 
 @api_router.post("/gmail/sync", response_model=List[Dict[str, Any]])
@@ -226,71 +306,270 @@ def sync_gmail_messages(
     # Fetch messages from Gmail
     messages = GmailService.list_messages(max_results=max_results, query=query)
 
-    # Store messages in database
-    stored_messages = []
-    for message in messages:
-        email = EmailService.create_email(db, message)
+    # Store messages in database, scheduling their date conditions
+    emails = [EmailService.create_email(db, message) for message in messages]
+    SchedulerService.schedule(db, emails)
 
-        # Convert SQLAlchemy model to dict
-        email_dict = {
-            "id": str(email.id),
-            "gmail_id": email.gmail_id,
-            "thread_id": email.thread_id,
-            "from": email.from_address,
-            "to": email.to_address,
-            "subject": email.subject,
-            "body": email.body,
-            "snippet": email.snippet,
-            "received_date": email.received_date,
-            "label_ids": email.label_ids,
-            "created_at": email.created_at,
-            "updated_at": email.updated_at,
-        }
+    return FastJSONResponse([email.to_dict(body_key="body") for email in emails])
 
-        stored_messages.append(email_dict)
 
-    return stored_messages
+@api_router.post(
+    "/jobs/gmail-sync",
+    response_model=Dict[str, Any],
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def enqueue_gmail_sync(
+    max_results: int = 10,
+    query: str = "in:inbox",
+    store: bool = True,
+    reprocess: bool = False,
+    db: Session = Depends(get_write_db),
+):
+    """
+    Queue a Gmail sync to be run by a background worker.
+
+    The worker fetches the messages, stores them, evaluates rules and applies
+    the resulting actions. Poll ``/jobs/{job_id}`` for the outcome.
+
+    Args:
+        max_results: Maximum number of messages to fetch
+        query: Gmail search query
+        store: Store the fetched messages in the database
+        reprocess: Evaluate emails whose logged actions were all applied again
+        db: Database session
+
+    Returns:
+        Dict[str, Any]: The queued job
+    """
+    job = JobQueue.enqueue(
+        db,
+        "gmail_sync",
+        {
+            "max_results": max_results,
+            "query": query,
+            "store": store,
+            "reprocess": reprocess,
+        },
+    )
+    return FastJSONResponse(job.to_dict(), status_code=status.HTTP_202_ACCEPTED)
+
+
+@api_router.post(
+    "/jobs/apply-rules",
+    response_model=Dict[str, Any],
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def enqueue_apply_rules(
+    batch_size: int = 10000,
+    reprocess: bool = False,
+    execute: bool = True,
+    by_thread: bool = False,
+    db: Session = Depends(get_write_db),
+):
+    """
+    Queue a retroactive run of the rules over all stored emails.
+
+    The worker evaluates the emails in a process pool, so the run scales with
+    the cores of the worker machine. Poll ``/jobs/{job_id}`` for the outcome.
+
+    Args:
+        batch_size: Emails read from the database per batch
+        reprocess: Evaluate emails whose logged actions were all applied again
+        execute: Apply the resulting actions in Gmail; otherwise they are only
+            logged
+        by_thread: Evaluate the latest email of each thread and apply its
+            actions to the whole thread
+        db: Database session
+
+    Returns:
+        Dict[str, Any]: The queued job
+    """
+    job = JobQueue.enqueue(
+        db,
+        "apply_rules",
+        {
+            "batch_size": batch_size,
+            "reprocess": reprocess,
+            "execute": execute,
+            "by_thread": by_thread,
+        },
+    )
+    return FastJSONResponse(job.to_dict(), status_code=status.HTTP_202_ACCEPTED)
+
+
+@api_router.post(
+    "/jobs/reevaluate",
+    response_model=Dict[str, Any],
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def enqueue_reevaluation(
+    execute: bool = True,
+    db: Session = Depends(get_write_db),
+):
+    """
+    Queue a re-evaluation of the stored emails whose date conditions flipped.
+
+    Workers also run due re-evaluations on their own every
+    SCHEDULER_INTERVAL seconds.
+
+    Args:
+        execute: Apply the resulting actions in Gmail; otherwise they are only
+            logged
+        db: Database session
+
+    Returns:
+        Dict[str, Any]: The queued job
+    """
+    job = JobQueue.enqueue(db, "reevaluate_due", {"execute": execute})
+    return FastJSONResponse(job.to_dict(), status_code=status.HTTP_202_ACCEPTED)
+
+
+@api_router.post(
+    "/jobs/archive-bodies",
+    response_model=Dict[str, Any],
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def enqueue_body_archival(
+    older_than_days: Optional[int] = None,
+    mode: Optional[str] = None,
+    db: Session = Depends(get_write_db),
+):
+    """
+    Queue the archival of the bodies of old stored emails.
+
+    Workers also run it on their own every EMAIL_BODY_RETENTION_INTERVAL
+    seconds when EMAIL_BODY_RETENTION_DAYS is set.
+
+    Args:
+        older_than_days: Age in days past which bodies are removed; defaults
+            to EMAIL_BODY_RETENTION_DAYS
+        mode: ``archive`` to move bodies to the compressed archive, or
+            ``drop`` to keep only their hash; defaults to
+            EMAIL_BODY_RETENTION_MODE
+        db: Database session
+
+    Returns:
+        Dict[str, Any]: The queued job
+    """
+    if mode is not None and mode not in RETENTION_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid retention mode: {mode}",
+        )
+
+    payload = {"older_than_days": older_than_days, "mode": mode}
+    job = JobQueue.enqueue(
+        db,
+        "archive_bodies",
+        {key: value for key, value in payload.items() if value is not None},
+    )
+    return FastJSONResponse(job.to_dict(), status_code=status.HTTP_202_ACCEPTED)
+
+
+@api_router.get("/jobs/{job_id}", response_model=Dict[str, Any])
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    """
+    Get the status of a background job.
+
+    Jobs are read from the primary, since a replica may not have seen a job
+    that was just queued or updated.
+
+    Args:
+        job_id: Job ID
+        db: Database session
+
+    Returns:
+        Dict[str, Any]: Job data
+    """
+    job = JobQueue.get_job(db, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with ID {job_id} not found",
+        )
+
+    return FastJSONResponse(job.to_dict())
 
 
 @api_router.get("/emails", response_model=List[Dict[str, Any]])
-def get_emails(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_emails(
+    skip: int = 0,
+    limit: int = 100,
+    sender: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    label: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
     """
     Get all emails from the database.
 
     Args:
         skip: Number of records to skip
         limit: Maximum number of records to return
+        sender: Only return emails from this address, or from any address of
+            a domain given as ``@domain``
+        since: Only return emails received at or after this time
+        until: Only return emails received before this time
+        label: Only return emails with this Gmail label ID
         db: Database session
 
     Returns:
         List[Dict[str, Any]]: List of emails
     """
-    emails = EmailService.get_emails(db, skip=skip, limit=limit)
-
-    # Convert SQLAlchemy models to dicts
-    email_dicts = []
-    for email in emails:
-        email_dict = {
-            "id": str(email.id),
-            "gmail_id": email.gmail_id,
-            "thread_id": email.thread_id,
-            "from": email.from_address,
-            "to": email.to_address,
-            "subject": email.subject,
-            "body": email.body,
-            "snippet": email.snippet,
-            "received_date": email.received_date,
-            "label_ids": email.label_ids,
-            "created_at": email.created_at,
-            "updated_at": email.updated_at,
-        }
-        email_dicts.append(email_dict)
-
-    return email_dicts
+    emails = await AsyncEmailService.get_emails(
+        db,
+        skip=skip,
+        limit=limit,
+        sender=sender,
+        since=since,
+        until=until,
+        label=label,
+    )
+
+    return FastJSONResponse([email.to_dict(body_key="body") for email in emails])
+
+
+@api_router.get("/threads", response_model=List[Dict[str, Any]])
+def get_threads(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
+    """
+    Get threads of stored emails, most recently active first.
+
+    Args:
+        skip: Number of threads to skip
+        limit: Maximum number of threads to return
+        db: Database session
+
+    Returns:
+        List[Dict[str, Any]]: Per thread, its message count and latest message
+    """
+    return FastJSONResponse(ThreadService.get_threads(db, skip=skip, limit=limit))
+
+
+@api_router.get("/threads/{thread_id}", response_model=List[Dict[str, Any]])
+def get_thread(thread_id: str, db: Session = Depends(get_read_db)):
+    """
+    Get the emails of a thread, oldest first.
+
+    Args:
+        thread_id: Gmail thread ID
+        db: Database session
+
+    Returns:
+        List[Dict[str, Any]]: The thread's emails
+    """
+    emails = ThreadService.get_thread(db, thread_id)
+    if not emails:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Thread with ID {thread_id} not found",
+        )
+
+    return FastJSONResponse([email.to_dict(body_key="body") for email in emails])
 
 
 @api_router.get("/emails/{email_id}", response_model=Dict[str, Any])
-def get_email(email_id: str, db: Session = Depends(get_db)):
+async def get_email(email_id: str, db: AsyncSession = Depends(get_async_read_db)):
     """
     Get an email by ID.
 
@@ -301,30 +580,17 @@ def get_email(email_id: str, db: Session = Depends(get_db)):
     Returns:
         Dict[str, Any]: Email data
     """
-    email = EmailService.get_email_by_id(db, email_id)
+    email = await AsyncEmailService.get_email_by_id(db, email_id)
     if not email:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Email with ID {email_id} not found",
         )
 
-    # Convert SQLAlchemy model to dict
-    email_dict = {
-        "id": str(email.id),
-        "gmail_id": email.gmail_id,
-        "thread_id": email.thread_id,
-        "from": email.from_address,
-        "to": email.to_address,
-        "subject": email.subject,
-        "body": email.body,
-        "snippet": email.snippet,
-        "received_date": email.received_date,
-        "label_ids": email.label_ids,
-        "created_at": email.created_at,
-        "updated_at": email.updated_at,
-    }
-
-    return email_dict
+    data = email.to_dict(body_key="body")
+    if email.body is None and email.body_archived_at is not None:
+        data["body"] = await AsyncRetentionService.get_archived_body(db, email.id)
+    return FastJSONResponse(data)
 
 
 # Add new test email endpoints
@@ -373,17 +639,20 @@ def test_create_email(
 
     # Process the email against rules
     rules = RuleService.get_rules(db)
-    actions = RuleEngine.process_email(rules, email_data)
+    SchedulerService.schedule(db, [email], rules)
+    actions = rule_result_cache.process_emails(rules, [email_data])[0]
 
     # Add actions to the response
     result = email.to_dict()
     result["actions"] = actions
 
-    return result
+    return FastJSONResponse(result, status_code=status.HTTP_201_CREATED)
 
 
 @api_router.post("/test/process-email", response_model=Dict[str, Any])
-def test_process_email(email: Dict[str, Any], db: Session = Depends(get_db)):
+async def test_process_email(
+    email: Dict[str, Any], db: AsyncSession = Depends(get_async_read_db)
+):
     """
     Test processing an email against rules without storing it.
 
@@ -411,12 +680,12 @@ def test_process_email(email: Dict[str, Any], db: Session = Depends(get_db)):
         email["received_date"] = datetime.now()
 
     # Get all rules
-    rules = RuleService.get_rules(db)
+    rules = await AsyncRuleService.get_rules(db)
 
     # Process email against rules
-    actions = RuleEngine.process_email(rules, email)
+    actions = rule_result_cache.process_emails(rules, [email])[0]
 
     # Add actions to the email
     email["actions"] = actions
 
-    return email
+    return FastJSONResponse(email)
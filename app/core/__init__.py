@@ -1,5 +1,5 @@
 from app.core.config import settings
-from app.core.database import Base, get_db
+from app.core.database import Base, get_db, get_async_db
 from app.core.rule_engine import RuleEngine
 
-__all__ = ["settings", "Base", "get_db", "RuleEngine"]
+__all__ = ["settings", "Base", "get_db", "get_async_db", "RuleEngine"]
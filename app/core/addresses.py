@@ -0,0 +1,52 @@
+"""
+Parsing of sender addresses.
+
+The ``From`` header is stored as received, e.g. ``"Name" <user@example.com>``.
+Rules and lookups on the sender compare the bare address and its domain, which
+are parsed once, lower-cased, when an email is ingested.
+"""
+
+from email.utils import parseaddr
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple
+
+
+class Sender(NamedTuple):
+    address: str  # Lower-case address, e.g. user@example.com
+    domain: str  # Lower-case domain, e.g. example.com
+
+
+@lru_cache(maxsize=4096)
+def parse_sender(from_header: str) -> Sender:
+    """
+    Parse a ``From`` header into its lower-case address and domain.
+
+    Args:
+        from_header: The raw header value
+
+    Returns:
+        Sender: The address and domain; empty strings if there is no address
+    """
+    address = parseaddr(from_header or "")[1].strip().lower()
+    if "@" not in address:
+        return Sender(address, "")
+    return Sender(address, address.rpartition("@")[2])
+
+
+def email_sender(email: Dict[str, Any]) -> Sender:
+    """
+    Get the parsed sender of an email dict.
+
+    Uses the ``from_email`` and ``from_domain`` keys when the email has them,
+    e.g. when it was loaded from the database, and parses the ``from`` header
+    otherwise.
+
+    Args:
+        email: Email data
+
+    Returns:
+        Sender: The sender's address and domain
+    """
+    if email.get("from_email"):
+        return Sender(email["from_email"], email.get("from_domain") or "")
+    return parse_sender(email.get("from") or "")
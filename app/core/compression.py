@@ -0,0 +1,98 @@
+"""
+Compression of stored records.
+
+``zstandard`` is used when it is installed; otherwise the standard library's
+``zlib`` is used as a fallback. Every record starts with a byte naming its
+codec, so records written with either codec can be read back as long as the
+codec is available. :class:`CompressedText` stores text columns this way.
+"""
+
+import zlib
+from typing import Any, Optional
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+from app.core.config import settings
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - exercised only without zstandard
+    zstandard = None
+
+# One-byte prefixes identifying the codec of a record
+PLAIN_CODEC = b"n"
+ZLIB_CODEC = b"z"
+ZSTD_CODEC = b"s"
+
+
+def compress(data: bytes) -> bytes:
+    """
+    Compress a record, tagging it with the codec used.
+
+    Args:
+        data: Serialized record
+
+    Returns:
+        bytes: The codec prefix followed by the compressed record
+    """
+    if zstandard is not None:
+        return ZSTD_CODEC + zstandard.ZstdCompressor(level=3).compress(data)
+    return ZLIB_CODEC + zlib.compress(data, 6)
+
+
+def decompress(data: bytes) -> bytes:
+    """
+    Decompress a record written by :func:`compress`.
+
+    Args:
+        data: Stored record
+
+    Returns:
+        bytes: The serialized record
+
+    Raises:
+        ValueError: If the record was compressed with a codec that is not
+            available
+    """
+    codec, body = data[:1], data[1:]
+    if codec == PLAIN_CODEC:
+        return body
+    if codec == ZLIB_CODEC:
+        return zlib.decompress(body)
+    if codec == ZSTD_CODEC and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(body)
+    raise ValueError(f"Unsupported record codec: {codec!r}")
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text stored compressed in a binary column.
+
+    Values are compressed when written and decompressed when read, so the
+    attribute holds plain text. While EMAIL_BODY_COMPRESSION is off, and for
+    values shorter than EMAIL_BODY_COMPRESSION_MIN_BYTES, values are stored
+    uncompressed behind the plain codec byte, so every value can be read back
+    whichever mode wrote it.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[str], dialect: Any) -> Optional[bytes]:
+        if value is None:
+            return None
+        data = value.encode("utf-8")
+        if (
+            settings.EMAIL_BODY_COMPRESSION
+            and len(data) >= settings.EMAIL_BODY_COMPRESSION_MIN_BYTES
+        ):
+            return compress(data)
+        return PLAIN_CODEC + data
+
+    def process_result_value(
+        self, value: Optional[bytes], dialect: Any
+    ) -> Optional[str]:
+        if value is None:
+            return None
+        return decompress(bytes(value)).decode("utf-8")
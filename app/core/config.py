@@ -17,6 +17,25 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: Optional[PostgresDsn] = None
 
+    # Read replica used by read-only endpoints; defaults to the primary
+    DATABASE_REPLICA_URL: Optional[PostgresDsn] = None
+    # Seconds reads stay on the primary after a write (read-your-writes)
+    DB_REPLICA_STICKY_SECONDS: int = 10
+
+    # Database connection pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    # Compiled statements cached per engine
+    DB_QUERY_CACHE_SIZE: int = 500
+    # Server-side prepared statements cached per asyncpg connection
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500
+
+    # Which matching rule wins when actions conflict: "first" or "last"
+    ACTION_PRECEDENCE: str = "first"
+
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     DEBUG: bool = os.getenv("DEBUG", "True").lower() == "true"
@@ -32,6 +51,66 @@ class Settings(BaseSettings):
     GMAIL_SERVICE_ACCOUNT_PATH: str = os.getenv(
         "GMAIL_SERVICE_ACCOUNT_PATH", "service-account.json"
     )
+    # Message IDs per users.messages.batchModify request (Gmail allows 1,000)
+    GMAIL_BATCH_MODIFY_SIZE: int = 1000
+    # Seconds a mailbox's label name-to-ID listing is cached
+    GMAIL_LABEL_CACHE_TTL: int = 300
+    # Create missing labels used as move_message targets
+    GMAIL_AUTO_CREATE_LABELS: bool = False
+    # Characters of a message body kept for rule matching; 0 keeps everything
+    GMAIL_BODY_MAX_CHARS: int = 100000
+    # Message format fetched from Gmail: "full" for the parsed payload tree or
+    # "raw" for the RFC 822 source, which is smaller and parsed locally
+    GMAIL_FETCH_FORMAT: str = "full"
+    # On-disk cache of fetched messages; an empty path disables it
+    GMAIL_MESSAGE_CACHE_PATH: str = ".cache/gmail-messages.sqlite3"
+    # Compressed bytes the message cache keeps before evicting old messages
+    GMAIL_MESSAGE_CACHE_SIZE: int = 256 * 1024 * 1024
+
+    # Seconds the evaluation time of date conditions is truncated to
+    RULE_DATE_BUCKET: int = 60
+    # Cached rule evaluation results
+    RULE_CACHE_SIZE: int = 10000  # 0 disables the cache
+
+    # Process pool used to evaluate rules over large batches of emails
+    EVALUATION_PROCESSES: int = 0  # 0 uses one process per CPU
+    EVALUATION_CHUNK_SIZE: int = 1000  # Emails per shard sent to a process
+    # Batches smaller than this are evaluated in the calling process
+    EVALUATION_PARALLEL_THRESHOLD: int = 5000
+    # Send batches to the processes through shared memory instead of pickling
+    EVALUATION_SHARED_MEMORY: bool = True
+
+    # Background job queue
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF: int = 30  # Seconds before the first retry, then doubled
+    JOB_TIMEOUT: int = 900  # Seconds before a running job is considered lost
+    # Seconds between checks for lost jobs in each worker; 0 disables
+    JOB_REQUEUE_INTERVAL: int = 60
+    WORKER_PROCESSES: int = 1
+    WORKER_POLL_INTERVAL: float = 2.0  # Seconds between polls of an empty queue
+    # Seconds between runs of due re-evaluations in each worker; 0 disables
+    SCHEDULER_INTERVAL: int = 60
+    SCHEDULER_BATCH_SIZE: int = 1000  # Emails re-evaluated per transaction
+
+    # Monthly partitions of the emails table
+    EMAIL_PARTITION_MONTHS_AHEAD: int = 3  # Future months kept partitioned
+    # Seconds between partition maintenance runs in each worker; 0 disables
+    EMAIL_PARTITION_INTERVAL: int = 3600
+    # Months of email kept before whole partitions are dropped; 0 keeps all
+    EMAIL_PARTITION_RETENTION_MONTHS: int = 0
+
+    # Store email bodies compressed; bodies stored either way stay readable
+    EMAIL_BODY_COMPRESSION: bool = True
+    # Bodies shorter than this are stored as is, since they barely compress
+    EMAIL_BODY_COMPRESSION_MIN_BYTES: int = 256
+
+    # Retention of email bodies
+    EMAIL_BODY_RETENTION_DAYS: int = 0  # Age bodies are kept for; 0 keeps all
+    # "archive" moves old bodies to a compressed table; "drop" keeps a hash only
+    EMAIL_BODY_RETENTION_MODE: str = "archive"
+    EMAIL_BODY_RETENTION_BATCH_SIZE: int = 1000  # Emails per transaction
+    # Seconds between body retention runs in each worker; 0 disables
+    EMAIL_BODY_RETENTION_INTERVAL: int = 3600
 
     @field_validator("DATABASE_URL", mode="before")
     def assemble_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
@@ -1,15 +1,177 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Any, Dict
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.core.config import settings
 
+
+class PoolMetricsMixin:
+    """
+    Pool mixin that records how long callers wait for a connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._metrics_lock:
+                self._timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._metrics_lock:
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of the pool usage.
+
+        Returns:
+            Dict[str, Any]: Pool occupancy and checkout wait statistics
+        """
+        with self._metrics_lock:
+            checkouts = self._checkouts
+            timeouts = self._timeouts
+            wait_total = self._wait_total
+            wait_max = self._wait_max
+
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "max_overflow": self._max_overflow,
+            "timeout": self.timeout(),
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_time_total": wait_total,
+            "wait_time_avg": wait_total / checkouts if checkouts else 0.0,
+            "wait_time_max": wait_max,
+        }
+
+
+class InstrumentedQueuePool(PoolMetricsMixin, QueuePool):
+    """
+    QueuePool with checkout metrics, used by the sync engine.
+    """
+
+
+class InstrumentedAsyncQueuePool(PoolMetricsMixin, AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool with checkout metrics, used by the async engine.
+    """
+
+
+def engine_options() -> Dict[str, Any]:
+    """
+    Get the engine pool and statement cache options configured in settings.
+
+    Returns:
+        Dict[str, Any]: Keyword arguments for ``create_engine``
+    """
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
+    }
+
+
+def async_database_url(url: str) -> str:
+    """
+    Convert a PostgreSQL URL to use the asyncpg driver.
+
+    asyncpg runs statements as server-side prepared statements; the size of its
+    per-connection statement cache comes from settings.
+
+    Args:
+        url: The database URL
+
+    Returns:
+        str: The database URL with the ``postgresql+asyncpg`` driver
+    """
+    return (
+        make_url(url)
+        .set(drivername="postgresql+asyncpg")
+        .update_query_dict(
+            {
+                "prepared_statement_cache_size": str(
+                    settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+                )
+            }
+        )
+        .render_as_string(hide_password=False)
+    )
+
+
 # Create SQLAlchemy engine
-engine = create_engine(str(settings.DATABASE_URL))
+engine = create_engine(
+    str(settings.DATABASE_URL), poolclass=InstrumentedQueuePool, **engine_options()
+)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create async SQLAlchemy engine for the API routes
+async_engine = create_async_engine(
+    async_database_url(str(settings.DATABASE_URL)),
+    poolclass=InstrumentedAsyncQueuePool,
+    **engine_options(),
+)
+
+# Create AsyncSessionLocal class
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Create replica engines for read-only endpoints, falling back to the primary
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = create_engine(
+        str(settings.DATABASE_REPLICA_URL),
+        poolclass=InstrumentedQueuePool,
+        **engine_options(),
+    )
+    async_replica_engine = create_async_engine(
+        async_database_url(str(settings.DATABASE_REPLICA_URL)),
+        poolclass=InstrumentedAsyncQueuePool,
+        **engine_options(),
+    )
+else:
+    replica_engine = engine
+    async_replica_engine = async_engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=async_replica_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+# Cookie carrying the time until which a client's reads go to the primary
+PRIMARY_STICKY_COOKIE = "db_primary_until"
+
 # Create Base class
 Base = declarative_base()
 
@@ -21,3 +183,87 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency to get async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def stick_to_primary(response: Response) -> None:
+    """
+    Route the client's reads to the primary for a short window after a write.
+
+    Args:
+        response: The response of the write request
+    """
+    sticky_until = time.time() + settings.DB_REPLICA_STICKY_SECONDS
+    response.set_cookie(
+        PRIMARY_STICKY_COOKIE,
+        f"{sticky_until:.3f}",
+        max_age=settings.DB_REPLICA_STICKY_SECONDS,
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def use_primary_for_reads(request: Request) -> bool:
+    """
+    Check whether a read request must be served by the primary.
+
+    Args:
+        request: The incoming request
+
+    Returns:
+        bool: True if the client wrote recently, False otherwise
+    """
+    try:
+        sticky_until = float(request.cookies.get(PRIMARY_STICKY_COOKIE, 0))
+    except ValueError:
+        return False
+    return time.time() < sticky_until
+
+
+# Dependency to get a primary DB session for writes
+def get_write_db(response: Response, db: Session = Depends(get_db)) -> Session:
+    stick_to_primary(response)
+    return db
+
+
+# Dependency to get a DB session for read-only endpoints
+def get_read_db(request: Request):
+    session_factory = (
+        SessionLocal if use_primary_for_reads(request) else ReadSessionLocal
+    )
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Dependency to get an async DB session for read-only endpoints
+async def get_async_read_db(request: Request):
+    session_factory = (
+        AsyncSessionLocal if use_primary_for_reads(request) else AsyncReadSessionLocal
+    )
+    async with session_factory() as db:
+        yield db
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """
+    Get connection pool metrics for the primary and replica engines.
+
+    Returns:
+        Dict[str, Any]: Pool metrics keyed by engine
+    """
+    metrics = {
+        "sync": engine.pool.metrics(),
+        "async": async_engine.sync_engine.pool.metrics(),
+    }
+    if replica_engine is not engine:
+        metrics["replica_sync"] = replica_engine.pool.metrics()
+        metrics["replica_async"] = async_replica_engine.sync_engine.pool.metrics()
+    return metrics
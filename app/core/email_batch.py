@@ -0,0 +1,347 @@
+"""
+Compact columnar email batches in shared memory.
+
+An :class:`EmailBatch` encodes the fields read by the rule engine into a single
+``multiprocessing.shared_memory`` block: for each text field a state byte per
+email, int64 byte and character offsets and one UTF-8 buffer, plus an int64
+array of
+``received_date`` in microseconds since the epoch. Worker processes attach to
+the block by name with :class:`EmailBatchView` instead of unpickling every
+string, and only the fields the rules reference are encoded at all.
+
+Layout of the block, with every section aligned to 8 bytes::
+
+    for each text field:  states[count] | offsets[count + 1] | chars[count + 1]
+                          | utf-8 data
+    received_date[count]
+"""
+
+from array import array
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Text fields read by the rule engine
+TEXT_FIELDS = ("from", "subject", "message", "label_ids")
+
+# Fields holding lists of strings, stored as text joined by LIST_SEPARATOR
+LIST_FIELDS = ("label_ids",)
+LIST_SEPARATOR = "\x1f"
+
+# All fields a batch can hold
+BATCH_FIELDS = TEXT_FIELDS + ("received_date",)
+
+# Per-email state of a text field
+_VALUE = 0
+_NONE = 1
+_ABSENT = 2
+
+# Placeholder for fields an email does not have
+_ABSENT_FIELD = object()
+
+# received_date value of emails without a date
+_NO_DATE = -(2**63)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class TextColumn(NamedTuple):
+    field: str
+    states: int  # Offset of the state bytes
+    offsets: int  # Offset of the int64 byte offsets into the data
+    chars: int  # Offset of the int64 character offsets into the text
+    data: int  # Offset of the UTF-8 data
+    length: int  # Length of the UTF-8 data
+
+
+class EmailBatchLayout(NamedTuple):
+    """
+    Picklable description of a batch, sent to the processes reading it.
+    """
+
+    name: str  # Name of the shared memory block
+    count: int
+    text: Tuple[TextColumn, ...]
+    dates: Optional[int]  # Offset of the int64 received_date values, if stored
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def encode_date(value: Optional[datetime]) -> int:
+    """
+    Encode a datetime as microseconds since the epoch.
+
+    Timezone-aware values are converted to naive UTC, matching the naive UTC
+    datetimes stored in the database.
+
+    Args:
+        value: The datetime to encode, or None
+
+    Returns:
+        int: Microseconds since the epoch, or a sentinel for None
+    """
+    if value is None:
+        return _NO_DATE
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def decode_date(value: int) -> Optional[datetime]:
+    """
+    Decode a datetime encoded with :func:`encode_date`.
+
+    Args:
+        value: Microseconds since the epoch
+
+    Returns:
+        Optional[datetime]: The naive UTC datetime, or None for the sentinel
+    """
+    if value == _NO_DATE:
+        return None
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def _text(value: Any) -> str:
+    if value is None or value is _ABSENT_FIELD:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+class EmailBatch:
+    """
+    Owner of an email batch encoded in shared memory.
+
+    The creating process must call :meth:`close` (or use the batch as a
+    context manager) once every reader is done, which frees the block.
+    """
+
+    def __init__(
+        self, emails: Sequence[Dict[str, Any]], fields: Iterable[str] = BATCH_FIELDS
+    ):
+        """
+        Args:
+            emails: Email data as read by the rule engine
+            fields: Fields to store; others are left out of the batch
+        """
+        fields = set(fields)
+        count = len(emails)
+
+        columns = []
+        for field in TEXT_FIELDS:
+            if field not in fields:
+                continue
+            values = [email.get(field, _ABSENT_FIELD) for email in emails]
+            if field in LIST_FIELDS:
+                values = [
+                    (
+                        LIST_SEPARATOR.join(value)
+                        if isinstance(value, (list, tuple))
+                        else value
+                    )
+                    for value in values
+                ]
+
+            states = bytearray(count)
+            for index in [
+                i for i, value in enumerate(values) if type(value) is not str
+            ]:
+                value = values[index]
+                if value is _ABSENT_FIELD:
+                    states[index] = _ABSENT
+                elif value is None:
+                    states[index] = _NONE
+                values[index] = _text(value)
+
+            chars = array("q", [0])
+            chars.extend(accumulate(map(len, values)))
+            data = "".join(values).encode("utf-8")
+            if len(data) == chars[-1]:
+                # ASCII only: byte offsets are character offsets
+                offsets = chars
+            else:
+                offsets = array("q", [0])
+                offsets.extend(
+                    accumulate(len(value.encode("utf-8")) for value in values)
+                )
+            columns.append((field, bytes(states), offsets, chars, data))
+
+        dates = None
+        if "received_date" in fields:
+            dates = array(
+                "q",
+                [
+                    (
+                        (value - _EPOCH) // _MICROSECOND
+                        if type(value) is datetime and value.tzinfo is None
+                        else encode_date(value)
+                    )
+                    for value in (email.get("received_date") for email in emails)
+                ],
+            )
+
+        offset = 0
+        text = []
+        for field, states, offsets, chars, data in columns:
+            states_at = offset
+            offsets_at = _align(states_at + len(states))
+            chars_at = offsets_at + 8 * len(offsets)
+            data_at = chars_at + 8 * len(chars)
+            offset = _align(data_at + len(data))
+            text.append(
+                TextColumn(field, states_at, offsets_at, chars_at, data_at, len(data))
+            )
+        dates_at = offset if dates is not None else None
+        size = offset + (8 * count if dates is not None else 0)
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        buf = self._shm.buf
+        for (_, states, offsets, chars, data), column in zip(columns, text):
+            buf[column.states : column.states + count] = states
+            buf[column.offsets : column.chars] = offsets.tobytes()
+            buf[column.chars : column.data] = chars.tobytes()
+            buf[column.data : column.data + column.length] = data
+        if dates is not None:
+            buf[dates_at:size] = dates.tobytes()
+
+        self.layout = EmailBatchLayout(self._shm.name, count, tuple(text), dates_at)
+
+    def __len__(self) -> int:
+        return self.layout.count
+
+    def close(self) -> None:
+        """
+        Free the shared memory block.
+        """
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self) -> "EmailBatch":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class EmailBatchView(Sequence):
+    """
+    Read-only view of an :class:`EmailBatch`, in this or another process.
+
+    Emails are decoded into plain dicts holding the stored fields, so the rule
+    engine evaluates them exactly like the original email dicts.
+    """
+
+    def __init__(self, layout: EmailBatchLayout):
+        """
+        Args:
+            layout: Layout of the batch to attach to
+        """
+        self.layout = layout
+        self._shm = shared_memory.SharedMemory(name=layout.name)
+        buf = self._shm.buf
+        count = layout.count
+
+        self._views: List[memoryview] = []
+        self._columns = []
+        for column in layout.text:
+            states = buf[column.states : column.states + count]
+            offsets_bytes = buf[column.offsets : column.chars]
+            offsets = offsets_bytes.cast("q")
+            chars_bytes = buf[column.chars : column.data]
+            chars = chars_bytes.cast("q")
+            data = buf[column.data : column.data + column.length]
+            self._views.extend(
+                (states, offsets_bytes, offsets, chars_bytes, chars, data)
+            )
+            self._columns.append((column.field, states, offsets, chars, data))
+
+        self._dates = None
+        if layout.dates is not None:
+            dates_bytes = buf[layout.dates : layout.dates + 8 * count]
+            self._dates = dates_bytes.cast("q")
+            self._views.extend((dates_bytes, self._dates))
+
+    def __len__(self) -> int:
+        return self.layout.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self.emails(start, stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.emails(index, index + 1)[0]
+
+    def emails(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        """
+        Decode a range of emails.
+
+        Each column's text for the range is decoded with a single call and
+        then sliced by character offsets.
+
+        Args:
+            start: Index of the first email
+            stop: Index after the last email
+
+        Returns:
+            List[Dict[str, Any]]: The emails, with the fields stored in the batch
+        """
+        emails: List[Dict[str, Any]] = [{} for _ in range(start, stop)]
+
+        for field, states, offsets, chars, data in self._columns:
+            text = str(data[offsets[start] : offsets[stop]], "utf-8")
+            base = chars[start]
+            bounds = [position - base for position in chars[start : stop + 1]]
+            values = [text[a:b] for a, b in zip(bounds, bounds[1:])]
+            if field in LIST_FIELDS:
+                values = [
+                    value.split(LIST_SEPARATOR) if value else [] for value in values
+                ]
+
+            field_states = bytes(states[start:stop])
+            if field_states.count(_VALUE) == len(field_states):
+                for email, value in zip(emails, values):
+                    email[field] = value
+                continue
+            for email, state, value in zip(emails, field_states, values):
+                if state == _VALUE:
+                    email[field] = value
+                elif state == _NONE:
+                    email[field] = None
+
+        if self._dates is not None:
+            for email, value in zip(emails, self._dates[start:stop]):
+                if value != _NO_DATE:
+                    email["received_date"] = _EPOCH + timedelta(microseconds=value)
+
+        return emails
+
+    def close(self) -> None:
+        """
+        Detach from the shared memory block.
+        """
+        if self._shm is not None:
+            for view in reversed(self._views):
+                view.release()
+            self._views = []
+            self._columns = []
+            self._dates = None
+            self._shm.close()
+            self._shm = None
+
+    def __enter__(self) -> "EmailBatchView":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,184 @@
+"""
+Multi-process rule evaluation for large batches of emails.
+
+Rule evaluation is pure Python and CPU-bound, so a single process only uses
+one core. :class:`EvaluationPool` ships the compiled rule set to each worker
+process once, when the process starts, then shards email batches across the
+processes and merges the results back in input order.
+
+Batches are placed in shared memory as an :class:`EmailBatch`, so each shard
+is sent as a layout and an index range rather than as pickled email dicts.
+Either way, only the fields referenced by a condition are sent.
+"""
+
+import multiprocessing
+import os
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.core.config import settings
+from app.core.email_batch import (
+    BATCH_FIELDS,
+    EmailBatch,
+    EmailBatchLayout,
+    EmailBatchView,
+)
+from app.core.rule_engine import FIELD_KEYS, CompiledRule, RuleEngine
+
+# Rules installed in a worker process by _init_worker
+_worker_rules: List[CompiledRule] = []
+
+
+def _init_worker(rules: List[CompiledRule]) -> None:
+    global _worker_rules
+    _worker_rules = rules
+
+
+def _evaluate_shard(
+    emails: List[Dict[str, Any]], as_of: datetime
+) -> List[List[Dict[str, Any]]]:
+    return [RuleEngine.process_email(_worker_rules, email, as_of) for email in emails]
+
+
+def _evaluate_range(
+    layout: EmailBatchLayout, start: int, stop: int, as_of: datetime
+) -> List[List[Dict[str, Any]]]:
+    with EmailBatchView(layout) as view:
+        emails = view.emails(start, stop)
+    return [RuleEngine.process_email(_worker_rules, email, as_of) for email in emails]
+
+
+class EvaluationPool:
+    """
+    Evaluate rules over batches of emails in a pool of processes.
+
+    Use it as a context manager, or call :meth:`close` when done, so the
+    worker processes are shut down.
+    """
+
+    def __init__(
+        self,
+        rules: Sequence[Any],
+        processes: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        parallel_threshold: Optional[int] = None,
+        shared_memory: Optional[bool] = None,
+    ):
+        """
+        Args:
+            rules: Rules in evaluation order, as models or compiled rules
+            processes: Number of worker processes; 0 or None uses the
+                configured EVALUATION_PROCESSES, which defaults to one per CPU
+            chunk_size: Emails per shard sent to a worker process
+            parallel_threshold: Batches smaller than this are evaluated in
+                the calling process
+            shared_memory: Send batches through shared memory instead of
+                pickling them; defaults to EVALUATION_SHARED_MEMORY
+        """
+        self.rules = RuleEngine.compile_rules(rules)
+        # Email fields read by a condition; nothing else is sent to the workers
+        referenced = {
+            FIELD_KEYS.get(condition.field, condition.field)
+            for rule in self.rules
+            for condition in rule.conditions
+        }
+        self.fields = tuple(field for field in BATCH_FIELDS if field in referenced)
+
+        self.processes = (
+            processes or settings.EVALUATION_PROCESSES or os.cpu_count() or 1
+        )
+        self.chunk_size = max(chunk_size or settings.EVALUATION_CHUNK_SIZE, 1)
+        self.parallel_threshold = (
+            settings.EVALUATION_PARALLEL_THRESHOLD
+            if parallel_threshold is None
+            else parallel_threshold
+        )
+        self.shared_memory = (
+            settings.EVALUATION_SHARED_MEMORY
+            if shared_memory is None
+            else shared_memory
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned processes do not inherit the caller's threads or open
+            # database connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.rules,),
+            )
+        return self._executor
+
+    def evaluate(
+        self, emails: Sequence[Dict[str, Any]], as_of: Optional[datetime] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Evaluate the rules against every email.
+
+        Args:
+            emails: Email data to check against
+            as_of: Time date conditions are evaluated against, the same for
+                every shard; defaults to ``RuleEngine.as_of()``
+
+        Returns:
+            List[List[Dict[str, Any]]]: The actions for each email, in the
+            order of ``emails``
+        """
+        as_of = as_of or RuleEngine.as_of()
+        if self.processes <= 1 or len(emails) < self.parallel_threshold:
+            return [
+                RuleEngine.process_email(self.rules, email, as_of) for email in emails
+            ]
+
+        if self.shared_memory:
+            return self._evaluate_shared(emails, as_of)
+
+        shards = [
+            [
+                {field: email[field] for field in self.fields if field in email}
+                for email in emails[start : start + self.chunk_size]
+            ]
+            for start in range(0, len(emails), self.chunk_size)
+        ]
+
+        results: List[List[Dict[str, Any]]] = []
+        for shard_result in self._get_executor().map(
+            _evaluate_shard, shards, [as_of] * len(shards)
+        ):
+            results.extend(shard_result)
+        return results
+
+    def _evaluate_shared(
+        self, emails: Sequence[Dict[str, Any]], as_of: datetime
+    ) -> List[List[Dict[str, Any]]]:
+        results: List[List[Dict[str, Any]]] = []
+        with EmailBatch(emails, fields=self.fields) as batch:
+            starts = range(0, len(emails), self.chunk_size)
+            stops = [min(start + self.chunk_size, len(emails)) for start in starts]
+            for shard_result in self._get_executor().map(
+                _evaluate_range,
+                [batch.layout] * len(stops),
+                starts,
+                stops,
+                [as_of] * len(stops),
+            ):
+                results.extend(shard_result)
+        return results
+
+    def close(self) -> None:
+        """
+        Shut down the worker processes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "EvaluationPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,212 @@
+"""
+LRU cache of rule evaluation results.
+
+The same email is often evaluated many times, e.g. when an inbox page is
+previewed repeatedly. Results are cached under a key made of the rule-set
+version and a hash of the email fields the rules reference, so entries are
+never served for a changed rule set or a changed email. Results that depend on
+the evaluation time expire at the next time they could flip.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.rule_engine import (
+    DATE_PREDICATES,
+    FIELD_KEYS,
+    CompiledRule,
+    RuleEngine,
+)
+
+# Email fields read by the rule engine, in hashing order
+RULE_FIELDS = ("from", "subject", "message", "received_date", "label")
+
+
+class RuleSet(NamedTuple):
+    """
+    Compiled rules with the values needed to build cache keys.
+    """
+
+    version: str  # Hash of the rules' content and order
+    rules: List[CompiledRule]
+    fields: Tuple[str, ...]  # Email fields referenced by a condition
+    time_based: bool  # True if a condition compares dates to the current time
+
+
+class CachedResult(NamedTuple):
+    actions: Tuple[Dict[str, Any], ...]
+    expires_at: Optional[datetime]  # Next time the result could change
+
+
+def prepare_rules(rules: Sequence[Any]) -> RuleSet:
+    """
+    Compile rules and compute their version.
+
+    Args:
+        rules: Rules in evaluation order, as models or compiled rules
+
+    Returns:
+        RuleSet: The compiled rules and their cache key parts
+    """
+    compiled = RuleEngine.compile_rules(rules)
+    referenced = {condition.field for rule in compiled for condition in rule.conditions}
+    return RuleSet(
+        version=hashlib.sha256(repr(compiled).encode("utf-8")).hexdigest(),
+        rules=compiled,
+        fields=tuple(field for field in RULE_FIELDS if field in referenced),
+        time_based=any(
+            condition.field == "received_date"
+            and condition.predicate in DATE_PREDICATES
+            for rule in compiled
+            for condition in rule.conditions
+        ),
+    )
+
+
+class RuleResultCache:
+    """
+    Thread-safe, size-bounded LRU cache of the actions produced for emails.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Args:
+            max_entries: Maximum number of cached results; 0 disables caching
+        """
+        self.max_entries = (
+            settings.RULE_CACHE_SIZE if max_entries is None else max_entries
+        )
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], CachedResult]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+
+    @staticmethod
+    def key(rule_set: RuleSet, email: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Build the cache key of an email.
+
+        Args:
+            rule_set: The prepared rules
+            email: The email data
+
+        Returns:
+            Tuple[str, str]: The rule-set version and the hash of the
+            referenced fields
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for field in rule_set.fields:
+            value = email.get(FIELD_KEYS.get(field, field), "")
+            digest.update(f"{field}\x1f{value!r}\x1e".encode("utf-8"))
+        return rule_set.version, digest.hexdigest()
+
+    def process_email(
+        self,
+        rule_set: RuleSet,
+        email: Dict[str, Any],
+        as_of: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the actions for an email, evaluating the rules on a cache miss.
+
+        Args:
+            rule_set: The prepared rules
+            email: The email data to check against
+            as_of: Time date conditions are evaluated against; defaults to
+                ``RuleEngine.as_of()``
+
+        Returns:
+            List[Dict[str, Any]]: The actions to perform
+        """
+        as_of = as_of or RuleEngine.as_of()
+        if self.max_entries <= 0:
+            return RuleEngine.process_email(rule_set.rules, email, as_of)
+
+        key = self.key(rule_set, email)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and (
+                cached.expires_at is None or as_of < cached.expires_at
+            ):
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return [dict(action) for action in cached.actions]
+            if cached is not None:
+                self._expired += 1
+            self._misses += 1
+
+        actions = RuleEngine.process_email(rule_set.rules, email, as_of)
+        expires_at = (
+            RuleEngine.next_flip(rule_set.rules, email, as_of)
+            if rule_set.time_based
+            else None
+        )
+
+        with self._lock:
+            self._entries[key] = CachedResult(
+                tuple(dict(action) for action in actions), expires_at
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+        return actions
+
+    def process_emails(
+        self,
+        rules: Sequence[Any],
+        emails: Sequence[Dict[str, Any]],
+        as_of: Optional[datetime] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Get the actions for several emails.
+
+        Args:
+            rules: Rules in evaluation order
+            emails: The email data to check against
+            as_of: Time date conditions are evaluated against; defaults to
+                ``RuleEngine.as_of()``
+
+        Returns:
+            List[List[Dict[str, Any]]]: The actions for each email, in order
+        """
+        rule_set = prepare_rules(rules)
+        as_of = as_of or RuleEngine.as_of()
+        return [self.process_email(rule_set, email, as_of) for email in emails]
+
+    def clear(self) -> None:
+        """
+        Drop all cached results.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of the cache usage.
+
+        Returns:
+            Dict[str, Any]: Size, hit and miss counts and the hit rate
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "expired": self._expired,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+
+# Shared by all requests in the process
+rule_result_cache = RuleResultCache()
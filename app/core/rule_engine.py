@@ -1,8 +1,54 @@
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, NamedTuple, Optional, Sequence, Tuple
 
+from app.core.addresses import email_sender
+from app.core.config import settings
 from app.models.rule import Rule
 
+# Actions that set the read state of a message; only one of them can apply
+READ_STATE_ACTIONS = ("mark_as_read", "mark_as_unread")
+
+# Predicates comparing received_date against the evaluation time
+DATE_PREDICATES = ("less_than", "greater_than")
+
+# Email keys holding the value of condition fields named differently
+FIELD_KEYS = {"label": "label_ids"}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class CompiledCondition(NamedTuple):
+    field: str
+    predicate: str
+    value: str
+    unit: Optional[str]
+
+
+class CompiledAction(NamedTuple):
+    type: str
+    target: Optional[str]
+
+
+class CompiledRule(NamedTuple):
+    """
+    Plain, picklable snapshot of a rule.
+
+    It has the attributes the engine reads from a ``Rule`` model, so it can be
+    evaluated anywhere a rule can, including in processes without a database
+    session.
+    """
+
+    id: str
+    match_type: str
+    conditions: Tuple[CompiledCondition, ...]
+    actions: Tuple[CompiledAction, ...]
+
 
 class RuleEngine:
     """
@@ -10,13 +56,81 @@ class RuleEngine:
     """
 
     @staticmethod
-    def evaluate_condition(condition: Dict[str, Any], email: Dict[str, Any]) -> bool:
+    def as_of(now: Optional[datetime] = None) -> datetime:
+        """
+        Get the time date conditions are evaluated against.
+
+        The time is truncated to RULE_DATE_BUCKET seconds, so every evaluation
+        within a bucket gives the same result.
+
+        Args:
+            now: The current time, as naive UTC; defaults to ``utcnow()``
+
+        Returns:
+            datetime: The truncated time, as naive UTC
+        """
+        now = _naive_utc(now) if now is not None else datetime.utcnow()
+        if settings.RULE_DATE_BUCKET <= 0:
+            return now
+        return now - (now - _EPOCH) % timedelta(seconds=settings.RULE_DATE_BUCKET)
+
+    @staticmethod
+    def date_age(condition: Dict[str, Any]) -> Optional[timedelta]:
+        """
+        Get the age a date condition compares emails against.
+
+        Args:
+            condition: A received_date condition
+
+        Returns:
+            Optional[timedelta]: The age, or None if the unit is not supported
+        """
+        value = float(condition["value"])
+        unit = condition.get("unit") or "days"
+
+        if unit == "days":
+            return timedelta(days=value)
+        elif unit == "months":
+            # Approximate months as 30 days
+            return timedelta(days=30 * value)
+        return None
+
+    @staticmethod
+    def sender_equals(email: Dict[str, Any], value: str) -> bool:
+        """
+        Check whether an email's sender equals a rule value.
+
+        A value starting with ``@`` is compared with the sender's domain;
+        any other value with the parsed address and with the raw header.
+
+        Args:
+            email: The email data to check against
+            value: The condition value, e.g. ``user@example.com`` or
+                ``@example.com``
+
+        Returns:
+            bool: True if the sender equals the value, ignoring case
+        """
+        value = value.strip().lower()
+        sender = email_sender(email)
+        if value.startswith("@"):
+            return sender.domain == value[1:]
+        return sender.address == value or (email.get("from") or "").lower() == value
+
+    @staticmethod
+    def evaluate_condition(
+        condition: Dict[str, Any],
+        email: Dict[str, Any],
+        as_of: Optional[datetime] = None,
+    ) -> bool:
         """
         Evaluate a single condition against an email.
 
         Args:
             condition: The condition to evaluate
             email: The email data to check against
+            as_of: Time date conditions are evaluated against; defaults to
+                :meth:`as_of`
 
         Returns:
             bool: True if the condition matches, False otherwise
@@ -26,14 +140,31 @@ class RuleEngine:
         value = condition["value"]
 
         # Get the field value from the email
-        if field == "from":
+        if field == "label":
+            # Gmail label IDs, e.g. INBOX or Label_12; matched as a set and,
+            # like the IDs themselves, case-sensitively
+            labels = {str(label) for label in email.get("label_ids") or ()}
+            if predicate in ("contains", "equals"):
+                return value in labels
+            if predicate in ("does_not_contain", "does_not_equal"):
+                return value not in labels
+            return False
+        elif field == "from":
+            if predicate in ("equals", "does_not_equal"):
+                matched = RuleEngine.sender_equals(email, value)
+                return matched if predicate == "equals" else not matched
             field_value = email.get("from", "")
         elif field == "subject":
             field_value = email.get("subject", "")
         elif field == "message":
             field_value = email.get("message", "")
+            if field_value is None:
+                # The body was archived or dropped, so no condition on it
+                # matches, negated ones included
+                return False
         elif field == "received_date":
-            field_value = email.get("received_date", datetime.utcnow())
+            as_of = as_of or RuleEngine.as_of()
+            field_value = email.get("received_date") or as_of
         else:
             return False
 
@@ -46,34 +177,32 @@ class RuleEngine:
             return str(field_value).lower() == value.lower()
         elif predicate == "does_not_equal":
             return str(field_value).lower() != value.lower()
-        elif predicate in ["less_than", "greater_than"] and field == "received_date":
+        elif predicate in DATE_PREDICATES and field == "received_date":
             # Handle date comparisons
-            unit = condition.get("unit", "days")
-            value_int = int(value)
-
-            if unit == "days":
-                threshold_date = datetime.utcnow() - timedelta(days=value_int)
-            elif unit == "months":
-                # Approximate months as 30 days
-                threshold_date = datetime.utcnow() - timedelta(days=30 * value_int)
-            else:
+            age = RuleEngine.date_age(condition)
+            if age is None:
                 return False
 
+            threshold_date = as_of - age
             if predicate == "less_than":
-                return field_value > threshold_date
+                return _naive_utc(field_value) > threshold_date
             else:  # greater_than
-                return field_value < threshold_date
+                return _naive_utc(field_value) < threshold_date
 
         return False
 
     @staticmethod
-    def evaluate_rule(rule: Rule, email: Dict[str, Any]) -> bool:
+    def evaluate_rule(
+        rule: Rule, email: Dict[str, Any], as_of: Optional[datetime] = None
+    ) -> bool:
         """
         Evaluate a rule against an email.
 
         Args:
             rule: The rule to evaluate
             email: The email data to check against
+            as_of: Time date conditions are evaluated against; defaults to
+                :meth:`as_of`
 
         Returns:
             bool: True if the rule matches, False otherwise
@@ -95,12 +224,12 @@ class RuleEngine:
         # Evaluate conditions based on match_type
         if rule.match_type == "all":
             return all(
-                RuleEngine.evaluate_condition(condition, email)
+                RuleEngine.evaluate_condition(condition, email, as_of)
                 for condition in conditions
             )
         else:  # any
             return any(
-                RuleEngine.evaluate_condition(condition, email)
+                RuleEngine.evaluate_condition(condition, email, as_of)
                 for condition in conditions
             )
 
@@ -116,25 +245,204 @@ class RuleEngine:
             List[Dict[str, Any]]: The actions to perform
         """
         return [
-            {"type": action.type, "target": action.target} for action in rule.actions
+            {"type": action.type, "target": action.target, "rule_id": str(rule.id)}
+            for action in rule.actions
         ]
 
     @staticmethod
-    def process_email(rules: List[Rule], email: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def process_email(
+        rules: List[Rule], email: Dict[str, Any], as_of: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
         """
         Process an email against a list of rules.
 
         Args:
             rules: The rules to evaluate
             email: The email data to check against
+            as_of: Time date conditions are evaluated against; defaults to
+                :meth:`as_of`
 
         Returns:
             List[Dict[str, Any]]: The actions to perform
         """
+        as_of = as_of or RuleEngine.as_of()
         actions = []
 
         for rule in rules:
-            if RuleEngine.evaluate_rule(rule, email):
+            if RuleEngine.evaluate_rule(rule, email, as_of):
                 actions.extend(RuleEngine.get_actions(rule))
 
         return actions
+
+    @staticmethod
+    def next_flip(
+        rules: List[Rule], email: Dict[str, Any], as_of: Optional[datetime] = None
+    ) -> Optional[datetime]:
+        """
+        Get the next time the rules' result for an email could change.
+
+        Only date conditions depend on the evaluation time; each one flips
+        when the email reaches the condition's age. Until the earliest of
+        those times the result evaluated at ``as_of`` stays valid.
+
+        Args:
+            rules: The rules to evaluate
+            email: The email data to check against
+            as_of: Time the result was evaluated at; defaults to :meth:`as_of`
+
+        Returns:
+            Optional[datetime]: The earliest flip after ``as_of`` as naive UTC,
+            or None if the result can no longer change
+        """
+        received_date = email.get("received_date")
+        if not isinstance(received_date, datetime):
+            # Emails without a date are evaluated as received at as_of,
+            # so their date conditions never change
+            return None
+
+        as_of = as_of or RuleEngine.as_of()
+        received_date = _naive_utc(received_date)
+        flips = []
+        for rule in rules:
+            for condition in rule.conditions:
+                if (
+                    condition.field != "received_date"
+                    or condition.predicate not in DATE_PREDICATES
+                ):
+                    continue
+                age = RuleEngine.date_age(
+                    {"value": condition.value, "unit": condition.unit}
+                )
+                if age is not None and received_date + age >= as_of:
+                    flips.append(received_date + age)
+
+        return min(flips, default=None)
+
+    @staticmethod
+    def received_window(
+        rules: Sequence[Rule], as_of: Optional[datetime] = None
+    ) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """
+        Get the range of received dates any of the rules can match.
+
+        A rule matching ``all`` of its conditions only matches emails inside
+        the range its date conditions allow; other rules can match any date.
+        Emails outside the returned range match no rule, so stored-email runs
+        filter on it and read only the partitions that overlap it.
+
+        Args:
+            rules: The rules to evaluate
+            as_of: Time date conditions are evaluated against; defaults to
+                :meth:`as_of`
+
+        Returns:
+            Tuple[Optional[datetime], Optional[datetime]]: Exclusive lower and
+            upper bounds as naive UTC; None where a side is unbounded
+        """
+        as_of = as_of or RuleEngine.as_of()
+        lowers: List[Optional[datetime]] = []
+        uppers: List[Optional[datetime]] = []
+        for rule in rules:
+            if not rule.conditions:
+                # Rules without conditions never match
+                continue
+            lower = upper = None
+            if rule.match_type == "all":
+                for condition in rule.conditions:
+                    if (
+                        condition.field != "received_date"
+                        or condition.predicate not in DATE_PREDICATES
+                    ):
+                        continue
+                    age = RuleEngine.date_age(
+                        {"value": condition.value, "unit": condition.unit}
+                    )
+                    if age is None:
+                        continue
+                    threshold = as_of - age
+                    if condition.predicate == "less_than":
+                        lower = threshold if lower is None else max(lower, threshold)
+                    else:
+                        upper = threshold if upper is None else min(upper, threshold)
+            lowers.append(lower)
+            uppers.append(upper)
+
+        if not lowers:
+            return None, None
+        return (
+            None if None in lowers else min(lowers),
+            None if None in uppers else max(uppers),
+        )
+
+    @staticmethod
+    def compile_rules(rules: Sequence[Rule]) -> List[CompiledRule]:
+        """
+        Snapshot rules into plain tuples detached from the database session.
+
+        Args:
+            rules: The rules to compile, in evaluation order
+
+        Returns:
+            List[CompiledRule]: The compiled rules, in the same order
+        """
+        return [
+            CompiledRule(
+                id=str(rule.id),
+                match_type=rule.match_type,
+                conditions=tuple(
+                    CompiledCondition(
+                        condition.field,
+                        condition.predicate,
+                        condition.value,
+                        condition.unit,
+                    )
+                    for condition in rule.conditions
+                ),
+                actions=tuple(
+                    CompiledAction(action.type, action.target)
+                    for action in rule.actions
+                ),
+            )
+            for rule in rules
+        ]
+
+    @staticmethod
+    def reduce_actions(
+        actions: List[Dict[str, Any]], precedence: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Collapse the actions for one email into a minimal change set.
+
+        Duplicates are dropped, and conflicting actions (mark_as_read against
+        mark_as_unread, or several move_message targets) are resolved by rule
+        order: with ``first`` precedence the earliest matching rule wins, with
+        ``last`` the latest one does. The result holds at most one move and one
+        read state action, in that order.
+
+        Args:
+            actions: Actions in rule evaluation order
+            precedence: ``first`` or ``last``; defaults to the configured
+                ACTION_PRECEDENCE
+
+        Returns:
+            List[Dict[str, Any]]: The reduced actions
+        """
+        precedence = precedence or settings.ACTION_PRECEDENCE
+        if precedence not in ("first", "last"):
+            raise ValueError(f"Invalid action precedence: {precedence}")
+
+        ordered = actions if precedence == "first" else list(reversed(actions))
+        move = next(
+            (
+                action
+                for action in ordered
+                if action["type"] == "move_message" and action.get("target")
+            ),
+            None,
+        )
+        read_state = next(
+            (action for action in ordered if action["type"] in READ_STATE_ACTIONS),
+            None,
+        )
+
+        return [action for action in (move, read_state) if action is not None]
@@ -0,0 +1,71 @@
+"""
+Fast JSON serialization for API payloads.
+
+Emails and action lists are encoded straight to bytes, skipping FastAPI's
+``jsonable_encoder`` and response model validation. ``orjson`` is used when it
+is installed; otherwise the standard library encoder is used as a fallback.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """
+    Encode values the standard library encoder does not understand.
+
+    Args:
+        obj: The value to encode
+
+    Returns:
+        Any: A JSON compatible representation of the value
+    """
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", errors="replace")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize content to JSON bytes.
+
+    Args:
+        content: The content to serialize
+
+    Returns:
+        bytes: The UTF-8 encoded JSON document
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            content, default=_default, option=orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with :func:`dumps`.
+
+    Returning an instance of this class from a route bypasses response model
+    validation, so the content must already be in its final shape.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,4 +1,17 @@
 from app.models.rule import Rule, Condition, Action
 from app.models.email import Email
+from app.models.email_body_archive import EmailBodyArchive
+from app.models.email_id import EmailId
+from app.models.email_action import EmailAction
+from app.models.job import Job
 
-__all__ = ["Rule", "Condition", "Action", "Email"]
+__all__ = [
+    "Rule",
+    "Condition",
+    "Action",
+    "Email",
+    "EmailBodyArchive",
+    "EmailId",
+    "EmailAction",
+    "Job",
+]
@@ -1,35 +1,85 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, String, DateTime, Text, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    Column,
+    String,
+    DateTime,
+    Index,
+    UniqueConstraint,
+    func,
+    literal_column,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.orm import deferred
 
+from app.core.compression import CompressedText
 from app.core.database import Base
 
 
 class Email(Base):
     __tablename__ = "emails"
+    __table_args__ = (
+        # Unique and primary keys of a partitioned table must include the
+        # partition key; a message's received date never changes. Gmail IDs
+        # are kept globally unique by the email_ids table. The constraint's
+        # index also serves lookups by Gmail ID.
+        UniqueConstraint("gmail_id", "received_date", name="uq_emails_gmail_id"),
+        # Only emails with a pending re-evaluation are indexed
+        Index(
+            "ix_emails_next_evaluation_at",
+            "next_evaluation_at",
+            postgresql_where=text("next_evaluation_at IS NOT NULL"),
+        ),
+        # Emails whose body has not been through retention yet
+        Index(
+            "ix_emails_unarchived_received_date",
+            "received_date",
+            postgresql_where=text("body_archived_at IS NULL"),
+        ),
+        # Serves label containment filters, label_ids @> ARRAY[...]
+        Index("ix_emails_label_ids", "label_ids", postgresql_using="gin"),
+        # Range-partitioned by received month, see PartitionService
+        {"postgresql_partition_by": "RANGE (received_date)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    gmail_id = Column(String, unique=True, index=True, nullable=False)
+    gmail_id = Column(String, nullable=False)
     thread_id = Column(String, index=True)
     from_address = Column(String, nullable=False)
+    # Lower-case sender address and domain parsed from from_address
+    from_email = Column(String, index=True)
+    from_domain = Column(String, index=True)
     to_address = Column(String)
     subject = Column(String)
-    body = Column(Text)
+    # Stored compressed and only loaded, and decompressed, when accessed.
+    # Queries that read the body of many emails undefer it.
+    body = deferred(Column(CompressedText))
+    # SHA-256 of the body and the time it was archived or dropped by retention
+    body_hash = Column(String(64), nullable=True)
+    body_archived_at = Column(DateTime, nullable=True)
     snippet = Column(String)
-    received_date = Column(DateTime, default=datetime.utcnow)
-    label_ids = Column(JSON)
+    received_date = Column(
+        DateTime, primary_key=True, nullable=False, default=datetime.utcnow
+    )
+    label_ids = Column(ARRAY(String), default=list)
+    # Next time a date condition could change the rules' result for the email
+    next_evaluation_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return f"<Email {self.subject}>"
 
-    def to_dict(self):
+    def to_dict(self, body_key: str = "message"):
         """
         Convert the Email model to a dictionary.
 
+        Args:
+            body_key: Key to store the body under. Rule evaluation reads
+                ``message`` while the listing endpoints expose ``body``.
+
         Returns:
             dict: Dictionary representation of the Email model
         """
@@ -38,12 +88,25 @@ class Email(Base):
             "gmail_id": self.gmail_id,
             "thread_id": self.thread_id,
             "from": self.from_address,
+            "from_email": self.from_email,
+            "from_domain": self.from_domain,
             "to": self.to_address,
             "subject": self.subject,
-            "message": self.body,
+            body_key: self.body,
             "snippet": self.snippet,
             "received_date": self.received_date,
             "label_ids": self.label_ids,
+            "body_archived_at": self.body_archived_at,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
         }
+
+
+# Thread an email belongs to; emails without a thread form their own. The
+# empty string is inlined so queries on the expression can use its index.
+THREAD_KEY = func.coalesce(
+    func.nullif(Email.thread_id, literal_column("''")), Email.gmail_id
+)
+
+# Serves reading the latest email per thread in thread key order
+Index("ix_emails_thread_key", THREAD_KEY, Email.received_date.desc())
@@ -0,0 +1,30 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, String, DateTime, Text
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.core.database import Base
+
+
+class EmailAction(Base):
+    __tablename__ = "email_actions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    gmail_id = Column(String, index=True, nullable=False)
+    # Not a foreign key, so the log outlives deleted rules
+    rule_id = Column(UUID(as_uuid=True), nullable=True)
+    type = Column(String, nullable=False)
+    target = Column(String, nullable=True)
+    status = Column(
+        String, nullable=False, default="pending"
+    )  # pending, applied, failed
+    error = Column(Text, nullable=True)
+    # Hash of the email, rule and action, so an action is applied at most once
+    idempotency_key = Column(String(64), unique=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    applied_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<EmailAction {self.gmail_id} {self.type} {self.status}>"
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import Column, String, DateTime, LargeBinary
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.core.database import Base
+
+
+class EmailBodyArchive(Base):
+    __tablename__ = "email_body_archive"
+
+    # Not a foreign key, since the emails key includes the partition key
+    email_id = Column(UUID(as_uuid=True), primary_key=True)
+    gmail_id = Column(String, index=True, nullable=False)
+    # Month of the email's partition, so dropped months are purged by range
+    received_date = Column(DateTime, index=True, nullable=False)
+    # Body compressed with app.core.compression
+    body = Column(LargeBinary, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<EmailBodyArchive {self.gmail_id}>"
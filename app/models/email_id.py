@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, DateTime
+
+from app.core.database import Base
+
+
+class EmailId(Base):
+    """
+    Registry of stored Gmail message IDs.
+
+    The partitioned emails table can only enforce uniqueness together with
+    the partition key, so this unpartitioned table keeps Gmail IDs globally
+    unique. A row is inserted in the same transaction as its email.
+    """
+
+    __tablename__ = "email_ids"
+
+    gmail_id = Column(String, primary_key=True)
+    # Partition of the email, so it can be found and cleaned up by month
+    received_date = Column(DateTime, index=True, nullable=False)
+
+    def __repr__(self):
+        return f"<EmailId {self.gmail_id}>"
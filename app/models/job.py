@@ -0,0 +1,54 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, String, DateTime, Integer, Text, JSON, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.core.database import Base
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_run_after", "status", "run_after"),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(
+        String, nullable=False, default="queued"
+    )  # queued, running, succeeded, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    worker = Column(String, nullable=True)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Job {self.type} {self.status}>"
+
+    def to_dict(self):
+        """
+        Convert the Job model to a dictionary.
+
+        Returns:
+            dict: Dictionary representation of the Job model
+        """
+        return {
+            "id": str(self.id),
+            "type": self.type,
+            "payload": self.payload,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "result": self.result,
+            "error": self.error,
+            "worker": self.worker,
+            "run_after": self.run_after,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
@@ -7,7 +7,7 @@ from pydantic import BaseModel, Field
 
 # Condition Schemas
 class ConditionBase(BaseModel):
-    field: Literal["from", "subject", "message", "received_date"]
+    field: Literal["from", "subject", "message", "received_date", "label"]
     predicate: Literal[
         "contains",
         "does_not_contain",
@@ -25,7 +25,9 @@ class ConditionCreate(ConditionBase):
 
 
 class ConditionUpdate(ConditionBase):
-    field: Optional[Literal["from", "subject", "message", "received_date"]] = None
+    field: Optional[
+        Literal["from", "subject", "message", "received_date", "label"]
+    ] = None
     predicate: Optional[
         Literal[
             "contains",
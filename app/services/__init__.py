@@ -1,4 +1,24 @@
-from app.services.rule import RuleService
-from app.services.email import EmailService
+from app.services.rule import RuleService, AsyncRuleService
+from app.services.email import EmailService, AsyncEmailService
+from app.services.action_log import ActionLogService
+from app.services.job_queue import JobQueue
+from app.services.partitions import PartitionService
+from app.services.processing import ProcessingService
+from app.services.retention import RetentionService, AsyncRetentionService
+from app.services.scheduler import SchedulerService
+from app.services.thread import ThreadService
 
-__all__ = ["RuleService", "EmailService"]
+__all__ = [
+    "RuleService",
+    "AsyncRuleService",
+    "EmailService",
+    "AsyncEmailService",
+    "ActionLogService",
+    "JobQueue",
+    "PartitionService",
+    "ProcessingService",
+    "RetentionService",
+    "AsyncRetentionService",
+    "SchedulerService",
+    "ThreadService",
+]
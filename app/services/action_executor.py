@@ -0,0 +1,212 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+from app.core.config import settings
+from app.core.rule_engine import RuleEngine
+from app.services.label_cache import LabelCache, label_cache
+
+# Gmail rejects batchModify requests with more than this many message IDs
+GMAIL_BATCH_MODIFY_LIMIT = 1000
+
+# A change signature: (label IDs to add, label IDs to remove), both sorted
+Signature = Tuple[Tuple[str, ...], Tuple[str, ...]]
+
+
+class ActionExecutor:
+    """
+    Apply rule actions to Gmail messages.
+
+    Actions for many messages are grouped by the label changes they produce and
+    each group is sent with ``users.messages.batchModify``, so a whole mailbox
+    costs one request per distinct change per 1,000 messages.
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        user_id: str = "me",
+        batch_size: Optional[int] = None,
+        mailbox: Optional[str] = None,
+        labels: Optional[LabelCache] = None,
+    ):
+        """
+        Args:
+            service: Gmail API service object
+            user_id: Gmail user ID of the mailbox
+            batch_size: Maximum number of message IDs per batchModify request
+            mailbox: Key of the mailbox in the label cache. Defaults to the
+                configured Gmail user email.
+            labels: Label cache used to resolve move_message targets. Defaults
+                to the process-wide cache.
+        """
+        self.service = service
+        self.user_id = user_id
+        self.batch_size = min(
+            batch_size or settings.GMAIL_BATCH_MODIFY_SIZE, GMAIL_BATCH_MODIFY_LIMIT
+        )
+        self.mailbox = mailbox or settings.GMAIL_USER_EMAIL
+        self.labels = labels or label_cache
+
+    def resolve_label(self, name: str) -> str:
+        """
+        Resolve a label name to its ID through the label cache.
+
+        Args:
+            name: Label name
+
+        Returns:
+            str: Label ID
+
+        Raises:
+            KeyError: If the label does not exist and cannot be created
+        """
+        return self.labels.resolve(self.service, name, self.mailbox, self.user_id)
+
+    def label_changes(self, actions: List[Dict[str, Any]]) -> Signature:
+        """
+        Translate a message's actions into label changes.
+
+        Actions are applied in order, so a later action overrides an earlier
+        one touching the same label.
+
+        Args:
+            actions: Actions produced by the rule engine
+
+        Returns:
+            Signature: Sorted label IDs to add and to remove
+
+        Raises:
+            KeyError: If a move_message target label does not exist
+        """
+        add, remove = set(), set()
+
+        def change(label_id: str, adding: bool) -> None:
+            (remove if adding else add).discard(label_id)
+            (add if adding else remove).add(label_id)
+
+        for action in actions:
+            if action["type"] == "mark_as_read":
+                change("UNREAD", adding=False)
+            elif action["type"] == "mark_as_unread":
+                change("UNREAD", adding=True)
+            elif action["type"] == "move_message" and action.get("target"):
+                label_id = self.resolve_label(action["target"])
+                change(label_id, adding=True)
+                if label_id != "INBOX":
+                    change("INBOX", adding=False)
+
+        return tuple(sorted(add)), tuple(sorted(remove))
+
+    def plan(
+        self, actions_by_message: Dict[str, List[Dict[str, Any]]]
+    ) -> Tuple[Dict[Signature, List[str]], Dict[str, str]]:
+        """
+        Group messages by the label changes their actions produce.
+
+        Each message's actions are reduced first, so duplicate and conflicting
+        actions never reach Gmail and equivalent messages share a group.
+
+        Args:
+            actions_by_message: Actions to apply keyed by Gmail message ID
+
+        Returns:
+            Tuple[Dict[Signature, List[str]], Dict[str, str]]: Message IDs
+            grouped by change signature, and errors keyed by message ID for
+            messages whose actions could not be translated
+        """
+        groups: Dict[Signature, List[str]] = {}
+        errors: Dict[str, str] = {}
+
+        for message_id, actions in actions_by_message.items():
+            try:
+                signature = self.label_changes(RuleEngine.reduce_actions(actions))
+            except KeyError as error:
+                errors[message_id] = f"Unknown label: {error.args[0]}"
+                continue
+
+            if signature != ((), ()):
+                groups.setdefault(signature, []).append(message_id)
+
+        return groups, errors
+
+    def execute(
+        self,
+        actions_by_message: Dict[str, List[Dict[str, Any]]],
+        retry_stale_labels: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Apply actions to messages with batched modifies.
+
+        When Gmail rejects a request because of an unknown label, the label
+        cache is invalidated and the affected messages are retried once.
+
+        Args:
+            actions_by_message: Actions to apply keyed by Gmail message ID
+            retry_stale_labels: Retry requests rejected for unknown labels
+
+        Returns:
+            Dict[str, Any]: Number of requests sent, modified message IDs, the
+            label changes applied to them and errors keyed by message ID
+        """
+        groups, errors = self.plan(actions_by_message)
+        modified: List[str] = []
+        labels: Dict[str, Signature] = {}
+        stale: List[str] = []
+        requests = 0
+
+        for (add, remove), message_ids in groups.items():
+            for start in range(0, len(message_ids), self.batch_size):
+                chunk = message_ids[start : start + self.batch_size]
+                body: Dict[str, Any] = {"ids": chunk}
+                if add:
+                    body["addLabelIds"] = list(add)
+                if remove:
+                    body["removeLabelIds"] = list(remove)
+
+                requests += 1
+                try:
+                    self.service.users().messages().batchModify(
+                        userId=self.user_id, body=body
+                    ).execute()
+                except HttpError as error:
+                    if retry_stale_labels and is_label_error(error):
+                        stale.extend(chunk)
+                        continue
+                    for message_id in chunk:
+                        errors[message_id] = str(error)
+                    continue
+
+                modified.extend(chunk)
+                labels.update((message_id, (add, remove)) for message_id in chunk)
+
+        if stale:
+            self.labels.invalidate(self.mailbox)
+            retried = self.execute(
+                {message_id: actions_by_message[message_id] for message_id in stale},
+                retry_stale_labels=False,
+            )
+            requests += retried["requests"]
+            modified.extend(retried["modified"])
+            labels.update(retried["labels"])
+            errors.update(retried["errors"])
+
+        return {
+            "requests": requests,
+            "modified": modified,
+            "labels": labels,
+            "errors": errors,
+        }
+
+
+def is_label_error(error: HttpError) -> bool:
+    """
+    Check whether Gmail rejected a request because of an unknown label.
+
+    Args:
+        error: The error raised by the Gmail API client
+
+    Returns:
+        bool: True if the error refers to an invalid or missing label
+    """
+    return error.resp.status in (400, 404) and "label" in str(error).lower()
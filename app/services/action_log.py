@@ -0,0 +1,179 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Set
+from uuid import UUID
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.email_action import EmailAction
+from app.services.email import EmailService
+
+
+class ActionLogService:
+    """Service for recording computed and applied actions per email."""
+
+    @staticmethod
+    def idempotency_key(gmail_id: str, action: Dict[str, Any]) -> str:
+        """
+        Build the idempotency key of an action for an email.
+
+        Args:
+            gmail_id: Gmail ID of the email
+            action: Action produced by the rule engine
+
+        Returns:
+            str: Hex SHA-256 of the email, rule and action
+        """
+        parts = (
+            gmail_id,
+            action.get("rule_id") or "",
+            action["type"],
+            action.get("target") or "",
+        )
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_processed_gmail_ids(db: Session, gmail_ids: Iterable[str]) -> Set[str]:
+        """
+        Get the emails whose logged actions have all been applied.
+
+        Emails that matched no rule have nothing logged and are evaluated again,
+        which is cheap since there is nothing to execute for them. Emails with
+        a failed action, or one left pending by an interrupted run, are
+        evaluated again too, so those actions are retried.
+
+        Args:
+            db: Database session
+            gmail_ids: Gmail IDs to check
+
+        Returns:
+            Set[str]: Gmail IDs whose logged actions are all applied
+        """
+        gmail_ids = list(gmail_ids)
+        if not gmail_ids:
+            return set()
+
+        return set(
+            db.execute(
+                select(EmailAction.gmail_id)
+                .where(EmailAction.gmail_id.in_(gmail_ids))
+                .group_by(EmailAction.gmail_id)
+                .having(
+                    func.sum(case((EmailAction.status != "applied", 1), else_=0)) == 0
+                )
+            ).scalars()
+        )
+
+    @staticmethod
+    def record_actions(
+        db: Session, actions_by_message: Dict[str, List[Dict[str, Any]]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Log actions in bulk and return those that still need to be applied.
+
+        Actions already logged are not inserted again, and actions already
+        applied are left out of the result.
+
+        Args:
+            db: Database session
+            actions_by_message: Actions keyed by Gmail message ID
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: Actions not yet applied, keyed by
+            Gmail message ID
+        """
+        rows = []
+        for gmail_id, actions in actions_by_message.items():
+            for action in actions:
+                rule_id = action.get("rule_id")
+                rows.append(
+                    {
+                        "gmail_id": gmail_id,
+                        "rule_id": UUID(rule_id) if rule_id else None,
+                        "type": action["type"],
+                        "target": action.get("target"),
+                        "status": "pending",
+                        "idempotency_key": ActionLogService.idempotency_key(
+                            gmail_id, action
+                        ),
+                    }
+                )
+        if not rows:
+            return {}
+
+        keys = [row["idempotency_key"] for row in rows]
+        applied = set(
+            db.execute(
+                select(EmailAction.idempotency_key).where(
+                    EmailAction.idempotency_key.in_(keys),
+                    EmailAction.status == "applied",
+                )
+            ).scalars()
+        )
+
+        db.execute(
+            insert(EmailAction)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["idempotency_key"])
+        )
+        db.commit()
+
+        pending: Dict[str, List[Dict[str, Any]]] = {}
+        for gmail_id, actions in actions_by_message.items():
+            remaining = [
+                action
+                for action in actions
+                if ActionLogService.idempotency_key(gmail_id, action) not in applied
+            ]
+            if remaining:
+                pending[gmail_id] = remaining
+        return pending
+
+    @staticmethod
+    def mark_results(
+        db: Session,
+        actions_by_message: Dict[str, List[Dict[str, Any]]],
+        result: Dict[str, Any],
+    ) -> None:
+        """
+        Record the outcome of executing logged actions.
+
+        The label changes applied in Gmail are also applied to the stored
+        emails, so label conditions and filters see them.
+
+        Args:
+            db: Database session
+            actions_by_message: The actions that were executed, keyed by Gmail
+                message ID
+            result: The result of ``ActionExecutor.execute``
+        """
+        now = datetime.utcnow()
+
+        applied_keys = [
+            ActionLogService.idempotency_key(gmail_id, action)
+            for gmail_id in result["modified"]
+            for action in actions_by_message.get(gmail_id, [])
+        ]
+        if applied_keys:
+            db.execute(
+                update(EmailAction)
+                .where(EmailAction.idempotency_key.in_(applied_keys))
+                .values(status="applied", error=None, applied_at=now, updated_at=now)
+            )
+        EmailService.update_labels(db, result.get("labels", {}))
+
+        for gmail_id, error in result["errors"].items():
+            failed_keys = [
+                ActionLogService.idempotency_key(gmail_id, action)
+                for action in actions_by_message.get(gmail_id, [])
+            ]
+            if failed_keys:
+                db.execute(
+                    update(EmailAction)
+                    .where(EmailAction.idempotency_key.in_(failed_keys))
+                    .values(status="failed", error=error, updated_at=now)
+                )
+
+        db.commit()
@@ -1,8 +1,74 @@
-from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from uuid import UUID
+from sqlalchemy import ColumnElement, bindparam, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer
 from datetime import datetime
 
+from app.core.addresses import parse_sender
 from app.models.email import Email
+from app.models.email_id import EmailId
+
+# Hot lookups are built once so SQLAlchemy compiles each of them only once per
+# engine; values are always passed as bound parameters.
+EMAIL_BY_GMAIL_ID_STATEMENT = select(Email).where(
+    Email.gmail_id == bindparam("gmail_id")
+)
+
+
+def sender_filter(sender: str) -> ColumnElement[bool]:
+    """
+    Build the filter matching emails from a sender.
+
+    Args:
+        sender: A sender address, or ``@domain`` for every sender of a domain
+
+    Returns:
+        ColumnElement[bool]: An exact match on an indexed sender column
+    """
+    sender = sender.strip().lower()
+    if sender.startswith("@"):
+        return Email.from_domain == sender[1:]
+    return Email.from_email == sender
+
+
+def label_filter(label_id: str) -> ColumnElement[bool]:
+    """
+    Build the filter matching emails with a label.
+
+    Args:
+        label_id: Gmail label ID, e.g. ``INBOX`` or ``Label_12``
+
+    Returns:
+        ColumnElement[bool]: A containment test served by the GIN index on
+        label_ids
+    """
+    return Email.label_ids.contains([label_id])
+
+
+def received_filters(
+    since: Optional[datetime] = None, until: Optional[datetime] = None
+) -> List[ColumnElement[bool]]:
+    """
+    Build the filters matching emails received in a date range.
+
+    The emails table is partitioned by received month, so a bounded range
+    only reads the partitions overlapping it.
+
+    Args:
+        since: Only match emails received at or after this time
+        until: Only match emails received before this time
+
+    Returns:
+        List[ColumnElement[bool]]: Filters on the partition key
+    """
+    filters = []
+    if since is not None:
+        filters.append(Email.received_date >= since)
+    if until is not None:
+        filters.append(Email.received_date < until)
+    return filters
 
 
 class EmailService:
@@ -13,6 +79,10 @@ class EmailService:
         """
         Create a new email record in the database.
 
+        The Gmail ID is claimed in the email_ids table in the same
+        transaction, so concurrent syncs of the same message store it once.
+        An email already stored gets its labels refreshed instead.
+
         Args:
             db: Database session
             email_data: Email data from Gmail API
@@ -21,23 +91,41 @@ class EmailService:
             Email: Created email object
         """
         # Check if email already exists
-        existing_email = (
-            db.query(Email).filter(Email.gmail_id == email_data["id"]).first()
-        )
+        existing_email = EmailService.get_email_by_gmail_id(db, email_data["id"])
         if existing_email:
+            label_ids = email_data.get("label_ids")
+            if label_ids is not None and existing_email.label_ids != label_ids:
+                existing_email.label_ids = label_ids
+                db.commit()
             return existing_email
 
+        received_date = email_data.get("received_date") or datetime.utcnow()
+        # Waits for a concurrent claim of the same ID, then does nothing
+        claimed = db.execute(
+            insert(EmailId)
+            .values(gmail_id=email_data["id"], received_date=received_date)
+            .on_conflict_do_nothing(index_elements=["gmail_id"])
+            .returning(EmailId.gmail_id)
+        ).scalar()
+        if claimed is None:
+            db.rollback()
+            return EmailService.get_email_by_gmail_id(db, email_data["id"])
+
         # Create new email object
+        from_address = email_data.get("from", "")
+        sender = parse_sender(from_address)
         email = Email(
             gmail_id=email_data["id"],
             thread_id=email_data.get("thread_id", ""),
-            from_address=email_data.get("from", ""),
+            from_address=from_address,
+            from_email=sender.address,
+            from_domain=sender.domain,
             to_address=email_data.get("to", ""),
             subject=email_data.get("subject", ""),
             body=email_data.get("message", ""),
             snippet=email_data.get("snippet", ""),
             label_ids=email_data.get("label_ids", []),
-            received_date=email_data.get("received_date", datetime.utcnow()),
+            received_date=received_date,
         )
 
         # Add to database
@@ -48,7 +136,59 @@ class EmailService:
         return email
 
     @staticmethod
-    def get_emails(db: Session, skip: int = 0, limit: int = 100) -> List[Email]:
+    def update_labels(
+        db: Session, changes: Dict[str, Tuple[Sequence[str], Sequence[str]]]
+    ) -> int:
+        """
+        Apply label changes made in Gmail to the stored emails.
+
+        The caller commits.
+
+        Args:
+            db: Database session
+            changes: Label IDs added and removed, keyed by Gmail ID
+
+        Returns:
+            int: Number of stored emails updated
+        """
+        if not changes:
+            return 0
+
+        values = []
+        rows = db.execute(
+            select(
+                Email.id, Email.received_date, Email.gmail_id, Email.label_ids
+            ).where(Email.gmail_id.in_(list(changes)))
+        )
+        for row in rows:
+            add, remove = changes[row.gmail_id]
+            current = list(row.label_ids or [])
+            label_ids = [label for label in current if label not in remove]
+            label_ids.extend(label for label in add if label not in label_ids)
+            if label_ids != current:
+                values.append(
+                    {
+                        # The primary key includes the partition key
+                        "id": row.id,
+                        "received_date": row.received_date,
+                        "label_ids": label_ids,
+                    }
+                )
+
+        if values:
+            db.execute(update(Email), values)
+        return len(values)
+
+    @staticmethod
+    def get_emails(
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        sender: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        label: Optional[str] = None,
+    ) -> List[Email]:
         """
         Get all emails from the database.
 
@@ -56,11 +196,22 @@ class EmailService:
             db: Database session
             skip: Number of records to skip
             limit: Maximum number of records to return
+            sender: Only return emails from this address, or from any
+                address of a domain given as ``@domain``
+            since: Only return emails received at or after this time
+            until: Only return emails received before this time
+            label: Only return emails with this Gmail label ID
 
         Returns:
             List[Email]: List of emails
         """
-        return db.query(Email).offset(skip).limit(limit).all()
+        query = db.query(Email).options(undefer(Email.body))
+        if sender:
+            query = query.filter(sender_filter(sender))
+        if label:
+            query = query.filter(label_filter(label))
+        query = query.filter(*received_filters(since, until))
+        return query.offset(skip).limit(limit).all()
 
     @staticmethod
     def get_email_by_id(db: Session, email_id: str) -> Optional[Email]:
@@ -88,7 +239,11 @@ class EmailService:
         Returns:
             Optional[Email]: Email object if found, None otherwise
         """
-        return db.query(Email).filter(Email.gmail_id == gmail_id).first()
+        return (
+            db.execute(EMAIL_BY_GMAIL_ID_STATEMENT, {"gmail_id": gmail_id})
+            .scalars()
+            .first()
+        )
 
     @staticmethod
     def delete_email(db: Session, email_id: str) -> bool:
@@ -108,3 +263,86 @@ class EmailService:
             db.commit()
             return True
         return False
+
+
+class AsyncEmailService:
+    """Async read path for emails, used by the hot API routes."""
+
+    @staticmethod
+    async def get_emails(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        sender: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        label: Optional[str] = None,
+    ) -> List[Email]:
+        """
+        Get all emails from the database.
+
+        Args:
+            db: Async database session
+            skip: Number of records to skip
+            limit: Maximum number of records to return
+            sender: Only return emails from this address, or from any
+                address of a domain given as ``@domain``
+            since: Only return emails received at or after this time
+            until: Only return emails received before this time
+            label: Only return emails with this Gmail label ID
+
+        Returns:
+            List[Email]: List of emails
+        """
+        stmt = (
+            select(Email)
+            .options(undefer(Email.body))
+            .where(*received_filters(since, until))
+        )
+        if sender:
+            stmt = stmt.where(sender_filter(sender))
+        if label:
+            stmt = stmt.where(label_filter(label))
+        result = await db.execute(stmt.offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_email_by_id(db: AsyncSession, email_id: str) -> Optional[Email]:
+        """
+        Get an email by ID.
+
+        Args:
+            db: Async database session
+            email_id: Email ID
+
+        Returns:
+            Optional[Email]: Email object if found, None otherwise
+        """
+        try:
+            email_uuid = UUID(str(email_id))
+        except ValueError:
+            return None
+
+        # Async sessions cannot lazy load the deferred body
+        result = await db.execute(
+            select(Email).options(undefer(Email.body)).where(Email.id == email_uuid)
+        )
+        return result.scalars().first()
+
+    @staticmethod
+    async def get_email_by_gmail_id(db: AsyncSession, gmail_id: str) -> Optional[Email]:
+        """
+        Get an email by Gmail ID.
+
+        Args:
+            db: Async database session
+            gmail_id: Gmail ID
+
+        Returns:
+            Optional[Email]: Email object if found, None otherwise
+        """
+        result = await db.execute(
+            EMAIL_BY_GMAIL_ID_STATEMENT.options(undefer(Email.body)),
+            {"gmail_id": gmail_id},
+        )
+        return result.scalars().first()
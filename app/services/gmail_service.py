@@ -1,11 +1,10 @@
 import os
 import json
-import base64
 import re
 import requests
-from typing import List, Dict, Any
-from datetime import datetime
-from bs4 import BeautifulSoup
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
 
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -13,8 +12,37 @@ from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from app.core.addresses import parse_sender
+from app.core.config import settings
+from app.services.message_cache import MessageCache, message_cache
+from app.services.mime import extract_body, headers_of, parse_raw
+
 # Define the scopes
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
+# Scopes needed to apply rule actions (labels and read state)
+MODIFY_SCOPES = ["https://www.googleapis.com/auth/gmail.modify"]
+
+# Gmail accepts at most this many requests in one batch request
+GMAIL_BATCH_REQUEST_LIMIT = 100
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def internal_date(msg: Dict[str, Any]) -> datetime:
+    """
+    Get the time Gmail received a message.
+
+    Args:
+        msg: Gmail API message
+
+    Returns:
+        datetime: Naive UTC time from the message's internalDate, or the
+        current time if the message has none
+    """
+    try:
+        return EPOCH + timedelta(milliseconds=int(msg["internalDate"]))
+    except (KeyError, TypeError, ValueError):
+        return datetime.utcnow()
 
 
 class GmailService:
@@ -22,7 +50,9 @@ class GmailService:
 
     @staticmethod
     def get_credentials(
-        token_path: str = "token.json", credentials_path: str = "credentials.json"
+        token_path: str = "token.json",
+        credentials_path: str = "credentials.json",
+        scopes: List[str] = SCOPES,
     ) -> Credentials:
         """
         Get or refresh credentials for Gmail API.
@@ -30,6 +60,7 @@ class GmailService:
         Args:
             token_path: Path to the token file
             credentials_path: Path to the credentials file
+            scopes: OAuth scopes the credentials must grant
 
         Returns:
             Credentials: The OAuth credentials
@@ -39,7 +70,7 @@ class GmailService:
         # Check if token.json exists
         if os.path.exists(token_path):
             creds = Credentials.from_authorized_user_info(
-                json.loads(open(token_path).read()), SCOPES
+                json.loads(open(token_path).read()), scopes
             )
 
         # If there are no valid credentials, let the user log in
@@ -48,7 +79,7 @@ class GmailService:
                 creds.refresh(Request())
             else:
                 flow = InstalledAppFlow.from_client_secrets_file(
-                    credentials_path, SCOPES
+                    credentials_path, scopes
                 )
                 creds = flow.run_local_server(port=0)
 
@@ -58,9 +89,114 @@ class GmailService:
 
         return creds
 
+    @staticmethod
+    def build_service(scopes: List[str] = SCOPES) -> Any:
+        """
+        Build a Gmail API service object.
+
+        Args:
+            scopes: OAuth scopes the service needs
+
+        Returns:
+            Any: The Gmail API service
+        """
+        creds = GmailService.get_credentials(scopes=scopes)
+        return build("gmail", "v1", credentials=creds)
+
+    @staticmethod
+    def parse_message(
+        msg: Dict[str, Any], headers_only: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Format a message fetched with ``format=full``, ``metadata`` or ``raw``.
+
+        Args:
+            msg: Message resource returned by ``users.messages.get``
+            headers_only: Leave the body empty instead of extracting it
+
+        Returns:
+            Dict[str, Any]: The message in the shape the rule engine reads
+        """
+        if "raw" in msg:
+            headers, body = parse_raw(msg["raw"], headers_only=headers_only)
+        else:
+            headers = headers_of(msg["payload"])
+            # Extract body, including from nested multipart messages
+            body = "" if headers_only else extract_body(msg["payload"])
+
+        # Format the message
+        sender = parse_sender(headers.get("from", ""))
+        formatted_message = {
+            "id": msg["id"],
+            "thread_id": msg["threadId"],
+            "label_ids": msg.get("labelIds", []),
+            "snippet": msg.get("snippet", ""),
+            "from": headers.get("from", ""),
+            "from_email": sender.address,
+            "from_domain": sender.domain,
+            "to": headers.get("to", ""),
+            "subject": headers.get("subject", ""),
+            "date": headers.get("date", ""),
+            # Gmail's receipt time, so an undated message gets the same date
+            # whenever it is fetched
+            "received_date": internal_date(msg),
+            "message": body,
+        }
+
+        # Try to parse the date
+        if "date" in headers:
+            try:
+                formatted_message["received_date"] = parsedate_to_datetime(
+                    headers["date"]
+                )
+            except (TypeError, ValueError):
+                pass
+
+        return formatted_message
+
+    @staticmethod
+    def fetch_labels(
+        service: Any, message_ids: List[str], user_id: str = "me"
+    ) -> Dict[str, List[str]]:
+        """
+        Fetch the current label IDs of messages.
+
+        Messages are fetched with ``format=minimal`` in batch requests, so
+        each batch of up to 100 messages costs one HTTP round trip.
+
+        Args:
+            service: Gmail API service object
+            message_ids: Gmail message IDs
+            user_id: Gmail user ID of the mailbox
+
+        Returns:
+            Dict[str, List[str]]: Label IDs keyed by message ID; messages that
+            could not be fetched are left out
+        """
+        labels: Dict[str, List[str]] = {}
+
+        def collect(request_id: str, response: Dict[str, Any], exception) -> None:
+            if exception is None:
+                labels[response["id"]] = response.get("labelIds", [])
+
+        for start in range(0, len(message_ids), GMAIL_BATCH_REQUEST_LIMIT):
+            batch = service.new_batch_http_request(callback=collect)
+            for message_id in message_ids[start : start + GMAIL_BATCH_REQUEST_LIMIT]:
+                batch.add(
+                    service.users()
+                    .messages()
+                    .get(userId=user_id, id=message_id, format="minimal")
+                )
+            batch.execute()
+        return labels
+
     @staticmethod
     def list_messages(
-        max_results: int = 10, query: str = "in:inbox"
+        max_results: int = 10,
+        query: str = "in:inbox",
+        fetch_format: Optional[str] = None,
+        headers_only: bool = False,
+        cache: Optional[MessageCache] = None,
     ) -> List[Dict[str, Any]]:
         """
         List messages from Gmail inbox.
@@ -68,10 +204,25 @@ class GmailService:
         Args:
             max_results: Maximum number of messages to return
             query: Gmail search query
+            fetch_format: ``full`` to fetch the parsed payload tree, ``raw`` to
+                fetch the RFC 822 source and parse it locally. Defaults to the
+                configured GMAIL_FETCH_FORMAT.
+            headers_only: Skip the message bodies, e.g. when no rule reads
+                them. Messages are then fetched with ``format=metadata``,
+                which leaves the bodies out of the response.
+            cache: On-disk cache consulted before fetching a message and
+                filled with fetched messages. Defaults to the shared cache.
+                Label IDs of cached messages are fetched fresh in batch
+                requests; see :meth:`fetch_labels`.
 
         Returns:
             List[Dict[str, Any]]: List of messages
         """
+        fetch_format = (
+            "metadata" if headers_only else fetch_format or settings.GMAIL_FETCH_FORMAT
+        )
+        cache = cache or message_cache
+
         try:
             # Get credentials and build service
             creds = GmailService.get_credentials()
@@ -90,62 +241,34 @@ class GmailService:
             if not messages:
                 return []
 
-            # Get full message details
+            # Get message details, skipping the API for cached messages
+            cached = cache.get_many(
+                [message["id"] for message in messages], fetch_format
+            )
+            # Labels change after delivery and are not cached; messages whose
+            # labels could not be fetched are fetched in full instead
+            labels = GmailService.fetch_labels(service, list(cached))
+            cached = {
+                message_id: dict(msg, labelIds=labels[message_id])
+                for message_id, msg in cached.items()
+                if message_id in labels
+            }
+            fetched = []
             detailed_messages = []
             for message in messages:
-                msg = (
-                    service.users()
-                    .messages()
-                    .get(userId="me", id=message["id"], format="full")
-                    .execute()
+                msg = cached.get(message["id"])
+                if msg is None:
+                    msg = (
+                        service.users()
+                        .messages()
+                        .get(userId="me", id=message["id"], format=fetch_format)
+                        .execute()
+                    )
+                    fetched.append(msg)
+                detailed_messages.append(
+                    GmailService.parse_message(msg, headers_only=headers_only)
                 )
-
-                # Extract headers
-                headers = {}
-                for header in msg["payload"]["headers"]:
-                    headers[header["name"].lower()] = header["value"]
-
-                # Extract body
-                body = ""
-                if "parts" in msg["payload"]:
-                    for part in msg["payload"]["parts"]:
-                        if part["mimeType"] == "text/plain":
-                            if "data" in part["body"]:
-                                body = base64.urlsafe_b64decode(
-                                    part["body"]["data"]
-                                ).decode("utf-8")
-                                break
-                elif "body" in msg["payload"] and "data" in msg["payload"]["body"]:
-                    body = base64.urlsafe_b64decode(
-                        msg["payload"]["body"]["data"]
-                    ).decode("utf-8")
-
-                # Format the message
-                formatted_message = {
-                    "id": msg["id"],
-                    "thread_id": msg["threadId"],
-                    "label_ids": msg["labelIds"],
-                    "snippet": msg["snippet"],
-                    "from": headers.get("from", ""),
-                    "to": headers.get("to", ""),
-                    "subject": headers.get("subject", ""),
-                    "date": headers.get("date", ""),
-                    "received_date": datetime.now(),  # Use current time as fallback
-                    "message": body,
-                }
-
-                # Try to parse the date
-                if "date" in headers:
-                    try:
-                        from email.utils import parsedate_to_datetime
-
-                        formatted_message["received_date"] = parsedate_to_datetime(
-                            headers["date"]
-                        )
-                    except:
-                        pass
-
-                detailed_messages.append(formatted_message)
+            cache.put_many(fetched, fetch_format)
 
             return detailed_messages
 
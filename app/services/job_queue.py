@@ -0,0 +1,237 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.models.job import Job
+
+
+class JobQueue:
+    """
+    Postgres-backed job queue.
+
+    Workers claim jobs with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any
+    number of worker processes, on any number of machines, can poll the same
+    table without handing a job to two workers. A worker only records the
+    outcome of a run it still owns, since a run that took too long may have
+    been queued again and claimed by another worker.
+    """
+
+    @staticmethod
+    def enqueue(
+        db: Session,
+        job_type: str,
+        payload: Optional[Dict[str, Any]] = None,
+        max_attempts: Optional[int] = None,
+        deduplicate: bool = False,
+    ) -> Job:
+        """
+        Add a job to the queue.
+
+        Args:
+            db: Database session
+            job_type: Name of the handler that runs the job
+            payload: JSON arguments of the job
+            max_attempts: Attempts before the job is marked as failed
+            deduplicate: Return the queued job of the same type instead of
+                adding another one, if there is one
+
+        Returns:
+            Job: The queued job
+        """
+        if deduplicate:
+            queued = (
+                db.execute(
+                    select(Job)
+                    .where(Job.type == job_type, Job.status == "queued")
+                    .limit(1)
+                )
+                .scalars()
+                .first()
+            )
+            if queued is not None:
+                return queued
+
+        job = Job(
+            type=job_type,
+            payload=payload or {},
+            status="queued",
+            attempts=0,
+            max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+            run_after=datetime.utcnow(),
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def get_job(db: Session, job_id: str) -> Optional[Job]:
+        """
+        Get a job by ID.
+
+        Args:
+            db: Database session
+            job_id: Job ID
+
+        Returns:
+            Optional[Job]: The job if found, None otherwise
+        """
+        try:
+            job_uuid = UUID(job_id)
+        except ValueError:
+            return None
+        return db.get(Job, job_uuid)
+
+    @staticmethod
+    def claim(
+        db: Session, worker: str, job_types: Optional[Iterable[str]] = None
+    ) -> Optional[Job]:
+        """
+        Claim the next job that is due.
+
+        The row is locked while it is marked as running; rows locked by other
+        workers are skipped instead of waited on.
+
+        Args:
+            db: Database session
+            worker: Name of the claiming worker
+            job_types: Only claim jobs of these types
+
+        Returns:
+            Optional[Job]: The claimed job, or None if no job is due
+        """
+        now = datetime.utcnow()
+        stmt = (
+            select(Job)
+            .where(Job.status == "queued", Job.run_after <= now)
+            .order_by(Job.run_after, Job.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        if job_types is not None:
+            stmt = stmt.where(Job.type.in_(list(job_types)))
+
+        job = db.execute(stmt).scalars().first()
+        if job is None:
+            db.rollback()
+            return None
+
+        job.status = "running"
+        job.attempts += 1
+        job.worker = worker
+        job.started_at = now
+        job.finished_at = None
+        db.commit()
+        return job
+
+    @staticmethod
+    def _finish(db: Session, job: Job, values: Dict[str, Any]) -> Optional[Job]:
+        # Only the run that claimed the job may record its outcome
+        result = db.execute(
+            update(Job)
+            .where(
+                Job.id == job.id,
+                Job.status == "running",
+                Job.worker == job.worker,
+                Job.attempts == job.attempts,
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        if result.rowcount == 0:
+            return None
+        for key, value in values.items():
+            set_committed_value(job, key, value)
+        return job
+
+    @staticmethod
+    def complete(
+        db: Session, job: Job, result: Optional[Dict[str, Any]] = None
+    ) -> Optional[Job]:
+        """
+        Mark a job as succeeded.
+
+        Args:
+            db: Database session
+            job: The running job
+            result: JSON result of the job
+
+        Returns:
+            Optional[Job]: The updated job, or None if the run was lost, i.e.
+            the job was queued again by :meth:`requeue_stale`
+        """
+        return JobQueue._finish(
+            db,
+            job,
+            {
+                "status": "succeeded",
+                "result": result,
+                "error": None,
+                "finished_at": datetime.utcnow(),
+            },
+        )
+
+    @staticmethod
+    def fail(db: Session, job: Job, error: str, retry: bool = True) -> Optional[Job]:
+        """
+        Record a failed attempt of a job.
+
+        The job is queued again with exponential backoff until it runs out of
+        attempts, after which it is marked as failed.
+
+        Args:
+            db: Database session
+            job: The running job
+            error: Description of the failure
+            retry: Queue the job again if it has attempts left
+
+        Returns:
+            Optional[Job]: The updated job, or None if the run was lost, i.e.
+            the job was queued again by :meth:`requeue_stale`
+        """
+        now = datetime.utcnow()
+        if retry and job.attempts < job.max_attempts:
+            delay = settings.JOB_RETRY_BACKOFF * 2 ** max(job.attempts - 1, 0)
+            values = {"status": "queued", "run_after": now + timedelta(seconds=delay)}
+        else:
+            values = {"status": "failed", "finished_at": now}
+        values["error"] = error
+        return JobQueue._finish(db, job, values)
+
+    @staticmethod
+    def requeue_stale(db: Session, timeout: Optional[int] = None) -> int:
+        """
+        Queue running jobs again whose worker stopped responding.
+
+        Jobs that have used up their attempts are marked as failed instead.
+
+        Args:
+            db: Database session
+            timeout: Seconds after which a running job is considered lost
+
+        Returns:
+            int: Number of jobs queued again
+        """
+        timeout = settings.JOB_TIMEOUT if timeout is None else timeout
+        now = datetime.utcnow()
+        lost = (Job.status == "running") & (
+            Job.started_at < now - timedelta(seconds=timeout)
+        )
+        db.execute(
+            update(Job)
+            .where(lost, Job.attempts >= Job.max_attempts)
+            .values(status="failed", error="Worker timed out", finished_at=now)
+        )
+        result = db.execute(
+            update(Job)
+            .where(lost, Job.attempts < Job.max_attempts)
+            .values(status="queued", run_after=now, worker=None)
+        )
+        db.commit()
+        return result.rowcount
@@ -0,0 +1,162 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+from app.core.config import settings
+
+# System labels whose IDs are their upper-case names
+SYSTEM_LABELS = {
+    "INBOX",
+    "SPAM",
+    "TRASH",
+    "UNREAD",
+    "STARRED",
+    "IMPORTANT",
+    "SENT",
+    "DRAFT",
+    "CATEGORY_PERSONAL",
+    "CATEGORY_SOCIAL",
+    "CATEGORY_PROMOTIONS",
+    "CATEGORY_UPDATES",
+    "CATEGORY_FORUMS",
+}
+
+
+class LabelCache:
+    """
+    Per-mailbox cache of Gmail label names to label IDs.
+
+    Each mailbox's labels are listed once and reused until the TTL expires or
+    the cache is invalidated, e.g. after Gmail rejects a stale label ID. The
+    lock only guards the cached entries; Gmail is called without holding it.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, auto_create: Optional[bool] = None):
+        """
+        Args:
+            ttl: Seconds a mailbox's label listing stays valid
+            auto_create: Create labels that do not exist yet when resolving
+        """
+        self.ttl = settings.GMAIL_LABEL_CACHE_TTL if ttl is None else ttl
+        self.auto_create = (
+            settings.GMAIL_AUTO_CREATE_LABELS if auto_create is None else auto_create
+        )
+        self._lock = threading.Lock()
+        # Mailbox -> (expiry time, whether the listing was loaded while
+        # resolving an unknown name, lower-case label name -> label ID)
+        self._entries: Dict[str, Tuple[float, bool, Dict[str, str]]] = {}
+
+    def _load(self, service: Any, user_id: str) -> Dict[str, str]:
+        response = service.users().labels().list(userId=user_id).execute()
+        return {
+            label["name"].lower(): label["id"] for label in response.get("labels", [])
+        }
+
+    def _entry(
+        self, service: Any, mailbox: str, user_id: str, refresh: bool = False
+    ) -> Tuple[Tuple[float, bool, Dict[str, str]], bool]:
+        # Returns the entry and whether it was just loaded
+        with self._lock:
+            entry = self._entries.get(mailbox)
+        if not refresh and entry is not None and entry[0] > time.monotonic():
+            return entry, False
+
+        labels = self._load(service, user_id)
+        entry = (time.monotonic() + self.ttl, refresh, labels)
+        with self._lock:
+            self._entries[mailbox] = entry
+        return entry, True
+
+    def _mark_refreshed(self, mailbox: str, labels: Dict[str, str]) -> None:
+        with self._lock:
+            entry = self._entries.get(mailbox)
+            if entry is not None and entry[2] is labels:
+                self._entries[mailbox] = (entry[0], True, labels)
+
+    def resolve(
+        self, service: Any, name: str, mailbox: str, user_id: str = "me"
+    ) -> str:
+        """
+        Resolve a label name to its ID.
+
+        A name missing from a cached listing triggers one fresh listing before
+        it is treated as unknown, since the label may have been created since.
+        Names missing from a listing loaded while resolving them are unknown
+        until the TTL expires, without listing the labels again.
+
+        Args:
+            service: Gmail API service object
+            name: Label name, matched case-insensitively
+            mailbox: Key identifying the mailbox, e.g. its email address
+            user_id: Gmail user ID used in API calls
+
+        Returns:
+            str: Label ID
+
+        Raises:
+            KeyError: If the label does not exist and auto creation is disabled
+        """
+        if name.upper() in SYSTEM_LABELS:
+            return name.upper()
+
+        key = name.lower()
+        (_, refreshed, labels), loaded = self._entry(service, mailbox, user_id)
+        if key in labels:
+            return labels[key]
+
+        if loaded:
+            # Listing again right away would not find it either
+            self._mark_refreshed(mailbox, labels)
+        elif not refreshed:
+            (_, _, labels), _ = self._entry(service, mailbox, user_id, refresh=True)
+            if key in labels:
+                return labels[key]
+
+        if not self.auto_create:
+            raise KeyError(name)
+
+        try:
+            label = (
+                service.users()
+                .labels()
+                .create(
+                    userId=user_id,
+                    body={
+                        "name": name,
+                        "labelListVisibility": "labelShow",
+                        "messageListVisibility": "show",
+                    },
+                )
+                .execute()
+            )
+        except HttpError as error:
+            # Another caller created the label first
+            if error.resp.status != 409:
+                raise
+            (_, _, labels), _ = self._entry(service, mailbox, user_id, refresh=True)
+            if key not in labels:
+                raise
+            return labels[key]
+
+        with self._lock:
+            labels[key] = label["id"]
+        return label["id"]
+
+    def invalidate(self, mailbox: Optional[str] = None) -> None:
+        """
+        Drop cached labels.
+
+        Args:
+            mailbox: Mailbox to invalidate, or None to invalidate all mailboxes
+        """
+        with self._lock:
+            if mailbox is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(mailbox, None)
+
+
+# Shared by all requests in the process
+label_cache = LabelCache()
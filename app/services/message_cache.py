@@ -0,0 +1,241 @@
+"""
+On-disk cache of Gmail message resources.
+
+A message's content never changes once it has been delivered, so a message
+fetched once can be served from disk by its ID instead of being downloaded
+again. Its labels do change, so they are not cached. Records are compressed
+JSON in a SQLite file, shared by every process on the host, and the least
+recently used records are evicted once the file holds more than the
+configured number of bytes.
+
+Records are compressed with :mod:`app.core.compression`.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from app.core.compression import compress, decompress
+from app.core.config import settings
+from app.core.serialization import dumps
+
+# Formats whose responses also answer a request for another format
+SUBSTITUTE_FORMATS = {"metadata": ("metadata", "full", "raw")}
+
+# Fields of a message resource that change after delivery; left out of records
+MUTABLE_FIELDS = ("labelIds", "historyId")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    key TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_messages_accessed_at ON messages (accessed_at);
+"""
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+
+
+class MessageCache:
+    """
+    Size-bounded on-disk cache of Gmail message resources keyed by ID.
+
+    Entries are keyed by message ID and fetch format, since ``full``, ``raw``
+    and ``metadata`` responses differ. Fields that change after delivery,
+    such as label IDs, are not stored; callers fetch them fresh.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            path: SQLite file holding the cache; an empty path disables it
+            max_bytes: Compressed bytes kept before the least recently used
+                records are evicted
+        """
+        self.path = settings.GMAIL_MESSAGE_CACHE_PATH if path is None else path
+        self.max_bytes = (
+            settings.GMAIL_MESSAGE_CACHE_SIZE if max_bytes is None else max_bytes
+        )
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache is configured to store anything."""
+        return bool(self.path) and self.max_bytes > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection must not be shared with a forked child process
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    @staticmethod
+    def key(message_id: str, fetch_format: str) -> str:
+        """
+        Build the cache key of a message in a fetch format.
+
+        Args:
+            message_id: Gmail message ID
+            fetch_format: Format the message was fetched in
+
+        Returns:
+            str: The cache key
+        """
+        return f"{fetch_format}:{message_id}"
+
+    def get_many(
+        self, message_ids: Iterable[str], fetch_format: str = "full"
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up cached messages.
+
+        Args:
+            message_ids: Gmail message IDs
+            fetch_format: Format the messages are requested in. A request for
+                ``metadata`` is also answered by ``full`` and ``raw`` entries.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Cached message resources keyed by ID,
+            without their MUTABLE_FIELDS
+        """
+        message_ids = list(message_ids)
+        if not self.enabled or not message_ids:
+            return {}
+
+        found: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            connection = self._connect()
+            hits = []
+            for candidate in SUBSTITUTE_FORMATS.get(fetch_format, (fetch_format,)):
+                missing = [
+                    message_id for message_id in message_ids if message_id not in found
+                ]
+                for start in range(0, len(missing), LOOKUP_BATCH_SIZE):
+                    keys = [
+                        self.key(message_id, candidate)
+                        for message_id in missing[start : start + LOOKUP_BATCH_SIZE]
+                    ]
+                    rows = connection.execute(
+                        "SELECT key, data FROM messages WHERE key IN "
+                        f"({','.join('?' * len(keys))})",
+                        keys,
+                    ).fetchall()
+                    for key, data in rows:
+                        try:
+                            message = json.loads(decompress(data))
+                        except (ValueError, zlib.error):
+                            continue
+                        found[message["id"]] = message
+                        hits.append(key)
+
+            if hits:
+                now = time.time()
+                connection.executemany(
+                    "UPDATE messages SET accessed_at = ? WHERE key = ?",
+                    [(now, key) for key in hits],
+                )
+                connection.commit()
+
+        return found
+
+    def put_many(
+        self, messages: Sequence[Dict[str, Any]], fetch_format: str = "full"
+    ) -> None:
+        """
+        Store messages and evict old records if the cache is over its size.
+
+        MUTABLE_FIELDS are left out of the stored records.
+
+        Args:
+            messages: Message resources returned by ``users.messages.get``
+            fetch_format: Format the messages were fetched in
+        """
+        if not self.enabled or not messages:
+            return
+
+        now = time.time()
+        rows = []
+        for message in messages:
+            message = {
+                field: value
+                for field, value in message.items()
+                if field not in MUTABLE_FIELDS
+            }
+            data = compress(dumps(message))
+            rows.append((self.key(message["id"], fetch_format), data, len(data), now))
+
+        with self._lock:
+            connection = self._connect()
+            connection.executemany(
+                "INSERT OR REPLACE INTO messages (key, data, size, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict(connection)
+            connection.commit()
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        total = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM messages"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Evict down to 90% of the limit so evictions do not run on every put
+        excess = total - self.max_bytes * 9 // 10
+        cursor = connection.execute(
+            "SELECT key, size FROM messages ORDER BY accessed_at"
+        )
+        evicted = []
+        for key, size in cursor:
+            evicted.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        connection.executemany("DELETE FROM messages WHERE key = ?", evicted)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the number of cached records and their compressed size.
+
+        Returns:
+            Dict[str, int]: Record count and total bytes
+        """
+        if not self.enabled:
+            return {"messages": 0, "bytes": 0}
+        with self._lock:
+            count, total = (
+                self._connect()
+                .execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM messages")
+                .fetchone()
+            )
+        return {"messages": count, "bytes": total}
+
+    def clear(self) -> None:
+        """Drop every cached message."""
+        if not self.enabled:
+            return
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM messages")
+            connection.commit()
+
+
+# Shared by all requests in the process
+message_cache = MessageCache()
@@ -0,0 +1,511 @@
+"""
+Body extraction from Gmail API message payloads.
+
+Gmail returns a message as a tree of MIME parts. The walker here descends into
+nested ``multipart/*`` parts, honours each part's declared charset and decodes
+base64url bodies incrementally, chunk by chunk, stopping once the configured
+number of characters has been produced. A huge body therefore never exists in
+memory as a fully decoded byte string or text.
+
+Messages fetched with ``format=raw`` are parsed locally from their RFC 822
+source with the stdlib ``email`` package instead, using the same body
+selection and limits, and headers-only parsing when the body is not needed.
+
+HTML-only messages are converted to text by a regular-expression tokenizer fed
+the same decoded chunks, so no document tree is built and the work stops at
+the same cap.
+"""
+
+import base64
+import binascii
+import codecs
+import re
+from email.header import decode_header, make_header
+from email.message import Message
+from email.parser import BytesHeaderParser, BytesParser
+from email.policy import compat32
+from html import unescape
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Base64 characters decoded per step; a multiple of 4 so chunks stay aligned
+DECODE_CHUNK_SIZE = 64 * 1024
+
+# Comments and elements whose content is never visible text, up to their
+# end or, when a chunk ends inside them, to the end of the chunk
+HIDDEN_RE = re.compile(
+    r"<(?:!--.*?(?:(-->)|\Z)"
+    r"|(head|script|style|template|noscript|title)\b.*?(?:(</\2\s*>)|\Z))",
+    re.S | re.I,
+)
+
+# Elements that start a new line in rendered text
+BLOCK_RE = re.compile(
+    r"</?(?:address|article|aside|blockquote|br|dd|div|dl|dt|footer|form"
+    r"|h[1-6]|header|hr|li|ol|p|pre|section|table|td|th|tr|ul)\b[^>]*>",
+    re.I,
+)
+
+BLOCK_BREAK = "\x00"
+
+# Any other tag, doctype or processing instruction
+TAG_RE = re.compile(r"</?[a-zA-Z!?][^>]*>")
+
+# Body part types, in order of preference
+BODY_MIME_TYPES = ("text/plain", "text/html")
+
+
+def headers_of(part: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Get the headers of a payload part keyed by lower-case name.
+
+    Args:
+        part: A Gmail message payload or part
+
+    Returns:
+        Dict[str, str]: Header values keyed by lower-case name
+    """
+    return {
+        header["name"].lower(): header["value"] for header in part.get("headers", [])
+    }
+
+
+def codec_name(charset: Optional[str]) -> str:
+    """
+    Resolve a declared charset to a Python codec name.
+
+    Args:
+        charset: Charset from a Content-Type header, if any
+
+    Returns:
+        str: The codec name if Python knows the charset, ``utf-8`` otherwise
+    """
+    try:
+        return codecs.lookup(charset or "utf-8").name
+    except LookupError:
+        return "utf-8"
+
+
+def part_charset(part: Dict[str, Any]) -> str:
+    """
+    Get the charset a text part is encoded with.
+
+    Args:
+        part: A Gmail message part
+
+    Returns:
+        str: The declared charset if Python knows it, ``utf-8`` otherwise
+    """
+    content_type = headers_of(part).get("content-type")
+    if not content_type:
+        return "utf-8"
+
+    message = Message()
+    message["content-type"] = content_type
+    return codec_name(message.get_content_charset())
+
+
+def is_attachment(part: Dict[str, Any]) -> bool:
+    """
+    Check whether a part is an attachment rather than a body.
+
+    Args:
+        part: A Gmail message part
+
+    Returns:
+        bool: True if the part has a filename or an attachment disposition
+    """
+    if part.get("filename"):
+        return True
+    disposition = headers_of(part).get("content-disposition", "")
+    return disposition.strip().lower().startswith("attachment")
+
+
+def iter_parts(payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Walk the leaf parts of a payload depth-first, in document order.
+
+    Args:
+        payload: A Gmail message payload
+
+    Yields:
+        Dict[str, Any]: Leaf parts, i.e. parts that are not ``multipart/*``
+    """
+    stack: List[Dict[str, Any]] = [payload]
+    while stack:
+        part = stack.pop()
+        children = part.get("parts")
+        if children:
+            stack.extend(reversed(children))
+        elif not part.get("mimeType", "").startswith("multipart/"):
+            yield part
+
+
+def iter_decoded(data: str, charset: str = "utf-8") -> Iterator[str]:
+    """
+    Decode a base64url body incrementally.
+
+    Args:
+        data: The base64url encoded body, as returned by the Gmail API
+        charset: Charset the decoded bytes are in
+
+    Yields:
+        str: Consecutive pieces of the decoded text
+    """
+    decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+
+    for start in range(0, len(data), DECODE_CHUNK_SIZE):
+        chunk = data[start : start + DECODE_CHUNK_SIZE]
+        final = start + DECODE_CHUNK_SIZE >= len(data)
+        if final:
+            # Gmail omits the padding
+            chunk += "=" * (-len(chunk) % 4)
+        try:
+            raw = base64.urlsafe_b64decode(chunk)
+        except (binascii.Error, ValueError):
+            return
+
+        yield decoder.decode(raw, final=final)
+
+
+def iter_text(data: bytes, charset: str = "utf-8") -> Iterator[str]:
+    """
+    Decode a byte string incrementally.
+
+    Args:
+        data: Encoded text
+        charset: Charset of ``data``
+
+    Yields:
+        str: Consecutive pieces of the decoded text
+    """
+    decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+    # Bytes per step; base64 chunks decode to three quarters of their size
+    step = DECODE_CHUNK_SIZE // 4 * 3
+    for start in range(0, len(data), step):
+        yield decoder.decode(data[start : start + step])
+    yield decoder.decode(b"", final=True)
+
+
+def join_text(chunks: Iterable[str], max_chars: int = 0) -> str:
+    """
+    Join decoded text pieces, stopping once enough text has been produced.
+
+    Args:
+        chunks: Consecutive pieces of text
+        max_chars: Stop after this many characters; 0 joins everything
+
+    Returns:
+        str: The text, truncated to ``max_chars``
+    """
+    pieces: List[str] = []
+    produced = 0
+    for text in chunks:
+        pieces.append(text)
+        produced += len(text)
+        if max_chars and produced >= max_chars:
+            break
+
+    body = "".join(pieces)
+    return body[:max_chars] if max_chars else body
+
+
+def decode_body(data: str, charset: str = "utf-8", max_chars: int = 0) -> str:
+    """
+    Decode a base64url body, stopping once enough text has been produced.
+
+    Args:
+        data: The base64url encoded body, as returned by the Gmail API
+        charset: Charset the decoded bytes are in
+        max_chars: Stop after this many characters; 0 decodes everything
+
+    Returns:
+        str: The decoded text, truncated to ``max_chars``
+    """
+    return join_text(iter_decoded(data, charset), max_chars)
+
+
+def safe_cut(html: str) -> int:
+    """
+    Find how much of a partial HTML document can be converted on its own.
+
+    Args:
+        html: The start of an HTML document
+
+    Returns:
+        int: Length of the prefix that does not end inside a tag, a comment
+        or a hidden element
+    """
+    cut = html.rfind(">") + 1
+    for match in HIDDEN_RE.finditer(html, 0, cut):
+        if match.group(1) is None and match.group(3) is None:
+            # Runs to the end of the prefix without being closed
+            return match.start()
+    return cut
+
+
+def collapse_whitespace(text: str, separator: str = "\n") -> str:
+    """
+    Collapse runs of whitespace, keeping one line break between lines.
+
+    A line break is kept at either end if the text had a separator there, or
+    else a single space if it had whitespace there, so collapsed pieces can
+    be joined without merging words.
+
+    Args:
+        text: Text to collapse
+        separator: Character separating lines in ``text``
+
+    Returns:
+        str: The collapsed text, with lines separated by line breaks
+    """
+    lines = [" ".join(line.split()) for line in text.split(separator)]
+    body = "\n".join(line for line in lines if line)
+    if not body:
+        if separator in text:
+            return "\n"
+        return " " if text else ""
+    return _edge(text[0], separator) + body + _edge(text[-1], separator)
+
+
+def _edge(char: str, separator: str) -> str:
+    if char == separator:
+        return "\n"
+    return " " if char.isspace() else ""
+
+
+def convert_html(html: str) -> str:
+    """
+    Convert a self-contained piece of HTML to text.
+
+    Args:
+        html: HTML that does not end inside a tag or hidden element
+
+    Returns:
+        str: Visible text with collapsed whitespace
+    """
+    html = HIDDEN_RE.sub("", html)
+    # Line breaks in the source are plain whitespace, so blocks are marked
+    # with a character that is not
+    html = BLOCK_RE.sub(BLOCK_BREAK, html)
+    html = TAG_RE.sub("", html)
+    return collapse_whitespace(unescape(html), BLOCK_BREAK)
+
+
+def html_to_text(chunks: Iterable[str], max_chars: int = 0) -> str:
+    """
+    Convert HTML to plain text, chunk by chunk.
+
+    Tags are stripped with regular expressions rather than by building a
+    document tree, and each chunk is converted as soon as it is complete, so
+    conversion stops once enough text has been produced.
+
+    Args:
+        chunks: Consecutive pieces of an HTML document
+        max_chars: Stop once this many characters of text have been produced;
+            0 converts the whole document
+
+    Returns:
+        str: The visible text, one line per block, truncated to ``max_chars``
+    """
+    if isinstance(chunks, str):
+        chunks = (chunks,)
+
+    pieces: List[str] = []
+    produced = 0
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        cut = safe_cut(pending)
+        if not cut:
+            continue
+        text = convert_html(pending[:cut])
+        pending = pending[cut:]
+        pieces.append(text)
+        produced += len(text)
+        if max_chars and produced >= max_chars:
+            break
+    else:
+        pieces.append(convert_html(pending))
+
+    text = collapse_whitespace("".join(pieces)).strip()
+    return text[:max_chars] if max_chars else text
+
+
+def find_body_part(
+    payload: Dict[str, Any], mime_types: Tuple[str, ...] = BODY_MIME_TYPES
+) -> Optional[Dict[str, Any]]:
+    """
+    Find the part holding the message body.
+
+    The first inline part of the preferred types wins; otherwise the first
+    inline ``text/*`` part is used.
+
+    Args:
+        payload: A Gmail message payload
+        mime_types: Preferred MIME types, in order of preference
+
+    Returns:
+        Optional[Dict[str, Any]]: The body part, or None if there is no text
+    """
+    candidates = [
+        part
+        for part in iter_parts(payload)
+        if "data" in part.get("body", {}) and not is_attachment(part)
+    ]
+    for mime_type in mime_types:
+        for part in candidates:
+            if part.get("mimeType") == mime_type:
+                return part
+    for part in candidates:
+        if part.get("mimeType", "").startswith("text/"):
+            return part
+    return None
+
+
+def extract_body(payload: Dict[str, Any], max_chars: Optional[int] = None) -> str:
+    """
+    Extract the text body of a message for rule matching.
+
+    A ``text/plain`` part is preferred; HTML-only messages are converted to
+    their visible text.
+
+    Args:
+        payload: A Gmail message payload
+        max_chars: Maximum body length; defaults to GMAIL_BODY_MAX_CHARS,
+            0 keeps the whole body
+
+    Returns:
+        str: The body text, or an empty string if the message has none
+    """
+    max_chars = settings.GMAIL_BODY_MAX_CHARS if max_chars is None else max_chars
+    part = find_body_part(payload)
+    if part is None:
+        return ""
+
+    data, charset = part["body"]["data"], part_charset(part)
+    if part.get("mimeType") == "text/html":
+        return html_to_text(iter_decoded(data, charset), max_chars)
+    return decode_body(data, charset, max_chars)
+
+
+def header_value(value: str) -> str:
+    """
+    Unfold a raw header value and decode its RFC 2047 encoded words.
+
+    Args:
+        value: Header value as it appears in the message source
+
+    Returns:
+        str: The header value as the Gmail API would return it
+    """
+    value = value.replace("\r\n", "").replace("\n", "")
+    if "=?" not in value:
+        return value
+    try:
+        return str(make_header(decode_header(value)))
+    except (LookupError, UnicodeDecodeError, binascii.Error, ValueError):
+        return value
+
+
+def find_raw_body_part(
+    message: Message, mime_types: Tuple[str, ...] = BODY_MIME_TYPES
+) -> Optional[Message]:
+    """
+    Find the part holding the body of a parsed message.
+
+    Uses the same preference as :func:`find_body_part`.
+
+    Args:
+        message: A parsed RFC 822 message
+        mime_types: Preferred MIME types, in order of preference
+
+    Returns:
+        Optional[Message]: The body part, or None if there is no text
+    """
+    candidates = [
+        part
+        for part in message.walk()
+        if not part.is_multipart()
+        and not part.get_filename()
+        and not str(part.get("content-disposition", ""))
+        .strip()
+        .lower()
+        .startswith("attachment")
+    ]
+    for mime_type in mime_types:
+        for part in candidates:
+            if part.get_content_type() == mime_type:
+                return part
+    for part in candidates:
+        if part.get_content_maintype() == "text":
+            return part
+    return None
+
+
+def raw_headers(raw: str) -> bytes:
+    """
+    Decode only the header block of a base64url encoded message.
+
+    Args:
+        raw: The base64url encoded RFC 822 message
+
+    Returns:
+        bytes: The message source up to and including the blank line ending
+        the headers, or the whole message if it has no body
+    """
+    data = b""
+    # Decoded 4 KiB at a time; a multiple of 4 keeps the chunks aligned
+    step = 4 * 1024 // 3 * 4
+    for start in range(0, len(raw), step):
+        chunk = raw[start : start + step]
+        chunk += "=" * (-len(chunk) % 4)
+        # Look back a few bytes in case the blank line spans two chunks
+        search_from = max(len(data) - 3, 0)
+        data += base64.urlsafe_b64decode(chunk)
+        for separator in (b"\r\n\r\n", b"\n\n"):
+            end = data.find(separator, search_from)
+            if end != -1:
+                return data[: end + len(separator)]
+    return data
+
+
+def parse_raw(
+    raw: str, headers_only: bool = False, max_chars: Optional[int] = None
+) -> Tuple[Dict[str, str], str]:
+    """
+    Parse a message fetched with ``format=raw``.
+
+    The compat32 policy keeps headers as plain strings instead of building
+    header objects, which is the fastest way through the ``email`` package.
+
+    Args:
+        raw: The base64url encoded RFC 822 message
+        headers_only: Parse the headers only and leave the body empty
+        max_chars: Maximum body length; defaults to GMAIL_BODY_MAX_CHARS,
+            0 keeps the whole body
+
+    Returns:
+        Tuple[Dict[str, str], str]: Headers keyed by lower-case name, and the
+        body text
+    """
+    if headers_only:
+        message = BytesHeaderParser(policy=compat32).parsebytes(raw_headers(raw))
+        return {name.lower(): header_value(v) for name, v in message.items()}, ""
+
+    data = base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4))
+    message = BytesParser(policy=compat32).parsebytes(data)
+    headers = {name.lower(): header_value(value) for name, value in message.items()}
+
+    max_chars = settings.GMAIL_BODY_MAX_CHARS if max_chars is None else max_chars
+    part = find_raw_body_part(message)
+    if part is None:
+        return headers, ""
+
+    content = part.get_payload(decode=True) or b""
+    charset = codec_name(part.get_content_charset())
+
+    if part.get_content_type() == "text/html":
+        return headers, html_to_text(iter_text(content, charset), max_chars)
+    return headers, join_text(iter_text(content, charset), max_chars)
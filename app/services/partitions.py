@@ -0,0 +1,292 @@
+"""
+Maintenance of the monthly partitions of the emails table.
+
+On PostgreSQL the ``emails`` table is range-partitioned by ``received_date``,
+one partition per month, named ``emails_yYYYYmMM``. Rows outside every month
+partition land in ``emails_default``. Queries bounded on ``received_date``
+only read the partitions overlapping their range, and old mail is removed by
+dropping whole partitions instead of deleting rows.
+"""
+
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.email_body_archive import EmailBodyArchive
+from app.models.email_id import EmailId
+
+PARENT_TABLE = "emails"
+DEFAULT_PARTITION = "emails_default"
+PARTITION_NAME_RE = re.compile(r"^emails_y(\d{4})m(\d{2})$")
+
+PARTITIONS_STATEMENT = text(
+    "SELECT child.relname FROM pg_inherits "
+    "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+    "WHERE parent.relname = :parent"
+)
+
+DEFAULT_MONTHS_STATEMENT = text(
+    f"SELECT DISTINCT date_trunc('month', received_date) FROM {DEFAULT_PARTITION}"
+)
+
+
+def month_start(value: datetime) -> datetime:
+    """
+    Get the start of the month a time falls in.
+
+    Args:
+        value: A naive UTC time
+
+    Returns:
+        datetime: Midnight on the first day of its month
+    """
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    """
+    Get the start of the month a number of months away.
+
+    Args:
+        month: Start of a month
+        months: Number of months to move, possibly negative
+
+    Returns:
+        datetime: Start of the resulting month
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    """
+    Get the name of the partition holding a month.
+
+    Args:
+        month: Any time in the month
+
+    Returns:
+        str: The partition name, e.g. ``emails_y2024m01``
+    """
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[datetime]:
+    """
+    Get the month a partition holds from its name.
+
+    Args:
+        name: Partition name
+
+    Returns:
+        Optional[datetime]: Start of the month, or None for partitions that
+        do not hold a single month, such as the default partition
+    """
+    match = PARTITION_NAME_RE.match(name)
+    if match is None:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+class PartitionService:
+    """
+    Service for creating and dropping monthly partitions of the emails table.
+
+    Partitions are created ahead of time, so incoming mail never lands in the
+    default partition, which would have to be scanned whenever a partition
+    for its month is created. Other databases have no partitions and every
+    method is a no-op there.
+    """
+
+    @staticmethod
+    def supported(db: Session) -> bool:
+        """
+        Check whether the database partitions the emails table.
+
+        Args:
+            db: Database session
+
+        Returns:
+            bool: True on PostgreSQL
+        """
+        return db.get_bind().dialect.name == "postgresql"
+
+    @staticmethod
+    def get_partitions(db: Session) -> List[str]:
+        """
+        Get the partitions of the emails table.
+
+        Args:
+            db: Database session
+
+        Returns:
+            List[str]: Partition names, sorted
+        """
+        if not PartitionService.supported(db):
+            return []
+        return sorted(
+            db.execute(PARTITIONS_STATEMENT, {"parent": PARENT_TABLE}).scalars()
+        )
+
+    @staticmethod
+    def ensure_partitions(
+        db: Session,
+        months_ahead: Optional[int] = None,
+        start: Optional[datetime] = None,
+    ) -> List[str]:
+        """
+        Create the missing monthly partitions from a month on.
+
+        Months with mail in the default partition also get their partition,
+        however old, so their queries are pruned and retention drops them.
+        Their rows are moved out of the default partition, which could not
+        overlap the new partition otherwise.
+
+        Args:
+            db: Database session
+            months_ahead: Months after the current one to create partitions
+                for; defaults to EMAIL_PARTITION_MONTHS_AHEAD
+            start: First month to create a partition for; defaults to the
+                current month
+
+        Returns:
+            List[str]: Names of the created partitions
+        """
+        if not PartitionService.supported(db):
+            return []
+        months_ahead = (
+            settings.EMAIL_PARTITION_MONTHS_AHEAD
+            if months_ahead is None
+            else months_ahead
+        )
+        current = month_start(datetime.utcnow())
+        month = month_start(start) if start is not None else current
+        last = add_months(current, max(months_ahead, 0))
+
+        existing = set(PartitionService.get_partitions(db))
+        months = set()
+        while month <= last:
+            months.add(month)
+            month = add_months(month, 1)
+        stranded = set()
+        if DEFAULT_PARTITION in existing:
+            stranded = {
+                month_start(value)
+                for value in db.execute(DEFAULT_MONTHS_STATEMENT).scalars()
+            }
+
+        created = []
+        for month in sorted(months | stranded):
+            name = partition_name(month)
+            if name in existing:
+                continue
+            # Identifiers are built from digits only
+            bounds = (
+                f"FROM ('{month.isoformat()}') "
+                f"TO ('{add_months(month, 1).isoformat()}')"
+            )
+            if month in stranded:
+                db.execute(
+                    text(
+                        f"CREATE TABLE {name} "
+                        f"(LIKE {PARENT_TABLE} INCLUDING DEFAULTS)"
+                    )
+                )
+                db.execute(
+                    text(
+                        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                        f"WHERE received_date >= '{month.isoformat()}' "
+                        f"AND received_date < '{add_months(month, 1).isoformat()}' "
+                        f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+                    )
+                )
+                db.execute(
+                    text(
+                        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+                        f"FOR VALUES {bounds}"
+                    )
+                )
+            else:
+                db.execute(
+                    text(
+                        f"CREATE TABLE IF NOT EXISTS {name} "
+                        f"PARTITION OF {PARENT_TABLE} FOR VALUES {bounds}"
+                    )
+                )
+            created.append(name)
+
+        db.commit()
+        return created
+
+    @staticmethod
+    def drop_partitions_before(db: Session, before: datetime) -> List[str]:
+        """
+        Drop the monthly partitions that only hold mail received before a time.
+
+        Dropping a partition removes its emails without scanning or deleting
+        rows one by one, and leaves no dead tuples behind. Their claimed Gmail
+        IDs and archived bodies are deleted by indexed received date range.
+
+        Args:
+            db: Database session
+            before: Partitions whose month ends at or before this time are
+                dropped
+
+        Returns:
+            List[str]: Names of the dropped partitions
+        """
+        dropped = []
+        for name in PartitionService.get_partitions(db):
+            month = partition_month(name)
+            if month is None or add_months(month, 1) > before:
+                continue
+            db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            db.execute(text(f"DROP TABLE {name}"))
+            # Release the Gmail IDs and archived bodies of the dropped emails
+            for model in (EmailId, EmailBodyArchive):
+                db.execute(
+                    delete(model).where(
+                        model.received_date >= month,
+                        model.received_date < add_months(month, 1),
+                    )
+                )
+            dropped.append(name)
+
+        db.commit()
+        return dropped
+
+    @staticmethod
+    def maintain(
+        db: Session,
+        months_ahead: Optional[int] = None,
+        retention_months: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Create upcoming partitions and drop expired ones.
+
+        Args:
+            db: Database session
+            months_ahead: Months after the current one to create partitions
+                for; defaults to EMAIL_PARTITION_MONTHS_AHEAD
+            retention_months: Whole months of mail kept before the current
+                one; defaults to EMAIL_PARTITION_RETENTION_MONTHS, 0 keeps all
+
+        Returns:
+            Dict[str, Any]: Names of the created and dropped partitions
+        """
+        retention_months = (
+            settings.EMAIL_PARTITION_RETENTION_MONTHS
+            if retention_months is None
+            else retention_months
+        )
+        created = PartitionService.ensure_partitions(db, months_ahead)
+        dropped = []
+        if retention_months > 0:
+            cutoff = add_months(month_start(datetime.utcnow()), -retention_months)
+            dropped = PartitionService.drop_partitions_before(db, cutoff)
+        return {"created": created, "dropped": dropped}
@@ -0,0 +1,358 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.result_cache import prepare_rules, rule_result_cache
+from app.core.rule_engine import RuleEngine
+from app.services.action_log import ActionLogService
+from app.services.rule import RuleService
+
+
+class ProcessingService:
+    """Service for evaluating rules against fetched emails and applying actions."""
+
+    @staticmethod
+    def rules_read_body(db: Session) -> bool:
+        """
+        Check whether any rule has a condition on the message body.
+
+        Messages fetched only to be evaluated can skip their bodies otherwise.
+
+        Args:
+            db: Database session
+
+        Returns:
+            bool: True if a rule condition reads the message body
+        """
+        return "message" in prepare_rules(RuleService.get_rules(db)).fields
+
+    @staticmethod
+    def process_messages(
+        db: Session,
+        messages: List[Dict[str, Any]],
+        reprocess: bool = False,
+        service: Optional[Any] = None,
+        by_thread: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Evaluate rules against messages and apply the resulting actions.
+
+        Actions for all messages are grouped by the label changes they make
+        and applied with batched Gmail modifies. Every action is logged with an
+        idempotency key, so an action is never applied to the same email twice.
+
+        Args:
+            db: Database session
+            messages: Messages as returned by ``GmailService.list_messages``
+            reprocess: Evaluate emails whose logged actions were all applied again
+            service: Gmail API service used to apply actions. Built with the
+                modify scope when not given.
+            by_thread: Evaluate the latest message of each thread only and
+                apply its actions to every message of the thread
+
+        Returns:
+            Dict[str, Any]: Actions per message, skipped message IDs and the
+            execution summary
+        """
+        from app.services.action_executor import ActionExecutor
+        from app.services.gmail_service import MODIFY_SCOPES, GmailService
+        from app.services.thread import ThreadService
+
+        # Skip emails processed by a previous run
+        skipped = set()
+        if not reprocess:
+            skipped = ActionLogService.get_processed_gmail_ids(
+                db, [message["id"] for message in messages]
+            )
+
+        # Process messages against rules
+        rules = RuleService.get_rules(db)
+        evaluated = [message for message in messages if message["id"] not in skipped]
+        if by_thread:
+            actions_by_message = ThreadService.evaluate(rules, evaluated)
+        else:
+            actions_by_message = {
+                message["id"]: RuleEngine.reduce_actions(actions)
+                for message, actions in zip(
+                    evaluated, rule_result_cache.process_emails(rules, evaluated)
+                )
+            }
+
+        # Log the actions and apply those not applied yet
+        pending = ActionLogService.record_actions(db, actions_by_message)
+        if service is None:
+            service = GmailService.build_service(scopes=MODIFY_SCOPES)
+        result = ActionExecutor(service).execute(pending)
+        ActionLogService.mark_results(db, pending, result)
+
+        result["actions"] = actions_by_message
+        result["skipped"] = sorted(skipped)
+        return result
+
+    @staticmethod
+    def sync_mailbox(
+        db: Session,
+        max_results: int = 10,
+        query: str = "in:inbox",
+        store: bool = True,
+        reprocess: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Fetch a batch of messages, store them, evaluate rules and apply actions.
+
+        Args:
+            db: Database session
+            max_results: Maximum number of messages to fetch
+            query: Gmail search query
+            store: Store the fetched messages in the database
+            reprocess: Evaluate emails whose logged actions were all applied again
+
+        Returns:
+            Dict[str, Any]: Summary of the run
+        """
+        from app.services.email import EmailService
+        from app.services.gmail_service import GmailService
+
+        # Stored emails keep their bodies for later evaluations
+        headers_only = not store and not ProcessingService.rules_read_body(db)
+        messages = GmailService.list_messages(
+            max_results=max_results, query=query, headers_only=headers_only
+        )
+
+        if store:
+            from app.services.scheduler import SchedulerService
+
+            emails = [EmailService.create_email(db, message) for message in messages]
+            SchedulerService.schedule(db, emails)
+
+        result = ProcessingService.process_messages(db, messages, reprocess=reprocess)
+
+        return {
+            "fetched": len(messages),
+            "stored": len(messages) if store else 0,
+            "skipped": len(result["skipped"]),
+            "requests": result["requests"],
+            "modified": len(result["modified"]),
+            "errors": result["errors"],
+        }
+
+    @staticmethod
+    def apply_rules_to_stored_emails(
+        db: Session,
+        batch_size: int = 10000,
+        processes: Optional[int] = None,
+        reprocess: bool = False,
+        execute: bool = True,
+        service: Optional[Any] = None,
+        by_thread: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Evaluate rules retroactively against every stored email.
+
+        Emails are read in keyset-paginated batches and each batch is evaluated
+        in a process pool, so the run scales with the number of cores. Emails
+        received outside the dates the rules can match are not read.
+        Evaluated per thread, only the latest email of each thread is read and
+        evaluated, in this process.
+
+        Args:
+            db: Database session
+            batch_size: Emails read from the database per batch
+            processes: Number of evaluation processes; defaults to the
+                configured EVALUATION_PROCESSES
+            reprocess: Evaluate emails whose logged actions were all applied again
+            execute: Apply the resulting actions in Gmail; otherwise they are
+                only logged
+            service: Gmail API service used to apply actions. Built with the
+                modify scope when not given.
+            by_thread: Evaluate the latest email of each thread only and apply
+                its actions to every email of the thread
+
+        Returns:
+            Dict[str, Any]: Summary of the run
+        """
+        if by_thread:
+            return ProcessingService.apply_rules_to_stored_threads(
+                db,
+                batch_size=batch_size,
+                reprocess=reprocess,
+                execute=execute,
+                service=service,
+            )
+
+        from app.core.evaluation_pool import EvaluationPool
+        from app.models.email import Email
+        from app.services.action_executor import ActionExecutor
+        from app.services.gmail_service import MODIFY_SCOPES, GmailService
+
+        if execute and service is None:
+            service = GmailService.build_service(scopes=MODIFY_SCOPES)
+
+        summary = {
+            "evaluated": 0,
+            "matched": 0,
+            "skipped": 0,
+            "requests": 0,
+            "modified": 0,
+            "errors": {},
+        }
+        stmt = (
+            select(
+                Email.id,
+                Email.gmail_id,
+                Email.from_address,
+                Email.from_email,
+                Email.from_domain,
+                Email.subject,
+                Email.body,
+                Email.received_date,
+                Email.label_ids,
+            )
+            .order_by(Email.id)
+            .limit(batch_size)
+        )
+
+        # Emails outside the dates the rules can match are not read, so only
+        # the overlapping monthly partitions are scanned
+        rules = RuleService.get_rules(db)
+        as_of = RuleEngine.as_of()
+        received_after, received_before = RuleEngine.received_window(rules, as_of)
+        if received_after is not None:
+            stmt = stmt.where(Email.received_date > received_after)
+        if received_before is not None:
+            stmt = stmt.where(Email.received_date < received_before)
+
+        with EvaluationPool(rules, processes=processes) as pool:
+            last_id = None
+            while True:
+                page_stmt = stmt if last_id is None else stmt.where(Email.id > last_id)
+                rows = db.execute(page_stmt).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                skipped = set()
+                if not reprocess:
+                    skipped = ActionLogService.get_processed_gmail_ids(
+                        db, [row.gmail_id for row in rows]
+                    )
+                emails = [
+                    {
+                        "id": row.gmail_id,
+                        "from": row.from_address,
+                        "from_email": row.from_email,
+                        "from_domain": row.from_domain,
+                        "subject": row.subject,
+                        "message": row.body,
+                        "received_date": row.received_date,
+                        "label_ids": row.label_ids,
+                    }
+                    for row in rows
+                    if row.gmail_id not in skipped
+                ]
+
+                actions_by_message = {
+                    email["id"]: RuleEngine.reduce_actions(actions)
+                    for email, actions in zip(emails, pool.evaluate(emails, as_of))
+                    if actions
+                }
+                summary["evaluated"] += len(emails)
+                summary["matched"] += len(actions_by_message)
+                summary["skipped"] += len(skipped)
+
+                pending = ActionLogService.record_actions(db, actions_by_message)
+                if execute and pending:
+                    result = ActionExecutor(service).execute(pending)
+                    ActionLogService.mark_results(db, pending, result)
+                    summary["requests"] += result["requests"]
+                    summary["modified"] += len(result["modified"])
+                    summary["errors"].update(result["errors"])
+
+                if len(rows) < batch_size:
+                    break
+
+        return summary
+
+    @staticmethod
+    def apply_rules_to_stored_threads(
+        db: Session,
+        batch_size: int = 10000,
+        reprocess: bool = False,
+        execute: bool = True,
+        service: Optional[Any] = None,
+    ) -> Dict[str, Any]:
+        """
+        Evaluate rules retroactively once per stored thread.
+
+        The latest email of each thread is evaluated and the resulting actions
+        are applied to every email of the thread. Emails whose logged actions
+        were all applied are left out unless ``reprocess`` is set; a thread is
+        evaluated only if one of its emails is left.
+
+        Args:
+            db: Database session
+            batch_size: Threads read from the database per batch
+            reprocess: Evaluate emails whose logged actions were all applied again
+            execute: Apply the resulting actions in Gmail; otherwise they are
+                only logged
+            service: Gmail API service used to apply actions. Built with the
+                modify scope when not given.
+
+        Returns:
+            Dict[str, Any]: Summary of the run
+        """
+        from app.services.action_executor import ActionExecutor
+        from app.services.gmail_service import MODIFY_SCOPES, GmailService
+        from app.services.thread import ThreadService
+
+        if execute and service is None:
+            service = GmailService.build_service(scopes=MODIFY_SCOPES)
+
+        summary = {
+            "threads": 0,
+            "evaluated": 0,
+            "matched": 0,
+            "skipped": 0,
+            "requests": 0,
+            "modified": 0,
+            "errors": {},
+        }
+        rules = RuleService.get_rules(db)
+
+        for threads in ThreadService.iter_stored_threads(db, batch_size):
+            skipped = set()
+            if not reprocess:
+                skipped = ActionLogService.get_processed_gmail_ids(
+                    db, [gmail_id for _, members in threads for gmail_id in members]
+                )
+            threads = [
+                (latest, [gmail_id for gmail_id in members if gmail_id not in skipped])
+                for latest, members in threads
+            ]
+            threads = [(latest, members) for latest, members in threads if members]
+
+            results = rule_result_cache.process_emails(
+                rules, [latest for latest, _ in threads]
+            )
+            actions_by_message = {}
+            for (_, members), actions in zip(threads, results):
+                if actions:
+                    reduced = RuleEngine.reduce_actions(actions)
+                    actions_by_message.update(
+                        {gmail_id: reduced for gmail_id in members}
+                    )
+            summary["threads"] += len(threads)
+            summary["evaluated"] += sum(len(members) for _, members in threads)
+            summary["matched"] += len(actions_by_message)
+            summary["skipped"] += len(skipped)
+
+            pending = ActionLogService.record_actions(db, actions_by_message)
+            if execute and pending:
+                result = ActionExecutor(service).execute(pending)
+                ActionLogService.mark_results(db, pending, result)
+                summary["requests"] += result["requests"]
+                summary["modified"] += len(result["modified"])
+                summary["errors"].update(result["errors"])
+
+        return summary
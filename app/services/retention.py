@@ -0,0 +1,189 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.compression import compress, decompress
+from app.core.config import settings
+from app.models.email import Email
+from app.models.email_body_archive import EmailBodyArchive
+
+RETENTION_MODES = ("archive", "drop")
+
+
+def body_hash(body: bytes) -> str:
+    """
+    Hash an email body.
+
+    Args:
+        body: The UTF-8 encoded body
+
+    Returns:
+        str: Hex SHA-256 digest of the body
+    """
+    return hashlib.sha256(body).hexdigest()
+
+
+def decode_body(data: bytes) -> str:
+    """
+    Decode a body stored in the archive.
+
+    Args:
+        data: Compressed body
+
+    Returns:
+        str: The body
+    """
+    return decompress(data).decode("utf-8")
+
+
+class RetentionService:
+    """
+    Service for moving old email bodies out of the emails table.
+
+    Past the retention age, a body is either moved to the compressed
+    ``email_body_archive`` table or dropped. Either way the headers stay and
+    the body's hash is kept. Emails are processed oldest first in short
+    batches, each in its own transaction, and rows locked by other
+    transactions are skipped, so the run never holds long locks.
+
+    Rules on the ``message`` field no longer match emails whose body was
+    archived or dropped.
+    """
+
+    @staticmethod
+    def archive_bodies(
+        db: Session,
+        older_than_days: Optional[int] = None,
+        mode: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        as_of: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Archive or drop the bodies of emails received before the retention age.
+
+        Args:
+            db: Database session
+            older_than_days: Age in days past which bodies are removed;
+                defaults to EMAIL_BODY_RETENTION_DAYS, 0 keeps every body
+            mode: ``archive`` or ``drop``; defaults to
+                EMAIL_BODY_RETENTION_MODE
+            batch_size: Emails processed per transaction; defaults to
+                EMAIL_BODY_RETENTION_BATCH_SIZE
+            as_of: Time the age is measured from; defaults to now
+
+        Returns:
+            Dict[str, Any]: Number of emails processed and body bytes removed
+
+        Raises:
+            ValueError: If the mode is not supported
+        """
+        older_than_days = (
+            settings.EMAIL_BODY_RETENTION_DAYS
+            if older_than_days is None
+            else older_than_days
+        )
+        mode = mode or settings.EMAIL_BODY_RETENTION_MODE
+        batch_size = batch_size or settings.EMAIL_BODY_RETENTION_BATCH_SIZE
+        if mode not in RETENTION_MODES:
+            raise ValueError(f"Invalid retention mode: {mode}")
+
+        summary = {"mode": mode, "emails": 0, "archived": 0, "bytes": 0}
+        if older_than_days <= 0:
+            return summary
+
+        now = as_of or datetime.utcnow()
+        cutoff = now - timedelta(days=older_than_days)
+        # Bounded on the partition key and served by the partial index of
+        # emails not through retention yet
+        stmt = (
+            select(Email.id, Email.gmail_id, Email.received_date, Email.body)
+            .where(Email.received_date < cutoff, Email.body_archived_at.is_(None))
+            .order_by(Email.received_date)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+
+        while True:
+            rows = db.execute(stmt).all()
+            if not rows:
+                break
+
+            archived, values = [], []
+            for row in rows:
+                body = (row.body or "").encode("utf-8")
+                if body and mode == "archive":
+                    archived.append(
+                        {
+                            "email_id": row.id,
+                            "gmail_id": row.gmail_id,
+                            "received_date": row.received_date,
+                            "body": compress(body),
+                            "archived_at": now,
+                        }
+                    )
+                values.append(
+                    {
+                        # The primary key includes the partition key
+                        "id": row.id,
+                        "received_date": row.received_date,
+                        "body": None,
+                        "body_hash": body_hash(body) if body else None,
+                        "body_archived_at": now,
+                    }
+                )
+                summary["bytes"] += len(body)
+
+            if archived:
+                db.execute(insert(EmailBodyArchive), archived)
+            db.execute(update(Email), values)
+            db.commit()
+            summary["emails"] += len(rows)
+            summary["archived"] += len(archived)
+
+            if len(rows) < batch_size:
+                break
+
+        return summary
+
+    @staticmethod
+    def get_archived_body(db: Session, email_id: Any) -> Optional[str]:
+        """
+        Get the archived body of an email.
+
+        Args:
+            db: Database session
+            email_id: Email ID
+
+        Returns:
+            Optional[str]: The body, or None if it was not archived
+        """
+        data = db.execute(
+            select(EmailBodyArchive.body).where(EmailBodyArchive.email_id == email_id)
+        ).scalar()
+        return None if data is None else decode_body(data)
+
+
+class AsyncRetentionService:
+    """Async read path for archived bodies, used by the hot API routes."""
+
+    @staticmethod
+    async def get_archived_body(db: AsyncSession, email_id: Any) -> Optional[str]:
+        """
+        Get the archived body of an email.
+
+        Args:
+            db: Async database session
+            email_id: Email ID
+
+        Returns:
+            Optional[str]: The body, or None if it was not archived
+        """
+        result = await db.execute(
+            select(EmailBodyArchive.body).where(EmailBodyArchive.email_id == email_id)
+        )
+        data = result.scalar()
+        return None if data is None else decode_body(data)
@@ -2,11 +2,31 @@ from typing import List, Optional, Dict, Any
 from uuid import UUID
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
 from app.models.rule import Rule, Condition, Action
 from app.schemas.rule import RuleCreate, RuleUpdate
 
+# Hot lookups are built once and reused by the sync and async services. Values
+# are passed as bound parameters, so each statement has a single cache key and
+# is compiled once per engine. Listings load conditions and actions up front
+# since the rule engine and the API schema read them for every rule, and are
+# ordered by creation so rule precedence is deterministic.
+RULES_STATEMENT = (
+    select(Rule)
+    .options(selectinload(Rule.conditions), selectinload(Rule.actions))
+    .order_by(Rule.created_at, Rule.id)
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+RULE_BY_ID_STATEMENT = select(Rule).where(Rule.id == bindparam("rule_id"))
+# Lazy loading is not available on an AsyncSession
+ASYNC_RULE_BY_ID_STATEMENT = RULE_BY_ID_STATEMENT.options(
+    selectinload(Rule.conditions), selectinload(Rule.actions)
+)
+
 
 class RuleService:
     """
@@ -26,7 +46,9 @@ class RuleService:
         Returns:
             List[Rule]: List of rules
         """
-        return db.query(Rule).offset(skip).limit(limit).all()
+        return list(
+            db.execute(RULES_STATEMENT, {"skip": skip, "limit": limit}).scalars().all()
+        )
 
     @staticmethod
     def get_rule(db: Session, rule_id: UUID) -> Optional[Rule]:
@@ -40,7 +62,7 @@ class RuleService:
         Returns:
             Optional[Rule]: The rule if found, None otherwise
         """
-        return db.query(Rule).filter(Rule.id == rule_id).first()
+        return db.execute(RULE_BY_ID_STATEMENT, {"rule_id": rule_id}).scalars().first()
 
     @staticmethod
     def create_rule(db: Session, rule_in: RuleCreate) -> Rule:
@@ -155,3 +177,45 @@ class RuleService:
         db.delete(db_rule)
         db.commit()
         return True
+
+
+class AsyncRuleService:
+    """
+    Async read path for rules, used by the hot API routes.
+
+    Relationships are eager loaded because lazy loading is not available on
+    an ``AsyncSession``.
+    """
+
+    @staticmethod
+    async def get_rules(
+        db: AsyncSession, skip: int = 0, limit: int = 100
+    ) -> List[Rule]:
+        """
+        Get all rules.
+
+        Args:
+            db: Async database session
+            skip: Number of records to skip
+            limit: Maximum number of records to return
+
+        Returns:
+            List[Rule]: List of rules
+        """
+        result = await db.execute(RULES_STATEMENT, {"skip": skip, "limit": limit})
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_rule(db: AsyncSession, rule_id: UUID) -> Optional[Rule]:
+        """
+        Get a rule by ID.
+
+        Args:
+            db: Async database session
+            rule_id: ID of the rule to get
+
+        Returns:
+            Optional[Rule]: The rule if found, None otherwise
+        """
+        result = await db.execute(ASYNC_RULE_BY_ID_STATEMENT, {"rule_id": rule_id})
+        return result.scalars().first()
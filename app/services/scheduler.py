@@ -0,0 +1,224 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session, undefer
+
+from app.core.config import settings
+from app.core.rule_engine import CompiledRule, RuleEngine
+from app.models.email import Email
+from app.services.action_log import ActionLogService
+from app.services.rule import RuleService
+
+# Emails due for re-evaluation, earliest first. Rows locked by another
+# scheduler are skipped, so several workers can run the scheduler at once.
+DUE_EMAILS_STATEMENT = (
+    select(Email)
+    .options(undefer(Email.body))
+    .where(Email.next_evaluation_at <= bindparam("as_of"))
+    .order_by(Email.next_evaluation_at)
+    .limit(bindparam("limit"))
+    .with_for_update(skip_locked=True)
+)
+
+
+class SchedulerService:
+    """
+    Service for re-evaluating stored emails when their date conditions flip.
+
+    Each email records in ``next_evaluation_at`` the next time a date
+    condition could change the rules' result for it. Only emails whose time
+    has passed are re-evaluated, with an indexed query, instead of scanning
+    every stored email.
+    """
+
+    @staticmethod
+    def rule_input(email: Email) -> Dict[str, Any]:
+        """
+        Build the email data the rule engine reads from a stored email.
+
+        Args:
+            email: Stored email
+
+        Returns:
+            Dict[str, Any]: Email data keyed by Gmail ID
+        """
+        return {
+            "id": email.gmail_id,
+            "from": email.from_address,
+            "from_email": email.from_email,
+            "from_domain": email.from_domain,
+            "subject": email.subject,
+            "message": email.body,
+            "received_date": email.received_date,
+            "label_ids": email.label_ids,
+        }
+
+    @staticmethod
+    def next_evaluation(
+        rules: Sequence[CompiledRule], email: Dict[str, Any], as_of: datetime
+    ) -> Optional[datetime]:
+        """
+        Get the next time an email must be re-evaluated.
+
+        Args:
+            rules: Compiled rules
+            email: Email data
+            as_of: Time the email was evaluated at
+
+        Returns:
+            Optional[datetime]: The next flip strictly after ``as_of``, or
+            None if the result can no longer change
+        """
+        flip = RuleEngine.next_flip(rules, email, as_of)
+        if flip is not None and flip <= as_of:
+            # The flip takes effect from the next bucket on
+            flip = as_of + timedelta(seconds=max(settings.RULE_DATE_BUCKET, 1))
+        return flip
+
+    @staticmethod
+    def schedule(
+        db: Session,
+        emails: Sequence[Email],
+        rules: Optional[Sequence[Any]] = None,
+        as_of: Optional[datetime] = None,
+    ) -> None:
+        """
+        Record the next evaluation time of emails.
+
+        Args:
+            db: Database session
+            emails: Stored emails
+            rules: Rules in evaluation order; loaded when not given
+            as_of: Time the emails were evaluated at
+        """
+        compiled = RuleEngine.compile_rules(
+            RuleService.get_rules(db) if rules is None else rules
+        )
+        as_of = as_of or RuleEngine.as_of()
+        for email in emails:
+            email.next_evaluation_at = SchedulerService.next_evaluation(
+                compiled, SchedulerService.rule_input(email), as_of
+            )
+        db.commit()
+
+    @staticmethod
+    def reschedule_all(db: Session, batch_size: int = 10000) -> Dict[str, int]:
+        """
+        Recompute the next evaluation time of every stored email.
+
+        This is needed after the rules change, since other date conditions
+        flip at other times.
+
+        Args:
+            db: Database session
+            batch_size: Emails updated per batch
+
+        Returns:
+            Dict[str, int]: Number of emails updated and scheduled
+        """
+        compiled = RuleEngine.compile_rules(RuleService.get_rules(db))
+        as_of = RuleEngine.as_of()
+        stmt = (
+            select(Email.id, Email.received_date).order_by(Email.id).limit(batch_size)
+        )
+
+        updated = scheduled = 0
+        last_id = None
+        while True:
+            page_stmt = stmt if last_id is None else stmt.where(Email.id > last_id)
+            rows = db.execute(page_stmt).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            values = [
+                {
+                    # The primary key includes the partition key
+                    "id": row.id,
+                    "received_date": row.received_date,
+                    "next_evaluation_at": SchedulerService.next_evaluation(
+                        compiled, {"received_date": row.received_date}, as_of
+                    ),
+                }
+                for row in rows
+            ]
+            db.execute(update(Email), values)
+            db.commit()
+            updated += len(values)
+            scheduled += sum(
+                1 for value in values if value["next_evaluation_at"] is not None
+            )
+
+            if len(rows) < batch_size:
+                break
+
+        return {"updated": updated, "scheduled": scheduled}
+
+    @staticmethod
+    def process_due(
+        db: Session,
+        as_of: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        execute: bool = True,
+        service: Optional[Any] = None,
+    ) -> Dict[str, Any]:
+        """
+        Re-evaluate emails whose next evaluation time has passed.
+
+        The resulting actions are logged and applied like any other run, so
+        actions already applied to an email are not applied again.
+
+        Args:
+            db: Database session
+            as_of: Time to evaluate at; defaults to ``RuleEngine.as_of()``
+            limit: Maximum number of emails to re-evaluate
+            execute: Apply the resulting actions in Gmail; otherwise they are
+                only logged
+            service: Gmail API service used to apply actions. Built with the
+                modify scope when needed and not given.
+
+        Returns:
+            Dict[str, Any]: Summary of the run
+        """
+        as_of = as_of or RuleEngine.as_of()
+        limit = limit or settings.SCHEDULER_BATCH_SIZE
+
+        emails: List[Email] = (
+            db.execute(DUE_EMAILS_STATEMENT, {"as_of": as_of, "limit": limit})
+            .scalars()
+            .all()
+        )
+        summary = {"evaluated": len(emails), "matched": 0, "modified": 0, "errors": {}}
+        if not emails:
+            db.rollback()
+            return summary
+
+        compiled = RuleEngine.compile_rules(RuleService.get_rules(db))
+        actions_by_message = {}
+        for email in emails:
+            data = SchedulerService.rule_input(email)
+            actions = RuleEngine.process_email(compiled, data, as_of)
+            if actions:
+                actions_by_message[email.gmail_id] = RuleEngine.reduce_actions(actions)
+            email.next_evaluation_at = SchedulerService.next_evaluation(
+                compiled, data, as_of
+            )
+        summary["matched"] = len(actions_by_message)
+
+        # Logging the actions commits the new evaluation times too
+        pending = ActionLogService.record_actions(db, actions_by_message)
+        db.commit()
+
+        if execute and pending:
+            from app.services.action_executor import ActionExecutor
+            from app.services.gmail_service import MODIFY_SCOPES, GmailService
+
+            if service is None:
+                service = GmailService.build_service(scopes=MODIFY_SCOPES)
+            result = ActionExecutor(service).execute(pending)
+            ActionLogService.mark_results(db, pending, result)
+            summary["modified"] = len(result["modified"])
+            summary["errors"] = result["errors"]
+
+        return summary
@@ -0,0 +1,235 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session, undefer
+
+from app.core.result_cache import rule_result_cache
+from app.core.rule_engine import RuleEngine
+from app.models.email import THREAD_KEY, Email
+
+
+def _sort_date(message: Dict[str, Any]) -> datetime:
+    received_date = message.get("received_date")
+    if not isinstance(received_date, datetime):
+        return datetime.min
+    if received_date.tzinfo is not None:
+        return received_date.astimezone(timezone.utc).replace(tzinfo=None)
+    return received_date
+
+
+class ThreadService:
+    """
+    Service for grouping emails into threads and evaluating rules per thread.
+
+    Evaluating per thread runs the rules once, against the latest message of
+    each thread, and applies the resulting actions to every message of the
+    thread. Since all those messages share the same label changes, they are
+    applied together by one batched modify.
+    """
+
+    @staticmethod
+    def thread_key(message: Dict[str, Any]) -> str:
+        """
+        Get the thread a message belongs to.
+
+        Args:
+            message: Message data
+
+        Returns:
+            str: The thread ID, or the message ID if it has none
+        """
+        return message.get("thread_id") or message["id"]
+
+    @staticmethod
+    def group_messages(
+        messages: Sequence[Dict[str, Any]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Group messages by thread, latest message first.
+
+        Args:
+            messages: Message data
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: Messages keyed by thread, in the
+            order threads first appear
+        """
+        threads: Dict[str, List[Dict[str, Any]]] = {}
+        for message in messages:
+            threads.setdefault(ThreadService.thread_key(message), []).append(message)
+        for thread in threads.values():
+            thread.sort(key=_sort_date, reverse=True)
+        return threads
+
+    @staticmethod
+    def evaluate(
+        rules: Sequence[Any],
+        messages: Sequence[Dict[str, Any]],
+        as_of: Optional[datetime] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Evaluate rules once per thread and fan the actions out to its messages.
+
+        Args:
+            rules: Rules in evaluation order
+            messages: Message data
+            as_of: Time date conditions are evaluated against
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: Reduced actions keyed by message
+            ID, the same for every message of a thread
+        """
+        threads = ThreadService.group_messages(messages)
+        latest = [thread[0] for thread in threads.values()]
+        results = rule_result_cache.process_emails(rules, latest, as_of)
+
+        actions_by_message = {}
+        for thread, actions in zip(threads.values(), results):
+            reduced = RuleEngine.reduce_actions(actions)
+            for message in thread:
+                actions_by_message[message["id"]] = reduced
+        return actions_by_message
+
+    @staticmethod
+    def get_threads(
+        db: Session, skip: int = 0, limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Get threads of stored emails, most recently active first.
+
+        Args:
+            db: Database session
+            skip: Number of threads to skip
+            limit: Maximum number of threads to return
+
+        Returns:
+            List[Dict[str, Any]]: Per thread, its ID, message count and the
+            sender, subject and date of its latest message
+        """
+        ranked = select(
+            THREAD_KEY.label("thread_id"),
+            Email.from_address,
+            Email.subject,
+            Email.snippet,
+            Email.received_date,
+            func.row_number()
+            .over(partition_by=THREAD_KEY, order_by=Email.received_date.desc())
+            .label("position"),
+            func.count().over(partition_by=THREAD_KEY).label("messages"),
+        ).subquery()
+        rows = db.execute(
+            select(ranked)
+            .where(ranked.c.position == 1)
+            .order_by(ranked.c.received_date.desc(), ranked.c.thread_id)
+            .offset(skip)
+            .limit(limit)
+        ).all()
+        return [
+            {
+                "thread_id": row.thread_id,
+                "messages": row.messages,
+                "from": row.from_address,
+                "subject": row.subject,
+                "snippet": row.snippet,
+                "received_date": row.received_date,
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def iter_stored_threads(
+        db: Session, batch_size: int = 10000
+    ) -> Iterator[List[Tuple[Dict[str, Any], List[str]]]]:
+        """
+        Read stored threads in keyset-paginated batches.
+
+        Each batch reads the latest email of the next threads in thread key
+        order with DISTINCT ON, walking the thread key index from the last
+        key of the previous batch.
+
+        Args:
+            db: Database session
+            batch_size: Threads read per batch
+
+        Yields:
+            List[Tuple[Dict[str, Any], List[str]]]: Per thread, the rule input
+            of its latest email and the Gmail IDs of all its emails
+        """
+        stmt = (
+            select(
+                THREAD_KEY.label("thread_key"),
+                Email.gmail_id,
+                Email.from_address,
+                Email.from_email,
+                Email.from_domain,
+                Email.subject,
+                Email.body,
+                Email.received_date,
+                Email.label_ids,
+            )
+            .distinct(THREAD_KEY)
+            .order_by(THREAD_KEY, Email.received_date.desc())
+            .limit(batch_size)
+        )
+
+        last_key = None
+        while True:
+            page_stmt = stmt if last_key is None else stmt.where(THREAD_KEY > last_key)
+            rows = db.execute(page_stmt).all()
+            if not rows:
+                return
+            last_key = rows[-1].thread_key
+
+            keys = [row.thread_key for row in rows]
+            members: Dict[str, List[str]] = {key: [] for key in keys}
+            for gmail_id, key in db.execute(
+                select(Email.gmail_id, THREAD_KEY).where(THREAD_KEY.in_(keys))
+            ):
+                members[key].append(gmail_id)
+
+            yield [
+                (
+                    {
+                        "id": row.gmail_id,
+                        "from": row.from_address,
+                        "from_email": row.from_email,
+                        "from_domain": row.from_domain,
+                        "subject": row.subject,
+                        "message": row.body,
+                        "received_date": row.received_date,
+                        "label_ids": row.label_ids,
+                    },
+                    members[row.thread_key],
+                )
+                for row in rows
+            ]
+
+            if len(rows) < batch_size:
+                return
+
+    @staticmethod
+    def get_thread(db: Session, thread_id: str) -> List[Email]:
+        """
+        Get the emails of a thread, oldest first.
+
+        Args:
+            db: Database session
+            thread_id: Thread ID, or the Gmail ID of an email without a
+                thread, as listed by :meth:`get_threads`
+
+        Returns:
+            List[Email]: The thread's emails
+        """
+        return list(
+            db.execute(
+                select(Email)
+                .options(undefer(Email.body))
+                # The indexed columns narrow the rows; the thread key is exact
+                .where(
+                    or_(Email.thread_id == thread_id, Email.gmail_id == thread_id),
+                    THREAD_KEY == thread_id,
+                )
+                .order_by(Email.received_date, Email.id)
+            ).scalars()
+        )
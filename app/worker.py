@@ -0,0 +1,254 @@
+"""
+Background worker that runs jobs from the Postgres-backed job queue.
+
+Run with ``python -m app.worker``. Every process polls the ``jobs`` table and
+claims jobs with ``SELECT ... FOR UPDATE SKIP LOCKED``, so workers can be
+started on as many machines as needed.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.models.job import Job
+from app.services.job_queue import JobQueue
+from app.services.partitions import PartitionService
+from app.services.processing import ProcessingService
+from app.services.retention import RetentionService
+from app.services.scheduler import SchedulerService
+
+logger = logging.getLogger(__name__)
+
+# Job type -> handler called with a database session and the job payload
+JOB_HANDLERS: Dict[str, Callable[[Session, Dict[str, Any]], Dict[str, Any]]] = {
+    "gmail_sync": lambda db, payload: ProcessingService.sync_mailbox(db, **payload),
+    "apply_rules": lambda db, payload: ProcessingService.apply_rules_to_stored_emails(
+        db, **payload
+    ),
+    "reschedule_emails": lambda db, payload: SchedulerService.reschedule_all(
+        db, **payload
+    ),
+    "reevaluate_due": lambda db, payload: run_due_reevaluations(db, **payload),
+    "maintain_partitions": lambda db, payload: PartitionService.maintain(db, **payload),
+    "archive_bodies": lambda db, payload: RetentionService.archive_bodies(
+        db, **payload
+    ),
+}
+
+
+def run_job(db: Session, job: Job) -> Optional[Job]:
+    """
+    Run a claimed job and record its outcome.
+
+    Args:
+        db: Database session
+        job: The claimed job
+
+    Returns:
+        Optional[Job]: The updated job, or None if the job was queued again
+        while it ran and its outcome was discarded
+    """
+    handler = JOB_HANDLERS.get(job.type)
+    if handler is None:
+        updated = JobQueue.fail(db, job, f"Unknown job type: {job.type}", retry=False)
+    else:
+        try:
+            result = handler(db, dict(job.payload or {}))
+        except Exception:
+            logger.exception("Job %s (%s) failed", job.id, job.type)
+            db.rollback()
+            updated = JobQueue.fail(db, job, traceback.format_exc())
+        else:
+            updated = JobQueue.complete(db, job, result)
+
+    if updated is None:
+        logger.warning(
+            "Job %s (%s) was queued again while it ran; its outcome is discarded",
+            job.id,
+            job.type,
+        )
+    return updated
+
+
+def run_due_reevaluations(db: Session, execute: bool = True) -> Dict[str, Any]:
+    """
+    Re-evaluate every email whose next evaluation time has passed.
+
+    Args:
+        db: Database session
+        execute: Apply the resulting actions in Gmail
+
+    Returns:
+        Dict[str, Any]: Number of emails evaluated and modified
+    """
+    totals = {"evaluated": 0, "matched": 0, "modified": 0, "errors": {}}
+    while True:
+        summary = SchedulerService.process_due(db, execute=execute)
+        for key in ("evaluated", "matched", "modified"):
+            totals[key] += summary[key]
+        totals["errors"].update(summary["errors"])
+        if summary["evaluated"] < settings.SCHEDULER_BATCH_SIZE:
+            return totals
+
+
+def work(
+    name: str,
+    poll_interval: Optional[float] = None,
+    once: bool = False,
+    stop: Optional[Callable[[], bool]] = None,
+) -> int:
+    """
+    Claim and run jobs until stopped.
+
+    Args:
+        name: Worker name recorded on claimed jobs
+        poll_interval: Seconds to sleep when no job is due
+        once: Return as soon as the queue has no due job
+        stop: Returns True when the worker should stop
+
+    Returns:
+        int: Number of jobs run
+    """
+    poll_interval = (
+        settings.WORKER_POLL_INTERVAL if poll_interval is None else poll_interval
+    )
+    stop = stop or (lambda: False)
+    processed = 0
+    next_schedule = next_maintenance = next_retention = next_requeue = time.monotonic()
+
+    while not stop():
+        db = SessionLocal()
+        try:
+            if settings.SCHEDULER_INTERVAL > 0 and time.monotonic() >= next_schedule:
+                next_schedule = time.monotonic() + settings.SCHEDULER_INTERVAL
+                try:
+                    run_due_reevaluations(db)
+                except Exception:
+                    logger.exception("Scheduled re-evaluation failed")
+                    db.rollback()
+
+            if (
+                settings.EMAIL_PARTITION_INTERVAL > 0
+                and time.monotonic() >= next_maintenance
+            ):
+                next_maintenance = time.monotonic() + settings.EMAIL_PARTITION_INTERVAL
+                try:
+                    PartitionService.maintain(db)
+                except Exception:
+                    logger.exception("Partition maintenance failed")
+                    db.rollback()
+
+            if (
+                settings.EMAIL_BODY_RETENTION_INTERVAL > 0
+                and settings.EMAIL_BODY_RETENTION_DAYS > 0
+                and time.monotonic() >= next_retention
+            ):
+                next_retention = (
+                    time.monotonic() + settings.EMAIL_BODY_RETENTION_INTERVAL
+                )
+                try:
+                    RetentionService.archive_bodies(db)
+                except Exception:
+                    logger.exception("Body retention failed")
+                    db.rollback()
+
+            if settings.JOB_REQUEUE_INTERVAL > 0 and time.monotonic() >= next_requeue:
+                next_requeue = time.monotonic() + settings.JOB_REQUEUE_INTERVAL
+                JobQueue.requeue_stale(db)
+
+            job = JobQueue.claim(db, name)
+            if job is not None:
+                logger.info("Worker %s running job %s (%s)", name, job.id, job.type)
+                run_job(db, job)
+                processed += 1
+                continue
+        finally:
+            db.close()
+
+        if once:
+            break
+        time.sleep(poll_interval)
+
+    return processed
+
+
+def _run_process(index: int, poll_interval: float) -> None:
+    # Connections inherited from the parent must not be shared with it
+    engine.dispose(close=False)
+
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    name = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    logger.info("Worker %s started", name)
+    work(name, poll_interval=poll_interval, stop=lambda: stopping)
+    logger.info("Worker %s stopped", name)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=settings.WORKER_PROCESSES,
+        help="Number of worker processes",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=settings.WORKER_POLL_INTERVAL,
+        help="Seconds between polls of an empty queue",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Run due jobs in this process and exit",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.DEBUG if settings.DEBUG else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
+
+    if args.once:
+        work(f"{socket.gethostname()}:{os.getpid()}", once=True)
+        return
+
+    processes = [
+        multiprocessing.Process(
+            target=_run_process, args=(index, args.poll_interval), daemon=False
+        )
+        for index in range(max(args.processes, 1))
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
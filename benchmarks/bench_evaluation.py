@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark rule evaluation in one process against the evaluation pool.
+
+Compares ``RuleEngine.process_email`` in a loop with
+:class:`app.core.evaluation_pool.EvaluationPool` sharding the same batch
+across processes, with batches sent as pickled dicts and through shared
+memory.
+
+Usage:
+    python benchmarks/bench_evaluation.py [--emails 200000] [--rules 50] [--processes 0]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import app.core  # noqa: F401  (import order: models depend on app.core)
+from app.core.evaluation_pool import EvaluationPool
+from app.core.rule_engine import (
+    CompiledAction,
+    CompiledCondition,
+    CompiledRule,
+    RuleEngine,
+)
+
+
+def build_rules(count):
+    """Build rules mixing text and date conditions."""
+    return [
+        CompiledRule(
+            id=f"rule{i}",
+            match_type="all" if i % 2 else "any",
+            conditions=(
+                CompiledCondition("from", "contains", f"sender{i}@", None),
+                CompiledCondition("subject", "does_not_contain", f"digest {i}", None),
+                CompiledCondition("received_date", "less_than", "7", "days"),
+            ),
+            actions=(CompiledAction("mark_as_read", None),),
+        )
+        for i in range(count)
+    ]
+
+
+def build_emails(count):
+    """Build email dicts shaped like ``Email.to_dict()``."""
+    now = datetime.utcnow()
+    return [
+        {
+            "id": f"msg{i:08d}",
+            "from": f'"Sender {i % 100}" <sender{i % 100}@example.com>',
+            "subject": f"Weekly newsletter #{i}",
+            "message": f"Message {i}. " + "Lorem ipsum dolor sit amet. " * 40,
+            "received_date": now - timedelta(hours=i % 500),
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--emails", type=int, default=200000)
+    parser.add_argument("--rules", type=int, default=50)
+    parser.add_argument("--processes", type=int, default=0)
+    args = parser.parse_args()
+
+    rules = build_rules(args.rules)
+    emails = build_emails(args.emails)
+
+    start = time.perf_counter()
+    baseline = [RuleEngine.process_email(rules, email) for email in emails]
+    serial = time.perf_counter() - start
+
+    print(f"{args.emails} emails, {args.rules} rules")
+    print(f"  {'single process':<32} {serial * 1000:10.1f} ms")
+
+    for label, shared_memory in (("pickled", False), ("shared memory", True)):
+        with EvaluationPool(
+            rules,
+            processes=args.processes,
+            parallel_threshold=0,
+            shared_memory=shared_memory,
+        ) as pool:
+            # Start the worker processes before timing
+            pool.evaluate(emails[: pool.chunk_size * pool.processes])
+            start = time.perf_counter()
+            pooled = pool.evaluate(emails)
+            parallel = time.perf_counter() - start
+            name = f"pool, {label} ({pool.processes} proc)"
+
+        assert pooled == baseline
+        print(
+            f"  {name:<32} {parallel * 1000:10.1f} ms" f"  ({serial / parallel:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark parsing messages fetched with ``full``, ``raw`` and ``metadata``.
+
+Builds the same multipart message as each API response and times JSON decoding
+plus formatting with ``GmailService.parse_message``, with and without bodies.
+
+Usage:
+    python benchmarks/bench_fetch.py [--messages 500] [--products 80]
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import app.core  # noqa: F401  (import order: models depend on app.core)
+from app.services.gmail_service import GmailService
+from bench_html import build_html
+
+
+def encode(data):
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def build_message(products):
+    """Build a multipart/alternative newsletter with typical headers."""
+    message = EmailMessage()
+    for hop in range(6):
+        message["Received"] = (
+            f"from mx{hop}.example.net (mx{hop}.example.net [203.0.113.{hop}]) "
+            f"by mx.google.com with ESMTPS id abc{hop}; Mon, 01 Jan 2024 10:00:0{hop}"
+        )
+    message["From"] = "Shop <news@shop.example.com>"
+    message["To"] = "me@example.com"
+    message["Subject"] = "Weekly sale: up to 30% off"
+    message["Date"] = "Mon, 01 Jan 2024 10:00:00 +0000"
+    message["Message-ID"] = "<weekly-sale@shop.example.com>"
+    message["List-Unsubscribe"] = "<https://shop.example.com/unsubscribe>"
+    message["DKIM-Signature"] = "v=1; a=rsa-sha256; d=shop.example.com; " + "b" * 340
+    text = "\n".join(f"Product {i} - now 30% off" for i in range(products))
+    message.set_content(text)
+    message.add_alternative(build_html(products), subtype="html")
+    return message
+
+
+def full_response(message):
+    """Serialize a message the way ``format=full`` returns it."""
+
+    def payload(part):
+        node = {
+            "mimeType": part.get_content_type(),
+            "headers": [{"name": k, "value": v} for k, v in part.items()],
+            "body": {"size": 0},
+        }
+        if part.is_multipart():
+            node["parts"] = [payload(child) for child in part.iter_parts()]
+        else:
+            data = part.get_payload(decode=True)
+            node["body"] = {"size": len(data), "data": encode(data)}
+        return node
+
+    return json.dumps(
+        {"id": "msg", "threadId": "t", "labelIds": [], "payload": payload(message)}
+    )
+
+
+def metadata_response(message):
+    """Serialize a message the way ``format=metadata`` returns it."""
+    payload = {
+        "mimeType": message.get_content_type(),
+        "headers": [{"name": k, "value": v} for k, v in message.items()],
+    }
+    return json.dumps(
+        {"id": "msg", "threadId": "t", "labelIds": [], "payload": payload}
+    )
+
+
+def raw_response(message):
+    """Serialize a message the way ``format=raw`` returns it."""
+    raw = encode(message.as_bytes())
+    return json.dumps({"id": "msg", "threadId": "t", "labelIds": [], "raw": raw})
+
+
+def timed(response, count, headers_only):
+    start = time.perf_counter()
+    for _ in range(count):
+        GmailService.parse_message(json.loads(response), headers_only=headers_only)
+    return (time.perf_counter() - start) * 1000 / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--products", type=int, default=80)
+    args = parser.parse_args()
+
+    message = build_message(args.products)
+    responses = {
+        "full": (full_response(message), (False, True)),
+        "raw": (raw_response(message), (False, True)),
+        "metadata": (metadata_response(message), (True,)),
+    }
+
+    for fetch_format, (response, modes) in responses.items():
+        print(f"format={fetch_format}: {len(response) / 1024:.1f} KiB response")
+        for headers_only in modes:
+            label = "headers only" if headers_only else "with body"
+            elapsed = timed(response, args.messages, headers_only)
+            print(f"  {label:<16} {elapsed:8.3f} ms per message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark body extraction for HTML-only messages.
+
+Times parsing a ``format=full`` API response and extracting its body, for a
+``text/plain`` message and for an equivalent ``text/html`` marketing email,
+with and without the body size cap.
+
+Usage:
+    python benchmarks/bench_html.py [--messages 200] [--products 400] [--max-chars 100000]
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import app.core  # noqa: F401  (import order: models depend on app.core)
+from app.services.mime import extract_body
+
+
+def encode(text):
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def build_html(products):
+    """Build a table-heavy marketing email with inline styles and tracking."""
+    rows = "".join(
+        f"""
+        <tr>
+          <td style="padding: 12px; border-bottom: 1px solid #eeeeee;">
+            <a href="https://shop.example.com/p/{i}?utm_source=email&amp;utm_campaign=sale">
+              <img src="https://cdn.example.com/img/{i}.jpg" width="120" alt="Product {i}"/>
+            </a>
+          </td>
+          <td style="font-family: Helvetica, Arial, sans-serif; font-size: 14px;">
+            <h3 style="margin: 0;">Product {i} &mdash; now 30% off</h3>
+            <p>Limited offer on product {i}. Free shipping &amp; returns.</p>
+          </td>
+        </tr>"""
+        for i in range(products)
+    )
+    return f"""<!DOCTYPE html>
+<html><head><title>Weekly sale</title>
+<style>{"td { color: #333333; } " * 200}</style></head>
+<body><table width="100%" cellpadding="0" cellspacing="0">{rows}</table>
+<script>window.track && window.track("open");</script>
+<p>Unsubscribe at any time.</p></body></html>"""
+
+
+def payload(mime_type, text):
+    return {"mimeType": mime_type, "headers": [], "body": {"data": encode(text)}}
+
+
+def response(mime_type, text):
+    """Serialize a message the way the Gmail API returns it."""
+    return json.dumps({"id": "msg", "payload": payload(mime_type, text)})
+
+
+def timed(responses, max_chars):
+    start = time.perf_counter()
+    for raw in responses:
+        extract_body(json.loads(raw)["payload"], max_chars=max_chars)
+    return (time.perf_counter() - start) * 1000 / len(responses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--products", type=int, default=400)
+    parser.add_argument("--max-chars", type=int, default=100000)
+    args = parser.parse_args()
+
+    html = build_html(args.products)
+    text = extract_body(payload("text/html", html), max_chars=0)
+    plain = [response("text/plain", text)] * args.messages
+    marketing = [response("text/html", html)] * args.messages
+
+    print(
+        f"{args.messages} messages, {len(html) // 1024} KiB of HTML, "
+        f"{len(text) // 1024} KiB of text (per message)"
+    )
+    baseline = timed(plain, 0)
+    print(f"  {'text/plain':<28} {baseline:8.2f} ms")
+    for label, max_chars in (
+        ("text/html", 0),
+        (f"text/html, {args.max_chars} chars", args.max_chars),
+        ("text/html, 2000 chars", 2000),
+    ):
+        elapsed = timed(marketing, max_chars)
+        print(f"  {label:<28} {elapsed:8.2f} ms  ({elapsed / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark the hot service lookups.
+
+Compares building ORM queries on every call (the previous implementation) with
+the prebuilt statements in ``app.services``, and reports the compiled
+statement cache hit ratio. Runs against a temporary SQLite database unless a
+PostgreSQL URL is given.
+
+Usage:
+    python benchmarks/bench_queries.py [--lookups 5000] [--database-url URL]
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.engine.default import CACHE_HIT, DefaultExecutionContext
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+import app.main  # noqa: F401  (imports models in dependency order)
+from app.core.database import Base
+from app.models.email import Email
+from app.models.rule import Action, Condition, Rule
+from app.services.email import EmailService
+from app.services.rule import RuleService
+
+
+@compiles(UUID, "sqlite")
+def _compile_uuid_sqlite(type_, compiler, **kw):
+    return "CHAR(36)"
+
+
+def seed(engine, emails, rules):
+    """Create the tables and insert sample emails and rules."""
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        rule_ids = []
+        for i in range(rules):
+            rule = Rule(name=f"Rule {i}", match_type="all")
+            db.add(rule)
+            db.flush()
+            db.add(
+                Condition(
+                    rule_id=rule.id, field="from", predicate="contains", value="a"
+                )
+            )
+            db.add(Action(rule_id=rule.id, type="mark_as_read"))
+            rule_ids.append(rule.id)
+        for i in range(emails):
+            db.add(Email(gmail_id=f"msg{i}", from_address=f"sender{i}@example.com"))
+        db.commit()
+    return rule_ids
+
+
+def run(engine, name, lookups, func):
+    """Time ``lookups`` calls of ``func`` and collect cache statistics."""
+    stats = Counter()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if isinstance(context, DefaultExecutionContext):
+            stats[context.cache_hit] += 1
+
+    event.listen(engine, "after_cursor_execute", record)
+    with Session(engine) as db:
+        start = time.perf_counter()
+        for i in range(lookups):
+            func(db, i)
+            db.expunge_all()
+        elapsed = time.perf_counter() - start
+    event.remove(engine, "after_cursor_execute", record)
+
+    hits = stats[CACHE_HIT]
+    total = sum(stats.values())
+    print(
+        f"  {name:<32} {elapsed / lookups * 1e6:8.1f} us/lookup"
+        f"   cache hits {hits}/{total}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--database-url", default="sqlite://")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    rule_ids = seed(engine, emails=1000, rules=20)
+
+    def email_query(db, i):
+        return db.query(Email).filter(Email.gmail_id == f"msg{i % 1000}").first()
+
+    def email_statement(db, i):
+        return EmailService.get_email_by_gmail_id(db, f"msg{i % 1000}")
+
+    def rule_query(db, i):
+        return db.query(Rule).filter(Rule.id == rule_ids[i % len(rule_ids)]).first()
+
+    def rule_statement(db, i):
+        return RuleService.get_rule(db, rule_ids[i % len(rule_ids)])
+
+    def rules_query(db, i):
+        return [
+            (rule.conditions, rule.actions)
+            for rule in db.query(Rule).offset(0).limit(100).all()
+        ]
+
+    def rules_statement(db, i):
+        return [(rule.conditions, rule.actions) for rule in RuleService.get_rules(db)]
+
+    print(f"{args.lookups} lookups against {engine.dialect.name}")
+    run(engine, "email by gmail_id (query)", args.lookups, email_query)
+    run(engine, "email by gmail_id (statement)", args.lookups, email_statement)
+    run(engine, "rule by id (query)", args.lookups, rule_query)
+    run(engine, "rule by id (statement)", args.lookups, rule_statement)
+    run(engine, "rules with relations (query)", args.lookups // 10, rules_query)
+    run(engine, "rules with relations (statement)", args.lookups // 10, rules_statement)
+
+    if args.database_url == "sqlite://":
+        Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
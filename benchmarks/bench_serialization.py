@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark email listing serialization.
+
+Compares the previous path (FastAPI's ``jsonable_encoder`` followed by
+``json.dumps``) with :func:`app.core.serialization.dumps`.
+
+Usage:
+    python benchmarks/bench_serialization.py [--emails 1000] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core import serialization
+
+
+def build_emails(count):
+    """Build email dicts shaped like ``Email.to_dict(body_key="body")``."""
+    now = datetime.utcnow()
+    return [
+        {
+            "id": uuid.uuid4(),
+            "gmail_id": f"msg{i:08d}",
+            "thread_id": f"thread{i // 3:08d}",
+            "from": f'"Sender {i}" <sender{i}@example.com>',
+            "to": "recipient@example.com",
+            "subject": f"Weekly newsletter #{i}",
+            "body": "Lorem ipsum dolor sit amet. " * 40,
+            "snippet": "Lorem ipsum dolor sit amet.",
+            "received_date": now - timedelta(minutes=i),
+            "label_ids": ["INBOX", "UNREAD", "CATEGORY_PROMOTIONS"],
+            "created_at": now,
+            "updated_at": now,
+            "actions": [{"type": "mark_as_read", "target": None}],
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--emails", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    emails = build_emails(args.emails)
+
+    def baseline():
+        return json.dumps(jsonable_encoder(emails)).encode("utf-8")
+
+    def fast():
+        return serialization.dumps(emails)
+
+    assert json.loads(baseline()) == json.loads(fast())
+
+    encoder = "orjson" if serialization.orjson is not None else "json"
+    print(f"{args.emails} emails, best of {args.repeat} runs, encoder={encoder}")
+    results = {}
+    for name, func in (("jsonable_encoder + json", baseline), ("dumps", fast)):
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        results[name] = best
+        print(f"  {name:<24} {best * 1000:8.2f} ms")
+    speedup = results["jsonable_encoder + json"] / results["dumps"]
+    print(f"  speedup                  {speedup:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Add email body retention
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("emails", sa.Column("body_hash", sa.String(64), nullable=True))
+    op.add_column("emails", sa.Column("body_archived_at", sa.DateTime(), nullable=True))
+    # Every existing email is unarchived, so the index starts out complete
+    op.create_index(
+        "ix_emails_unarchived_received_date",
+        "emails",
+        ["received_date"],
+        postgresql_where=sa.text("body_archived_at IS NULL"),
+    )
+
+    op.create_table(
+        "email_body_archive",
+        sa.Column("email_id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("gmail_id", sa.String(), nullable=False),
+        sa.Column("received_date", sa.DateTime(), nullable=False),
+        sa.Column("body", sa.LargeBinary(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_index(
+        "ix_email_body_archive_gmail_id", "email_body_archive", ["gmail_id"]
+    )
+    op.create_index(
+        "ix_email_body_archive_received_date",
+        "email_body_archive",
+        ["received_date"],
+    )
+
+
+def downgrade():
+    # Archived bodies are dropped with the archive, not restored
+    op.drop_index(
+        "ix_email_body_archive_received_date", table_name="email_body_archive"
+    )
+    op.drop_index("ix_email_body_archive_gmail_id", table_name="email_body_archive")
+    op.drop_table("email_body_archive")
+    op.drop_index("ix_emails_unarchived_received_date", table_name="emails")
+    op.drop_column("emails", "body_archived_at")
+    op.drop_column("emails", "body_hash")
@@ -0,0 +1,34 @@
+"""Add next_evaluation_at to emails
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "emails", sa.Column("next_evaluation_at", sa.DateTime(), nullable=True)
+    )
+    op.create_index(
+        "ix_emails_next_evaluation_at",
+        "emails",
+        ["next_evaluation_at"],
+        postgresql_where=sa.text("next_evaluation_at IS NOT NULL"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_emails_next_evaluation_at", table_name="emails")
+    op.drop_column("emails", "next_evaluation_at")
@@ -0,0 +1,74 @@
+"""Add parsed sender address and domain to emails
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from email.utils import parseaddr
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+# Rows read into memory per batch; every batch is part of the single upgrade
+# transaction
+BATCH_SIZE = 5000
+
+
+def upgrade():
+    op.add_column("emails", sa.Column("from_email", sa.String(), nullable=True))
+    op.add_column("emails", sa.Column("from_domain", sa.String(), nullable=True))
+
+    # Parse existing senders in Python, where the header grammar is handled,
+    # paging by primary key so only one page is held in memory
+    bind = op.get_bind()
+    emails = sa.table(
+        "emails",
+        sa.column("id"),
+        sa.column("from_address", sa.String()),
+        sa.column("from_email", sa.String()),
+        sa.column("from_domain", sa.String()),
+    )
+    update = (
+        emails.update()
+        .where(emails.c.id == sa.bindparam("email_id"))
+        .values(from_email=sa.bindparam("address"), from_domain=sa.bindparam("domain"))
+    )
+    last_id = None
+    while True:
+        query = (
+            sa.select(emails.c.id, emails.c.from_address)
+            .order_by(emails.c.id)
+            .limit(BATCH_SIZE)
+        )
+        if last_id is not None:
+            query = query.where(emails.c.id > last_id)
+        rows = bind.execute(query).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        values = []
+        for row in rows:
+            address = parseaddr(row.from_address or "")[1].strip().lower()
+            domain = address.rpartition("@")[2] if "@" in address else ""
+            values.append({"email_id": row.id, "address": address, "domain": domain})
+        bind.execute(update, values)
+
+    op.create_index("ix_emails_from_email", "emails", ["from_email"])
+    op.create_index("ix_emails_from_domain", "emails", ["from_domain"])
+
+
+def downgrade():
+    op.drop_index("ix_emails_from_domain", table_name="emails")
+    op.drop_index("ix_emails_from_email", table_name="emails")
+    op.drop_column("emails", "from_domain")
+    op.drop_column("emails", "from_email")
@@ -0,0 +1,33 @@
+"""Index emails by thread key
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Must match app.models.email.THREAD_KEY, so queries on it use the index
+    op.create_index(
+        "ix_emails_thread_key",
+        "emails",
+        [
+            sa.text("coalesce(nullif(thread_id, ''), gmail_id)"),
+            sa.text("received_date DESC"),
+        ],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_emails_thread_key", table_name="emails")
@@ -0,0 +1,119 @@
+"""Store email bodies compressed
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - exercised only without zstandard
+    zstandard = None
+
+
+# revision identifiers, used by Alembic.
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+# Rows read into memory per batch; every batch is part of the single upgrade
+# transaction
+BATCH_SIZE = 5000
+
+# Bodies shorter than this are stored as is
+MIN_BYTES = 256
+
+# One-byte codec prefixes, as written by app.core.compression
+PLAIN_CODEC = b"n"
+ZLIB_CODEC = b"z"
+ZSTD_CODEC = b"s"
+
+
+def _compress(body):
+    data = body.encode("utf-8")
+    if len(data) < MIN_BYTES:
+        return PLAIN_CODEC + data
+    if zstandard is not None:
+        return ZSTD_CODEC + zstandard.ZstdCompressor(level=3).compress(data)
+    return ZLIB_CODEC + zlib.compress(data, 6)
+
+
+def _decompress(data):
+    data = bytes(data)
+    codec, body = data[:1], data[1:]
+    if codec == ZLIB_CODEC:
+        body = zlib.decompress(body)
+    elif codec == ZSTD_CODEC:
+        if zstandard is None:
+            raise RuntimeError("zstandard is needed to decompress email bodies")
+        body = zstandard.ZstdDecompressor().decompress(body)
+    return body.decode("utf-8")
+
+
+def _convert(source, target, convert):
+    # Page by primary key so only one page of bodies is held in memory, and
+    # update each row by its full key so every update only touches the row's
+    # partition
+    bind = op.get_bind()
+    emails = sa.table(
+        "emails",
+        sa.column("id"),
+        sa.column("received_date"),
+        sa.column(source),
+        sa.column(target),
+    )
+    update = (
+        emails.update()
+        .where(
+            emails.c.id == sa.bindparam("email_id"),
+            emails.c.received_date == sa.bindparam("email_received_date"),
+        )
+        .values({target: sa.bindparam("value")})
+    )
+    last_id = None
+    while True:
+        query = (
+            sa.select(emails.c.id, emails.c.received_date, emails.c[source])
+            .where(emails.c[source].is_not(None))
+            .order_by(emails.c.id)
+            .limit(BATCH_SIZE)
+        )
+        if last_id is not None:
+            query = query.where(emails.c.id > last_id)
+        rows = bind.execute(query).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        bind.execute(
+            update,
+            [
+                {
+                    "email_id": row.id,
+                    "email_received_date": row.received_date,
+                    "value": convert(row[2]),
+                }
+                for row in rows
+            ],
+        )
+
+
+def upgrade():
+    op.add_column("emails", sa.Column("body_data", sa.LargeBinary(), nullable=True))
+    _convert("body", "body_data", _compress)
+    op.drop_column("emails", "body")
+    op.alter_column("emails", "body_data", new_column_name="body")
+
+
+def downgrade():
+    op.add_column("emails", sa.Column("body_text", sa.Text(), nullable=True))
+    _convert("body", "body_text", _decompress)
+    op.drop_column("emails", "body")
+    op.alter_column("emails", "body_text", new_column_name="body")
@@ -0,0 +1,50 @@
+"""Store email label IDs as an indexed array
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, JSON
+
+
+# revision identifiers, used by Alembic.
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+# JSON arrays become text arrays; anything else becomes an empty array
+TO_ARRAY = (
+    "CASE WHEN json_typeof(label_ids) = 'array' "
+    "THEN ARRAY(SELECT json_array_elements_text(label_ids)) "
+    "ELSE '{}'::varchar[] END"
+)
+TO_JSON = "COALESCE(array_to_json(label_ids), '[]'::json)"
+
+
+def _convert(target, expression):
+    # The conversion runs in the database and the whole upgrade is a single
+    # transaction, so batching would only add round trips
+    op.execute(f"UPDATE emails SET {target} = {expression}")
+
+
+def upgrade():
+    op.add_column("emails", sa.Column("label_array", ARRAY(sa.String())))
+    _convert("label_array", TO_ARRAY)
+    op.drop_column("emails", "label_ids")
+    op.alter_column("emails", "label_array", new_column_name="label_ids")
+    op.create_index(
+        "ix_emails_label_ids", "emails", ["label_ids"], postgresql_using="gin"
+    )
+
+
+def downgrade():
+    op.drop_index("ix_emails_label_ids", table_name="emails")
+    op.add_column("emails", sa.Column("label_json", JSON()))
+    _convert("label_json", TO_JSON)
+    op.drop_column("emails", "label_ids")
+    op.alter_column("emails", "label_json", new_column_name="label_ids")
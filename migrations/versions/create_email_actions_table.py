@@ -0,0 +1,39 @@
+"""Create email_actions table
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "email_actions",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("gmail_id", sa.String(), nullable=False, index=True),
+        sa.Column("rule_id", UUID(as_uuid=True), nullable=True),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("target", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False, server_default="pending"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("idempotency_key", sa.String(64), nullable=False, unique=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("applied_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("email_actions")
@@ -0,0 +1,163 @@
+"""Partition emails by received month
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSON, UUID
+
+
+# revision identifiers, used by Alembic.
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+# Future months partitioned by the migration; workers keep creating them
+MONTHS_AHEAD = 3
+
+COLUMNS = (
+    "id, gmail_id, thread_id, from_address, from_email, from_domain, "
+    "to_address, subject, body, snippet, received_date, label_ids, "
+    "next_evaluation_at, created_at, updated_at"
+)
+
+SECONDARY_INDEXES = (
+    "ix_emails_gmail_id",
+    "ix_emails_thread_id",
+    "ix_emails_from_email",
+    "ix_emails_from_domain",
+    "ix_emails_next_evaluation_at",
+)
+
+
+def _columns(received_date_nullable):
+    return [
+        sa.Column("id", UUID(as_uuid=True), nullable=False),
+        sa.Column("gmail_id", sa.String(), nullable=False),
+        sa.Column("thread_id", sa.String()),
+        sa.Column("from_address", sa.String(), nullable=False),
+        sa.Column("from_email", sa.String()),
+        sa.Column("from_domain", sa.String()),
+        sa.Column("to_address", sa.String()),
+        sa.Column("subject", sa.String()),
+        sa.Column("body", sa.Text()),
+        sa.Column("snippet", sa.String()),
+        sa.Column("received_date", sa.DateTime(), nullable=received_date_nullable),
+        sa.Column("label_ids", JSON()),
+        sa.Column("next_evaluation_at", sa.DateTime()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    ]
+
+
+def _set_aside(table):
+    # Free the names of the table, its key and indexes for the new table
+    op.execute(f"ALTER TABLE emails RENAME TO {table}")
+    op.execute(f"ALTER INDEX emails_pkey RENAME TO {table}_pkey")
+    for index in SECONDARY_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+def _create_secondary_indexes():
+    op.create_index("ix_emails_thread_id", "emails", ["thread_id"])
+    op.create_index("ix_emails_from_email", "emails", ["from_email"])
+    op.create_index("ix_emails_from_domain", "emails", ["from_domain"])
+    op.create_index(
+        "ix_emails_next_evaluation_at",
+        "emails",
+        ["next_evaluation_at"],
+        postgresql_where=sa.text("next_evaluation_at IS NOT NULL"),
+    )
+
+
+def _next_month(month):
+    return month.replace(
+        year=month.year + month.month // 12, month=month.month % 12 + 1
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    _set_aside("emails_unpartitioned")
+
+    # Primary and unique keys of a partitioned table must include the
+    # partition key, so Gmail IDs are kept globally unique by email_ids
+    op.create_table(
+        "emails",
+        *_columns(received_date_nullable=False),
+        sa.PrimaryKeyConstraint("id", "received_date", name="emails_pkey"),
+        sa.UniqueConstraint("gmail_id", "received_date", name="uq_emails_gmail_id"),
+        postgresql_partition_by="RANGE (received_date)",
+    )
+
+    # One partition per month holding mail, plus the coming months
+    months = set(
+        bind.execute(
+            sa.text(
+                "SELECT DISTINCT date_trunc('month', received_date) "
+                "FROM emails_unpartitioned WHERE received_date IS NOT NULL"
+            )
+        ).scalars()
+    )
+    month = bind.execute(
+        sa.text("SELECT date_trunc('month', now() AT TIME ZONE 'utc')")
+    ).scalar()
+    for _ in range(MONTHS_AHEAD + 1):
+        months.add(month)
+        month = _next_month(month)
+    for month in sorted(months):
+        op.execute(
+            f"CREATE TABLE emails_y{month.year:04d}m{month.month:02d} "
+            "PARTITION OF emails FOR VALUES "
+            f"FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        )
+    op.execute("CREATE TABLE emails_default PARTITION OF emails DEFAULT")
+
+    # The partition key cannot be null; undated emails keep their creation time
+    op.execute(
+        f"INSERT INTO emails ({COLUMNS}) SELECT "
+        + COLUMNS.replace(
+            "received_date",
+            "COALESCE(received_date, created_at, now() AT TIME ZONE 'utc')",
+        )
+        + " FROM emails_unpartitioned"
+    )
+    op.drop_table("emails_unpartitioned")
+
+    _create_secondary_indexes()
+
+    op.create_table(
+        "email_ids",
+        sa.Column("gmail_id", sa.String(), primary_key=True),
+        sa.Column("received_date", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_email_ids_received_date", "email_ids", ["received_date"])
+    op.execute(
+        "INSERT INTO email_ids (gmail_id, received_date) "
+        "SELECT gmail_id, received_date FROM emails"
+    )
+
+
+def downgrade():
+    op.drop_table("email_ids")
+    op.drop_constraint("uq_emails_gmail_id", "emails", type_="unique")
+    _set_aside("emails_partitioned")
+
+    op.create_table(
+        "emails",
+        *_columns(received_date_nullable=True),
+        sa.PrimaryKeyConstraint("id", name="emails_pkey"),
+    )
+    op.execute(
+        f"INSERT INTO emails ({COLUMNS}) SELECT {COLUMNS} FROM emails_partitioned"
+    )
+    # Dropping the partitioned table drops its partitions
+    op.drop_table("emails_partitioned")
+
+    op.create_index("ix_emails_gmail_id", "emails", ["gmail_id"], unique=True)
+    _create_secondary_indexes()
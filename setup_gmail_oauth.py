@@ -12,8 +12,11 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 
-# Define the scopes
-SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
+# Define the scopes (modify is needed to apply rule actions)
+SCOPES = [
+    "https://www.googleapis.com/auth/gmail.readonly",
+    "https://www.googleapis.com/auth/gmail.modify",
+]
 
 
 def main():
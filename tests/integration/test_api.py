@@ -1,24 +1,39 @@
 import json
+import os
+import tempfile
 import pytest
 from datetime import datetime
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 from app.main import app
-from app.core.database import Base, get_db
+from app.core.database import (
+    Base,
+    get_async_db,
+    get_async_read_db,
+    get_db,
+    get_read_db,
+)
 from app.models.rule import Rule, Condition, Action
 
 
-# Create an in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Create a temporary SQLite database shared by the sync and async routes
+SQLALCHEMY_DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "test_api.db")
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
+    f"sqlite:///{SQLALCHEMY_DATABASE_PATH}",
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
+    poolclass=NullPool,
+)
+async_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{SQLALCHEMY_DATABASE_PATH}", poolclass=NullPool
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncTestingSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
 
 
 # Override the get_db dependency
@@ -30,7 +45,16 @@ def override_get_db():
         db.close()
 
 
+# Override the get_async_db dependency
+async def override_get_async_db():
+    async with AsyncTestingSessionLocal() as db:
+        yield db
+
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_async_read_db] = override_get_async_db
 
 
 @pytest.fixture(scope="module")
@@ -1,11 +1,12 @@
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 import json
 import base64
 from datetime import datetime
 
 from fastapi.testclient import TestClient
 
+from app.core.database import get_db
 from app.main import app
 
 
@@ -43,6 +44,29 @@ class TestGmailApiEndpoint(unittest.TestCase):
         self.assertEqual(data[0]["subject"], "Test Email")
         self.assertIn("actions", data[0])
 
+    @patch("app.api.routes.SchedulerService.schedule")
+    @patch("app.api.routes.EmailService.create_email")
+    @patch("app.services.gmail_service.GmailService.list_messages")
+    def test_sync_schedules_stored_emails(
+        self, mock_list_messages, mock_create_email, mock_schedule
+    ):
+        db = MagicMock()
+        app.dependency_overrides[get_db] = lambda: db
+        self.addCleanup(app.dependency_overrides.pop, get_db, None)
+        mock_list_messages.return_value = [{"id": "msg1"}, {"id": "msg2"}]
+        emails = [MagicMock(), MagicMock()]
+        for email, gmail_id in zip(emails, ("msg1", "msg2")):
+            email.to_dict.return_value = {"gmail_id": gmail_id}
+        mock_create_email.side_effect = emails
+
+        response = self.client.post("/api/gmail/sync?max_results=2")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [data["gmail_id"] for data in response.json()], ["msg1", "msg2"]
+        )
+        mock_schedule.assert_called_once_with(db, emails)
+
 
 if __name__ == "__main__":
     unittest.main()
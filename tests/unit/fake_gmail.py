@@ -0,0 +1,98 @@
+"""In-memory stand-in for the Gmail API calls used when applying actions."""
+
+from unittest.mock import MagicMock
+
+from googleapiclient.errors import HttpError
+
+
+class FakeRequest:
+    def __init__(self, handler):
+        self.handler = handler
+
+    def execute(self):
+        return self.handler()
+
+
+class FakeGmailService:
+    def __init__(self, labels=None, messages=None):
+        # Label name -> label ID
+        self.label_ids = {"INBOX": "INBOX", "UNREAD": "UNREAD"}
+        self.label_ids.update(labels or {})
+        # Message ID -> set of label IDs
+        self.message_labels = {
+            message_id: set(label_ids)
+            for message_id, label_ids in (messages or {}).items()
+        }
+        self.batch_requests = []
+        self.label_list_calls = 0
+        self.failures = []
+
+    def fail_next(self, status=500, reason="Backend Error", content=b""):
+        """Make the next batchModify request fail with an HttpError."""
+        self.failures.append(
+            HttpError(MagicMock(status=status, reason=reason), content)
+        )
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return FakeMessages(self)
+
+    def labels(self):
+        return FakeLabels(self)
+
+
+class FakeMessages:
+    def __init__(self, gmail):
+        self.gmail = gmail
+
+    def batchModify(self, userId, body):
+        def handler():
+            if self.gmail.failures:
+                raise self.gmail.failures.pop(0)
+
+            known = set(self.gmail.label_ids.values())
+            for label_id in body.get("addLabelIds", []):
+                if label_id not in known:
+                    raise HttpError(
+                        MagicMock(status=400, reason="Bad Request"),
+                        b'{"error": {"message": "Invalid label: %s"}}'
+                        % label_id.encode(),
+                    )
+
+            self.gmail.batch_requests.append(body)
+            for message_id in body["ids"]:
+                labels = self.gmail.message_labels.setdefault(
+                    message_id, {"INBOX", "UNREAD"}
+                )
+                labels.update(body.get("addLabelIds", []))
+                labels.difference_update(body.get("removeLabelIds", []))
+            return {}
+
+        return FakeRequest(handler)
+
+
+class FakeLabels:
+    def __init__(self, gmail):
+        self.gmail = gmail
+
+    def list(self, userId):
+        def handler():
+            self.gmail.label_list_calls += 1
+            return {
+                "labels": [
+                    {"id": label_id, "name": name}
+                    for name, label_id in self.gmail.label_ids.items()
+                ]
+            }
+
+        return FakeRequest(handler)
+
+    def create(self, userId, body):
+        def handler():
+            label_id = f"Label_{len(self.gmail.label_ids)}"
+            self.gmail.label_ids[body["name"]] = label_id
+            return {"id": label_id, "name": body["name"]}
+
+        return FakeRequest(handler)
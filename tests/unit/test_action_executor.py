@@ -0,0 +1,105 @@
+import unittest
+
+from app.services.action_executor import ActionExecutor
+from app.services.label_cache import LabelCache
+from fake_gmail import FakeGmailService
+
+
+class TestActionExecutor(unittest.TestCase):
+    def setUp(self):
+        self.service = FakeGmailService(labels={"Archive": "Label_1"})
+        self.labels = LabelCache(ttl=60, auto_create=False)
+
+    def test_label_changes(self):
+        executor = ActionExecutor(self.service, labels=self.labels)
+
+        self.assertEqual(
+            executor.label_changes([{"type": "mark_as_read", "target": None}]),
+            ((), ("UNREAD",)),
+        )
+        self.assertEqual(
+            executor.label_changes(
+                [
+                    {"type": "move_message", "target": "archive"},
+                    {"type": "mark_as_unread", "target": None},
+                ]
+            ),
+            (("Label_1", "UNREAD"), ("INBOX",)),
+        )
+        self.assertEqual(
+            executor.label_changes([{"type": "move_message", "target": "Inbox"}]),
+            (("INBOX",), ()),
+        )
+
+    def test_later_action_wins(self):
+        executor = ActionExecutor(self.service, labels=self.labels)
+        actions = [
+            {"type": "mark_as_read", "target": None},
+            {"type": "mark_as_unread", "target": None},
+        ]
+
+        self.assertEqual(executor.label_changes(actions), (("UNREAD",), ()))
+
+    def test_execute_groups_by_signature(self):
+        executor = ActionExecutor(self.service, labels=self.labels, batch_size=2)
+        read = [{"type": "mark_as_read", "target": None}]
+        archive = [{"type": "move_message", "target": "Archive"}]
+        actions_by_message = {
+            "m1": read,
+            "m2": archive,
+            "m3": read,
+            "m4": read,
+            "m5": [],
+        }
+
+        result = executor.execute(actions_by_message)
+
+        self.assertEqual(result["requests"], 3)
+        self.assertEqual(sorted(result["modified"]), ["m1", "m2", "m3", "m4"])
+        self.assertEqual(result["labels"]["m1"], ((), ("UNREAD",)))
+        self.assertEqual(result["labels"]["m2"], (("Label_1",), ("INBOX",)))
+        self.assertEqual(result["errors"], {})
+        self.assertEqual(self.service.batch_requests[0]["ids"], ["m1", "m3"])
+        self.assertEqual(self.service.batch_requests[1]["ids"], ["m4"])
+        self.assertEqual(self.service.message_labels["m2"], {"Label_1", "UNREAD"})
+        self.assertEqual(self.service.label_list_calls, 1)
+
+    def test_batch_size_capped(self):
+        executor = ActionExecutor(self.service, labels=self.labels, batch_size=5000)
+        self.assertEqual(executor.batch_size, 1000)
+
+    def test_execute_reports_errors(self):
+        self.service.fail_next()
+        executor = ActionExecutor(self.service, labels=self.labels)
+        actions_by_message = {
+            "m1": [{"type": "mark_as_read", "target": None}],
+            "m2": [{"type": "move_message", "target": "Missing"}],
+            "m3": [{"type": "mark_as_unread", "target": None}],
+        }
+
+        result = executor.execute(actions_by_message)
+
+        self.assertEqual(result["requests"], 2)
+        self.assertEqual(result["modified"], ["m3"])
+        self.assertEqual(set(result["errors"]), {"m1", "m2"})
+        self.assertIn("Unknown label", result["errors"]["m2"])
+
+    def test_execute_retries_stale_label(self):
+        executor = ActionExecutor(self.service, labels=self.labels)
+        executor.resolve_label("Archive")
+
+        # The label is recreated with a new ID after it was cached
+        self.service.label_ids["Archive"] = "Label_2"
+        actions_by_message = {"m1": [{"type": "move_message", "target": "Archive"}]}
+
+        result = executor.execute(actions_by_message)
+
+        self.assertEqual(result["modified"], ["m1"])
+        self.assertEqual(result["errors"], {})
+        self.assertEqual(result["requests"], 2)
+        self.assertEqual(self.service.label_list_calls, 2)
+        self.assertIn("Label_2", self.service.message_labels["m1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
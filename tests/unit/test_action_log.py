@@ -0,0 +1,100 @@
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.action_log import ActionLogService
+
+
+class TestActionLogService(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.rule_id = str(uuid4())
+        self.read = {"type": "mark_as_read", "target": None, "rule_id": self.rule_id}
+        self.move = {
+            "type": "move_message",
+            "target": "Archive",
+            "rule_id": self.rule_id,
+        }
+
+    def test_idempotency_key(self):
+        key = ActionLogService.idempotency_key("msg1", self.read)
+
+        self.assertEqual(len(key), 64)
+        self.assertEqual(key, ActionLogService.idempotency_key("msg1", dict(self.read)))
+        self.assertNotEqual(key, ActionLogService.idempotency_key("msg2", self.read))
+        self.assertNotEqual(key, ActionLogService.idempotency_key("msg1", self.move))
+
+    def test_record_actions_skips_applied(self):
+        applied_key = ActionLogService.idempotency_key("msg1", self.read)
+        self.db.execute.return_value.scalars.return_value = [applied_key]
+
+        pending = ActionLogService.record_actions(
+            self.db, {"msg1": [self.move, self.read], "msg2": [self.read]}
+        )
+
+        self.assertEqual(pending, {"msg1": [self.move], "msg2": [self.read]})
+        insert = self.db.execute.call_args_list[1].args[0]
+        sql = str(insert.compile(dialect=postgresql.dialect()))
+        self.assertIn("ON CONFLICT (idempotency_key) DO NOTHING", sql)
+        self.db.commit.assert_called_once()
+
+    def test_record_actions_empty(self):
+        self.assertEqual(ActionLogService.record_actions(self.db, {"msg1": []}), {})
+        self.db.execute.assert_not_called()
+
+    def test_mark_results(self):
+        actions_by_message = {"msg1": [self.read], "msg2": [self.move]}
+        result = {"modified": ["msg1"], "errors": {"msg2": "Unknown label: Archive"}}
+
+        ActionLogService.mark_results(self.db, actions_by_message, result)
+
+        self.assertEqual(self.db.execute.call_count, 2)
+        applied = self.db.execute.call_args_list[0].args[0].compile()
+        failed = self.db.execute.call_args_list[1].args[0].compile()
+        self.assertEqual(applied.params["status"], "applied")
+        self.assertEqual(failed.params["status"], "failed")
+        self.assertEqual(failed.params["error"], "Unknown label: Archive")
+        self.db.commit.assert_called_once()
+
+    def test_mark_results_updates_labels(self):
+        row = SimpleNamespace(
+            id=uuid4(),
+            received_date=datetime(2024, 1, 1),
+            gmail_id="msg1",
+            label_ids=["INBOX", "UNREAD"],
+        )
+        self.db.execute.side_effect = [MagicMock(), [row], MagicMock()]
+        result = {
+            "modified": ["msg1"],
+            "labels": {"msg1": (("Label_1",), ("INBOX",))},
+            "errors": {},
+        }
+
+        ActionLogService.mark_results(self.db, {"msg1": [self.move]}, result)
+
+        values = self.db.execute.call_args_list[2].args[1]
+        self.assertEqual(values[0]["label_ids"], ["UNREAD", "Label_1"])
+        self.assertEqual(values[0]["received_date"], row.received_date)
+        self.db.commit.assert_called_once()
+
+    def test_get_processed_gmail_ids(self):
+        self.db.execute.return_value.scalars.return_value = ["msg1"]
+
+        self.assertEqual(
+            ActionLogService.get_processed_gmail_ids(self.db, ["msg1", "msg2"]),
+            {"msg1"},
+        )
+        sql = str(
+            self.db.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+        )
+        self.assertIn("GROUP BY email_actions.gmail_id", sql)
+        self.assertIn("HAVING sum(CASE WHEN (email_actions.status !=", sql)
+        self.assertEqual(ActionLogService.get_processed_gmail_ids(self.db, []), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
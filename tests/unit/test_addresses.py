@@ -0,0 +1,37 @@
+import unittest
+
+from app.core.addresses import Sender, email_sender, parse_sender
+
+
+class TestAddresses(unittest.TestCase):
+    def test_parse_sender(self):
+        self.assertEqual(
+            parse_sender('"Jane Doe" <Jane.Doe@Example.COM>'),
+            Sender("jane.doe@example.com", "example.com"),
+        )
+        self.assertEqual(
+            parse_sender("news@mail.example.com"),
+            Sender("news@mail.example.com", "mail.example.com"),
+        )
+
+    def test_parse_sender_without_address(self):
+        self.assertEqual(parse_sender(""), Sender("", ""))
+        self.assertEqual(parse_sender("undisclosed"), Sender("undisclosed", ""))
+
+    def test_email_sender_prefers_stored_fields(self):
+        email = {
+            "from": "Jane <jane@example.com>",
+            "from_email": "jane@example.org",
+            "from_domain": "example.org",
+        }
+
+        self.assertEqual(email_sender(email), Sender("jane@example.org", "example.org"))
+
+    def test_email_sender_parses_header(self):
+        email = {"from": "Jane <jane@example.com>", "from_email": None}
+
+        self.assertEqual(email_sender(email), Sender("jane@example.com", "example.com"))
+
+
+if __name__ == "__main__":
+    unittest.main()
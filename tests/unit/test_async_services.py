@@ -0,0 +1,53 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+from app.models.email import Email
+from app.models.rule import Rule
+from app.services.email import AsyncEmailService
+from app.services.rule import RULES_STATEMENT, AsyncRuleService
+
+
+class TestAsyncServices(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.db.execute = AsyncMock(return_value=MagicMock())
+
+    async def test_get_rules(self):
+        rule = MagicMock(spec=Rule)
+        self.db.execute.return_value.scalars.return_value.all.return_value = [rule]
+
+        rules = await AsyncRuleService.get_rules(self.db, skip=5, limit=10)
+
+        self.assertEqual(rules, [rule])
+        self.db.execute.assert_awaited_once_with(
+            RULES_STATEMENT, {"skip": 5, "limit": 10}
+        )
+
+    async def test_get_rule(self):
+        rule = MagicMock(spec=Rule)
+        self.db.execute.return_value.scalars.return_value.first.return_value = rule
+
+        result = await AsyncRuleService.get_rule(self.db, uuid4())
+
+        self.assertEqual(result, rule)
+        self.db.execute.assert_awaited_once()
+
+    async def test_get_email_by_id(self):
+        email = MagicMock(spec=Email)
+        self.db.execute.return_value.scalars.return_value.first.return_value = email
+
+        result = await AsyncEmailService.get_email_by_id(self.db, str(uuid4()))
+
+        self.assertEqual(result, email)
+        self.db.execute.assert_awaited_once()
+
+    async def test_get_email_by_id_invalid(self):
+        result = await AsyncEmailService.get_email_by_id(self.db, "not-a-uuid")
+
+        self.assertIsNone(result)
+        self.db.execute.assert_not_awaited()
+
+
+if __name__ == "__main__":
+    unittest.main()
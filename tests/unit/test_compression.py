@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, inspect, select
+
+from app.core.compression import PLAIN_CODEC, CompressedText, compress, decompress
+from app.models.email import Email
+
+
+class TestCompressedText(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        metadata = MetaData()
+        self.table = Table(
+            "bodies",
+            metadata,
+            Column("id", Integer, primary_key=True),
+            Column("body", CompressedText),
+        )
+        metadata.create_all(self.engine)
+
+    def store(self, body):
+        with self.engine.begin() as connection:
+            connection.execute(self.table.insert(), {"id": 1, "body": body})
+            stored = connection.exec_driver_sql("SELECT body FROM bodies").scalar()
+            loaded = connection.execute(select(self.table.c.body)).scalar()
+        return stored, loaded
+
+    def test_round_trip(self):
+        body = "Hello there, this is a fairly repetitive body. ✓ " * 40
+
+        stored, loaded = self.store(body)
+
+        self.assertEqual(loaded, body)
+        self.assertLess(len(stored), len(body.encode("utf-8")) // 5)
+
+    def test_short_values_are_stored_plain(self):
+        stored, loaded = self.store("Hi")
+
+        self.assertEqual(stored, PLAIN_CODEC + b"Hi")
+        self.assertEqual(loaded, "Hi")
+
+    def test_compression_disabled(self):
+        body = "x" * 1000
+        with patch("app.core.compression.settings.EMAIL_BODY_COMPRESSION", False):
+            stored, loaded = self.store(body)
+
+        self.assertEqual(stored[:1], PLAIN_CODEC)
+        self.assertEqual(loaded, body)
+
+    def test_null(self):
+        self.assertEqual(self.store(None), (None, None))
+
+    def test_plain_codec(self):
+        self.assertEqual(decompress(PLAIN_CODEC + b"data"), b"data")
+        self.assertEqual(decompress(compress(b"data")), b"data")
+
+    def test_email_body_is_deferred(self):
+        self.assertTrue(inspect(Email).attrs.body.deferred)
+
+
+if __name__ == "__main__":
+    unittest.main()
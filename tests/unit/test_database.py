@@ -0,0 +1,85 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from sqlalchemy import create_engine, exc, text
+from starlette.responses import Response
+
+from app.core.database import (
+    PRIMARY_STICKY_COOKIE,
+    InstrumentedQueuePool,
+    engine,
+    stick_to_primary,
+    use_primary_for_reads,
+)
+
+
+class TestInstrumentedQueuePool(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05,
+        )
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_engine_uses_settings(self):
+        self.assertIsInstance(engine.pool, InstrumentedQueuePool)
+
+    def test_metrics_track_checkouts(self):
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            metrics = self.engine.pool.metrics()
+            self.assertEqual(metrics["checked_out"], 1)
+
+        metrics = self.engine.pool.metrics()
+        self.assertEqual(metrics["size"], 1)
+        self.assertEqual(metrics["checked_out"], 0)
+        self.assertEqual(metrics["checkouts"], 1)
+        self.assertEqual(metrics["timeouts"], 0)
+        self.assertGreaterEqual(metrics["wait_time_max"], 0.0)
+
+    def test_metrics_track_timeouts(self):
+        with self.engine.connect():
+            with self.assertRaises(exc.TimeoutError):
+                self.engine.connect()
+
+        metrics = self.engine.pool.metrics()
+        self.assertEqual(metrics["timeouts"], 1)
+        self.assertEqual(metrics["checkouts"], 2)
+        self.assertGreaterEqual(metrics["wait_time_max"], 0.05)
+
+
+class TestReplicaRouting(unittest.TestCase):
+    def make_request(self, cookies=None):
+        request = MagicMock()
+        request.cookies = cookies or {}
+        return request
+
+    def test_reads_use_replica_by_default(self):
+        self.assertFalse(use_primary_for_reads(self.make_request()))
+
+    def test_write_sets_sticky_cookie(self):
+        response = Response()
+        stick_to_primary(response)
+
+        self.assertIn(PRIMARY_STICKY_COOKIE, response.headers["set-cookie"])
+        # Other clients keep reading from the replica
+        self.assertFalse(use_primary_for_reads(self.make_request()))
+
+    def test_sticky_cookie(self):
+        future = {PRIMARY_STICKY_COOKIE: str(time.time() + 60)}
+        past = {PRIMARY_STICKY_COOKIE: str(time.time() - 60)}
+        invalid = {PRIMARY_STICKY_COOKIE: "soon"}
+
+        self.assertTrue(use_primary_for_reads(self.make_request(future)))
+        self.assertFalse(use_primary_for_reads(self.make_request(past)))
+        self.assertFalse(use_primary_for_reads(self.make_request(invalid)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import pickle
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from app.core.email_batch import (
+    EmailBatch,
+    EmailBatchView,
+    decode_date,
+    encode_date,
+)
+from app.core.rule_engine import CompiledAction, CompiledCondition, CompiledRule
+from app.core.rule_engine import RuleEngine
+
+
+class TestEmailBatch(unittest.TestCase):
+    def setUp(self):
+        self.emails = [
+            {
+                "from": "alice@example.com",
+                "subject": "Réunion à 10h ☕",
+                "message": "Hello",
+                "received_date": datetime(2024, 5, 1, 12, 30, 15, 250),
+            },
+            {"from": "bob@example.com", "subject": None, "message": ""},
+            {},
+        ]
+
+    def test_dates_round_trip(self):
+        value = datetime(2024, 5, 1, 12, 30, 15, 250)
+        aware = datetime(
+            2024, 5, 1, 14, 30, 15, 250, tzinfo=timezone(timedelta(hours=2))
+        )
+
+        self.assertEqual(decode_date(encode_date(value)), value)
+        self.assertEqual(decode_date(encode_date(aware)), value)
+        self.assertIsNone(decode_date(encode_date(None)))
+
+    def test_view_reads_fields(self):
+        with EmailBatch(self.emails) as batch:
+            layout = pickle.loads(pickle.dumps(batch.layout))
+            with EmailBatchView(layout) as view:
+                self.assertEqual(len(view), 3)
+                self.assertEqual(dict(view[0]), self.emails[0])
+                self.assertEqual(dict(view[1]), self.emails[1])
+                self.assertEqual(dict(view[2]), {})
+                self.assertEqual(view[-1].get("from", ""), "")
+                with self.assertRaises(IndexError):
+                    view[3]
+
+    def test_selected_fields(self):
+        with EmailBatch(self.emails, fields=("subject",)) as batch:
+            with EmailBatchView(batch.layout) as view:
+                self.assertEqual(
+                    view[0:2], [{"subject": "Réunion à 10h ☕"}, {"subject": None}]
+                )
+
+    def test_label_ids_round_trip(self):
+        emails = [{"label_ids": ["INBOX", "Label_1"]}, {"label_ids": []}, {}]
+
+        with EmailBatch(emails, fields=("label_ids",)) as batch:
+            with EmailBatchView(batch.layout) as view:
+                self.assertEqual(view[0:3], emails)
+
+    def test_empty_batch(self):
+        with EmailBatch([]) as batch:
+            with EmailBatchView(batch.layout) as view:
+                self.assertEqual(len(view), 0)
+
+    def test_records_evaluate_like_dicts(self):
+        rules = [
+            CompiledRule(
+                id="rule1",
+                match_type="all",
+                conditions=(
+                    CompiledCondition("subject", "contains", "réunion", None),
+                    CompiledCondition("received_date", "greater_than", "1", "days"),
+                ),
+                actions=(CompiledAction("mark_as_read", None),),
+            )
+        ]
+
+        with EmailBatch(self.emails) as batch:
+            with EmailBatchView(batch.layout) as view:
+                for email, record in zip(self.emails, view):
+                    self.assertEqual(
+                        RuleEngine.process_email(rules, record),
+                        RuleEngine.process_email(rules, email),
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
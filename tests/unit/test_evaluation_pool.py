@@ -0,0 +1,90 @@
+import pickle
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from app.core.evaluation_pool import EvaluationPool
+from app.core.rule_engine import CompiledRule, RuleEngine
+from app.models.rule import Action, Condition, Rule
+
+
+class TestEvaluationPool(unittest.TestCase):
+    def setUp(self):
+        rule = MagicMock(spec=Rule)
+        rule.id = "rule1"
+        rule.match_type = "any"
+
+        condition = MagicMock(spec=Condition)
+        condition.field = "subject"
+        condition.predicate = "contains"
+        condition.value = "invoice"
+        condition.unit = None
+        rule.conditions = [condition]
+
+        action = MagicMock(spec=Action)
+        action.type = "mark_as_read"
+        action.target = None
+        rule.actions = [action]
+
+        self.rules = [rule]
+        now = datetime.utcnow()
+        self.emails = [
+            {
+                "id": f"msg{i}",
+                "from": "billing@example.com",
+                "subject": "Invoice" if i % 3 == 0 else "Hello",
+                "message": "Body",
+                "received_date": now - timedelta(days=i),
+            }
+            for i in range(10)
+        ]
+
+    def test_label_conditions_send_label_ids(self):
+        self.rules[0].conditions[0].field = "label"
+
+        with EvaluationPool(self.rules, processes=1) as pool:
+            self.assertEqual(pool.fields, ("label_ids",))
+
+    def test_compile_rules(self):
+        compiled = RuleEngine.compile_rules(self.rules)
+
+        self.assertIsInstance(compiled[0], CompiledRule)
+        self.assertEqual(compiled[0].id, "rule1")
+        self.assertEqual(pickle.loads(pickle.dumps(compiled)), compiled)
+        self.assertEqual(
+            RuleEngine.process_email(compiled, self.emails[0]),
+            RuleEngine.process_email(self.rules, self.emails[0]),
+        )
+
+    def test_evaluate_inline_below_threshold(self):
+        pool = EvaluationPool(self.rules, processes=2, parallel_threshold=100)
+
+        results = pool.evaluate(self.emails)
+
+        self.assertIsNone(pool._executor)
+        self.assertEqual(
+            results,
+            [RuleEngine.process_email(self.rules, email) for email in self.emails],
+        )
+
+    def test_evaluate_in_processes_preserves_order(self):
+        expected = [
+            RuleEngine.process_email(self.rules, email) for email in self.emails
+        ]
+
+        for shared_memory in (True, False):
+            with EvaluationPool(
+                self.rules,
+                processes=2,
+                chunk_size=3,
+                parallel_threshold=0,
+                shared_memory=shared_memory,
+            ) as pool:
+                results = pool.evaluate(self.emails)
+
+            self.assertEqual(results, expected)
+            self.assertIsNone(pool._executor)
+
+
+if __name__ == "__main__":
+    unittest.main()
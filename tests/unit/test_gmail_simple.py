@@ -1,7 +1,37 @@
+import base64
+import os
+import tempfile
 import unittest
+from datetime import datetime
 from unittest.mock import patch, MagicMock
 
 from app.services.gmail_service import GmailService
+from app.services.message_cache import MessageCache
+
+
+def full_message(message_id, labels):
+    return {
+        "id": message_id,
+        "threadId": f"thread-{message_id}",
+        "labelIds": labels,
+        "payload": {"mimeType": "text/plain", "headers": [], "body": {}},
+    }
+
+
+class FakeBatch:
+    def __init__(self, responses, callback):
+        self.responses = responses
+        self.callback = callback
+        self.ids = []
+
+    def add(self, request):
+        self.ids.append(request.message_id)
+
+    def execute(self):
+        for message_id in self.ids:
+            response = self.responses.get(message_id)
+            error = None if response else Exception("Not found")
+            self.callback(message_id, response, error)
 
 
 class TestGmailService(unittest.TestCase):
@@ -40,6 +70,102 @@ class TestGmailService(unittest.TestCase):
         self.assertEqual(messages[0]["from"], "test@example.com")
         self.assertEqual(messages[0]["subject"], "Test Subject")
 
+    @patch("app.services.gmail_service.build")
+    @patch("app.services.gmail_service.GmailService.get_credentials")
+    def test_list_messages_refreshes_cached_labels_in_one_batch(self, _, mock_build):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = MessageCache(os.path.join(directory.name, "cache.sqlite3"), 1 << 20)
+        cache.put_many([full_message("m1", ["INBOX"]), full_message("m2", ["INBOX"])])
+
+        service = MagicMock()
+        mock_build.return_value = service
+        messages = service.users.return_value.messages.return_value
+        messages.list.return_value.execute.return_value = {
+            "messages": [{"id": "m1"}, {"id": "m2"}, {"id": "m3"}]
+        }
+
+        def get(userId, id, format):
+            request = MagicMock(message_id=id)
+            request.execute.return_value = full_message(id, ["UNREAD"])
+            return request
+
+        messages.get.side_effect = get
+        batches = []
+
+        def new_batch(callback):
+            # m2 can no longer be read as minimal, so it is fetched in full
+            batches.append(
+                FakeBatch({"m1": {"id": "m1", "labelIds": ["Label_1"]}}, callback)
+            )
+            return batches[-1]
+
+        service.new_batch_http_request.side_effect = new_batch
+
+        listed = GmailService.list_messages(max_results=3, cache=cache)
+
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batches[0].ids, ["m1", "m2"])
+        self.assertEqual(
+            [message["label_ids"] for message in listed],
+            [["Label_1"], ["UNREAD"], ["UNREAD"]],
+        )
+        full = [
+            call.kwargs["id"]
+            for call in messages.get.call_args_list
+            if call.kwargs["format"] != "minimal"
+        ]
+        self.assertEqual(full, ["m2", "m3"])
+
+    def test_parse_message_raw_matches_full(self):
+        source = (
+            b"From: test@example.com\r\n"
+            b"Subject: Test Subject\r\n"
+            b"Date: Mon, 01 Jan 2024 10:00:00 +0000\r\n"
+            b"\r\n"
+            b"Test body"
+        )
+        common = {
+            "id": "123",
+            "threadId": "thread123",
+            "labelIds": ["INBOX"],
+            "snippet": "Test body",
+        }
+        full = dict(
+            common,
+            payload={
+                "mimeType": "text/plain",
+                "headers": [
+                    {"name": "From", "value": "test@example.com"},
+                    {"name": "Subject", "value": "Test Subject"},
+                    {"name": "Date", "value": "Mon, 01 Jan 2024 10:00:00 +0000"},
+                ],
+                "body": {"data": "VGVzdCBib2R5"},
+            },
+        )
+        raw = dict(common, raw=base64.urlsafe_b64encode(source).decode("ascii"))
+
+        parsed = GmailService.parse_message(raw)
+
+        self.assertEqual(parsed, GmailService.parse_message(full))
+        self.assertEqual(parsed["message"], "Test body")
+        self.assertEqual(
+            GmailService.parse_message(raw, headers_only=True)["message"], ""
+        )
+
+    def test_parse_message_without_date_uses_internal_date(self):
+        msg = {
+            "id": "123",
+            "threadId": "thread123",
+            "internalDate": "1704103200000",
+            "payload": {"mimeType": "text/plain", "headers": [], "body": {}},
+        }
+
+        parsed = GmailService.parse_message(msg)
+
+        self.assertEqual(parsed["received_date"], datetime(2024, 1, 1, 10))
+        self.assertEqual(GmailService.parse_message(msg), parsed)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.models.job import Job
+from app.services.job_queue import JobQueue
+from app.worker import run_job, work
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.job = Job(
+            type="gmail_sync",
+            payload={"max_results": 5},
+            status="queued",
+            attempts=0,
+            max_attempts=2,
+        )
+
+    def test_claim_skips_locked_rows(self):
+        self.db.execute.return_value.scalars.return_value.first.return_value = self.job
+
+        job = JobQueue.claim(self.db, "worker-1")
+
+        self.assertIs(job, self.job)
+        self.assertEqual(job.status, "running")
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.worker, "worker-1")
+        self.assertIsNotNone(job.started_at)
+        self.db.commit.assert_called_once()
+
+        stmt = self.db.execute.call_args.args[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        self.assertIn("FOR UPDATE SKIP LOCKED", sql)
+
+    def test_claim_empty_queue(self):
+        self.db.execute.return_value.scalars.return_value.first.return_value = None
+
+        self.assertIsNone(JobQueue.claim(self.db, "worker-1"))
+        self.db.rollback.assert_called_once()
+        self.db.commit.assert_not_called()
+
+    def test_fail_retries_with_backoff(self):
+        self.job.attempts = 1
+        before = datetime.utcnow()
+
+        JobQueue.fail(self.db, self.job, "boom")
+
+        self.assertEqual(self.job.status, "queued")
+        self.assertEqual(self.job.error, "boom")
+        self.assertGreaterEqual(
+            (self.job.run_after - before).total_seconds(),
+            settings.JOB_RETRY_BACKOFF - 1,
+        )
+
+    def test_fail_after_last_attempt(self):
+        self.job.attempts = 2
+
+        JobQueue.fail(self.db, self.job, "boom")
+
+        self.assertEqual(self.job.status, "failed")
+        self.assertIsNotNone(self.job.finished_at)
+
+    def test_complete_is_guarded_by_ownership(self):
+        self.job.status, self.job.worker, self.job.attempts = "running", "worker-1", 1
+
+        self.assertIs(JobQueue.complete(self.db, self.job, {"ok": True}), self.job)
+
+        sql = str(
+            self.db.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+        )
+        self.assertIn("jobs.status = %(status_1)s AND jobs.worker = %(worker_1)s", sql)
+        self.assertIn("jobs.attempts = %(attempts_1)s", sql)
+        self.assertEqual(self.job.status, "succeeded")
+
+    def test_late_completion_after_requeue_is_discarded(self):
+        self.job.status, self.job.worker, self.job.attempts = "running", "worker-1", 1
+
+        # The job timed out, was queued again and claimed by worker-2, so the
+        # guarded update of worker-1 matches no row
+        JobQueue.requeue_stale(self.db, timeout=0)
+        self.db.execute.return_value.rowcount = 0
+
+        self.assertIsNone(JobQueue.complete(self.db, self.job, {"ok": True}))
+        self.assertIsNone(JobQueue.fail(self.db, self.job, "boom"))
+        self.assertEqual(self.job.status, "running")
+        self.assertEqual(self.job.attempts, 1)
+
+    def test_get_job_invalid_id(self):
+        self.assertIsNone(JobQueue.get_job(self.db, "not-a-uuid"))
+        self.db.get.assert_not_called()
+
+
+class TestRunJob(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.job = Job(
+            type="gmail_sync",
+            payload={"max_results": 5},
+            status="running",
+            attempts=1,
+            max_attempts=3,
+        )
+
+    @patch("app.services.processing.ProcessingService.sync_mailbox")
+    def test_run_job_success(self, mock_sync):
+        mock_sync.return_value = {"fetched": 5}
+
+        run_job(self.db, self.job)
+
+        mock_sync.assert_called_once_with(self.db, max_results=5)
+        self.assertEqual(self.job.status, "succeeded")
+        self.assertEqual(self.job.result, {"fetched": 5})
+
+    @patch("app.services.processing.ProcessingService.sync_mailbox")
+    def test_run_job_failure_is_retried(self, mock_sync):
+        mock_sync.side_effect = RuntimeError("Gmail unavailable")
+
+        run_job(self.db, self.job)
+
+        self.db.rollback.assert_called_once()
+        self.assertEqual(self.job.status, "queued")
+        self.assertIn("Gmail unavailable", self.job.error)
+
+    @patch("app.worker.run_job")
+    @patch("app.worker.JobQueue")
+    @patch("app.worker.SessionLocal")
+    def test_work_throttles_requeue_stale(self, mock_session, mock_queue, _):
+        mock_queue.claim.side_effect = [self.job, self.job, None]
+
+        with patch.object(settings, "SCHEDULER_INTERVAL", 0), patch.object(
+            settings, "EMAIL_PARTITION_INTERVAL", 0
+        ), patch.object(settings, "EMAIL_BODY_RETENTION_INTERVAL", 0):
+            processed = work("worker-1", once=True)
+
+        self.assertEqual(processed, 2)
+        mock_queue.requeue_stale.assert_called_once()
+
+    @patch("app.services.processing.ProcessingService.sync_mailbox")
+    def test_run_job_reports_lost_job(self, mock_sync):
+        mock_sync.return_value = {"fetched": 5}
+        self.db.execute.return_value.rowcount = 0
+
+        with self.assertLogs("app.worker", level="WARNING") as logs:
+            self.assertIsNone(run_job(self.db, self.job))
+
+        self.assertIn("queued again while it ran", logs.output[0])
+
+    def test_run_job_unknown_type(self):
+        self.job.type = "unknown"
+
+        run_job(self.db, self.job)
+
+        self.assertEqual(self.job.status, "failed")
+
+
+if __name__ == "__main__":
+    unittest.main()
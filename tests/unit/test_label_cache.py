@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import patch
+
+from app.services.label_cache import LabelCache
+from fake_gmail import FakeGmailService
+
+
+class TestLabelCache(unittest.TestCase):
+    def setUp(self):
+        self.service = FakeGmailService(labels={"Archive": "Label_1"})
+        self.cache = LabelCache(ttl=60, auto_create=False)
+
+    def test_system_labels_skip_lookup(self):
+        self.assertEqual(self.cache.resolve(self.service, "inbox", "me"), "INBOX")
+        self.assertEqual(self.service.label_list_calls, 0)
+
+    def test_resolve_is_cached(self):
+        for name in ("Archive", "archive", "ARCHIVE"):
+            self.assertEqual(self.cache.resolve(self.service, name, "me"), "Label_1")
+
+        self.assertEqual(self.service.label_list_calls, 1)
+
+    def test_cache_is_per_mailbox(self):
+        other = FakeGmailService(labels={"Archive": "Label_9"})
+
+        self.assertEqual(self.cache.resolve(self.service, "Archive", "a"), "Label_1")
+        self.assertEqual(self.cache.resolve(other, "Archive", "b"), "Label_9")
+
+    def test_ttl_expiry(self):
+        with patch("app.services.label_cache.time.monotonic", return_value=0):
+            self.cache.resolve(self.service, "Archive", "me")
+        with patch("app.services.label_cache.time.monotonic", return_value=30):
+            self.cache.resolve(self.service, "Archive", "me")
+        self.assertEqual(self.service.label_list_calls, 1)
+
+        with patch("app.services.label_cache.time.monotonic", return_value=61):
+            self.cache.resolve(self.service, "Archive", "me")
+        self.assertEqual(self.service.label_list_calls, 2)
+
+    def test_unknown_label_refreshes_once(self):
+        self.cache.resolve(self.service, "Archive", "me")
+        self.service.label_ids["Receipts"] = "Label_5"
+
+        self.assertEqual(self.cache.resolve(self.service, "Receipts", "me"), "Label_5")
+        self.assertEqual(self.service.label_list_calls, 2)
+
+        with self.assertRaises(KeyError):
+            self.cache.resolve(self.service, "Missing", "me")
+        self.assertEqual(self.service.label_list_calls, 2)
+
+    def test_unknown_label_is_remembered_until_ttl(self):
+        with patch("app.services.label_cache.time.monotonic", return_value=0):
+            for _ in range(3):
+                with self.assertRaises(KeyError):
+                    self.cache.resolve(self.service, "Missing", "me")
+        # The first listing was just loaded, so it is not listed again
+        self.assertEqual(self.service.label_list_calls, 1)
+
+        self.service.label_ids["Missing"] = "Label_7"
+        with patch("app.services.label_cache.time.monotonic", return_value=61):
+            self.assertEqual(
+                self.cache.resolve(self.service, "Missing", "me"), "Label_7"
+            )
+        self.assertEqual(self.service.label_list_calls, 2)
+
+    def test_auto_create(self):
+        cache = LabelCache(ttl=60, auto_create=True)
+
+        label_id = cache.resolve(self.service, "Receipts", "me")
+
+        self.assertEqual(self.service.label_ids["Receipts"], label_id)
+        self.assertEqual(cache.resolve(self.service, "receipts", "me"), label_id)
+        self.assertEqual(self.service.label_list_calls, 1)
+
+    def test_invalidate(self):
+        self.cache.resolve(self.service, "Archive", "me")
+        self.cache.invalidate("me")
+        self.cache.resolve(self.service, "Archive", "me")
+
+        self.assertEqual(self.service.label_list_calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
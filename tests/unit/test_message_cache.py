@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from app.services.message_cache import MessageCache, compress, decompress
+
+
+def message(message_id, body="Hello"):
+    return {
+        "id": message_id,
+        "threadId": f"thread-{message_id}",
+        "payload": {"mimeType": "text/plain", "body": {"data": body}},
+    }
+
+
+class TestMessageCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache", "messages.sqlite3")
+        self.cache = MessageCache(path=self.path, max_bytes=1024 * 1024)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        self.cache.put_many([message("a"), message("b")])
+
+        found = self.cache.get_many(["a", "b", "c"])
+
+        self.assertEqual(found, {"a": message("a"), "b": message("b")})
+        self.assertEqual(self.cache.stats()["messages"], 2)
+
+    def test_labels_not_cached(self):
+        self.cache.put_many([dict(message("a"), labelIds=["INBOX"], historyId="1")])
+
+        self.assertEqual(self.cache.get_many(["a"]), {"a": message("a")})
+
+    def test_keyed_by_format(self):
+        self.cache.put_many([message("a")], fetch_format="full")
+
+        self.assertEqual(self.cache.get_many(["a"], fetch_format="raw"), {})
+        self.assertEqual(
+            self.cache.get_many(["a"], fetch_format="metadata"), {"a": message("a")}
+        )
+
+    def test_shared_between_instances(self):
+        self.cache.put_many([message("a")])
+
+        other = MessageCache(path=self.path, max_bytes=1024 * 1024)
+
+        self.assertEqual(other.get_many(["a"]), {"a": message("a")})
+
+    def test_evicts_least_recently_used(self):
+        body = os.urandom(3000).hex()
+        self.cache.put_many([message("a", body)])
+        size = self.cache.stats()["bytes"]
+        # Room for three and a half messages
+        cache = MessageCache(path=self.path, max_bytes=size * 7 // 2)
+
+        cache.put_many([message("b", body)])
+        cache.get_many(["a"])
+        cache.put_many([message("c", body)])
+        cache.put_many([message("d", body)])
+
+        self.assertEqual(set(cache.get_many(["a", "b", "c", "d"])), {"a", "c", "d"})
+        self.assertEqual(cache.stats()["messages"], 3)
+
+    def test_disabled(self):
+        cache = MessageCache(path="", max_bytes=1024)
+
+        cache.put_many([message("a")])
+
+        self.assertEqual(cache.get_many(["a"]), {})
+        self.assertEqual(cache.stats(), {"messages": 0, "bytes": 0})
+
+    def test_compression_round_trip(self):
+        data = b'{"id": "a"}' * 100
+
+        self.assertLess(len(compress(data)), len(data))
+        self.assertEqual(decompress(compress(data)), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
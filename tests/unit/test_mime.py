@@ -0,0 +1,202 @@
+import base64
+import unittest
+from unittest.mock import patch
+
+from app.services.mime import (
+    decode_body,
+    extract_body,
+    html_to_text,
+    iter_parts,
+    parse_raw,
+    part_charset,
+)
+
+RAW_MESSAGE = (
+    b"From: =?utf-8?q?Ren=C3=A9e?= <renee@example.com>\r\n"
+    b"To: me@example.com\r\n"
+    b"Subject: Quarterly\r\n report\r\n"
+    b"Date: Mon, 01 Jan 2024 10:00:00 +0000\r\n"
+    b"MIME-Version: 1.0\r\n"
+    b'Content-Type: multipart/mixed; boundary="outer"\r\n'
+    b"\r\n"
+    b"--outer\r\n"
+    b'Content-Type: multipart/alternative; boundary="inner"\r\n'
+    b"\r\n"
+    b"--inner\r\n"
+    b"Content-Type: text/html; charset=utf-8\r\n"
+    b"\r\n"
+    b"<p>HTML version</p>\r\n"
+    b"--inner\r\n"
+    b"Content-Type: text/plain; charset=iso-8859-1\r\n"
+    b"Content-Transfer-Encoding: quoted-printable\r\n"
+    b"\r\n"
+    b"Caf=E9 figures attached\r\n"
+    b"--inner--\r\n"
+    b"--outer\r\n"
+    b"Content-Type: text/plain\r\n"
+    b'Content-Disposition: attachment; filename="notes.txt"\r\n'
+    b"\r\n"
+    b"attachment text\r\n"
+    b"--outer--\r\n"
+)
+
+
+def encode_raw(message):
+    return base64.urlsafe_b64encode(message).decode("ascii").rstrip("=")
+
+
+def encode(text, charset="utf-8"):
+    return base64.urlsafe_b64encode(text.encode(charset)).decode("ascii").rstrip("=")
+
+
+def text_part(text, mime_type="text/plain", charset=None, **extra):
+    headers = []
+    if charset:
+        headers.append(
+            {"name": "Content-Type", "value": f'{mime_type}; charset="{charset}"'}
+        )
+    part = {
+        "mimeType": mime_type,
+        "headers": headers,
+        "body": {"data": encode(text, charset or "utf-8")},
+    }
+    part.update(extra)
+    return part
+
+
+class TestMime(unittest.TestCase):
+    def test_nested_multipart(self):
+        payload = {
+            "mimeType": "multipart/mixed",
+            "parts": [
+                {
+                    "mimeType": "multipart/alternative",
+                    "parts": [
+                        text_part("<p>Hello</p>", "text/html"),
+                        text_part("Hello from a nested part"),
+                    ],
+                },
+                text_part("report", "text/csv", filename="report.csv"),
+            ],
+        }
+
+        self.assertEqual(
+            [part["mimeType"] for part in iter_parts(payload)],
+            ["text/html", "text/plain", "text/csv"],
+        )
+        self.assertEqual(extract_body(payload), "Hello from a nested part")
+
+    def test_single_part_message(self):
+        self.assertEqual(extract_body(text_part("Just text")), "Just text")
+
+    def test_html_only_message(self):
+        payload = {
+            "mimeType": "multipart/mixed",
+            "parts": [
+                text_part("notes", "text/csv"),
+                text_part("<p>Only&nbsp;HTML &amp; more</p>", "text/html"),
+            ],
+        }
+
+        self.assertEqual(extract_body(payload), "Only HTML & more")
+
+    def test_falls_back_to_other_text_parts(self):
+        payload = {
+            "mimeType": "multipart/mixed",
+            "parts": [text_part("a,b", "text/csv")],
+        }
+
+        self.assertEqual(extract_body(payload), "a,b")
+
+    def test_html_to_text(self):
+        html = (
+            "<html><head><title>Hidden</title><style>p {color: red}</style></head>"
+            "<body><h1>Sale</h1><p>Up to   50%\n off</p>"
+            "<script>track()</script><ul><li>Shoes</li><li>Bags<br/>Hats</li></ul>"
+            "</body></html>"
+        )
+
+        self.assertEqual(html_to_text(html), "Sale\nUp to 50% off\nShoes\nBags\nHats")
+
+    def test_html_to_text_across_chunks(self):
+        chunks = ["<p>Split <b", ">bold</b> te", "xt</p><scr", "ipt>x()</script>"]
+
+        self.assertEqual(html_to_text(chunks), "Split bold text")
+
+        chunks = ["<style>a > b {", "}</style><!-- a > b", " --><p>Shown</p>"]
+
+        self.assertEqual(html_to_text(chunks), "Shown")
+
+    def test_html_to_text_keeps_block_breaks_across_chunks(self):
+        chunks = ["<p>Hel", "lo</p><scr", "ipt>x</script><p>b</p>"]
+
+        self.assertEqual(html_to_text(chunks), "Hello\nb")
+
+    def test_extract_body_html_over_many_decode_chunks(self):
+        words = [f"word{i}" for i in range(8000)]
+        html = "".join(f"<div>{word}</div>" for word in words)
+
+        body = extract_body(text_part(html, "text/html"))
+
+        self.assertEqual(body.split("\n"), words)
+
+    def test_html_to_text_stops_at_cap(self):
+        chunks = iter(["<p>first paragraph</p>", "<p>second</p>"])
+
+        self.assertEqual(html_to_text(chunks, max_chars=5), "first")
+        self.assertEqual(next(chunks), "<p>second</p>")
+
+    def test_no_body(self):
+        self.assertEqual(extract_body({"mimeType": "multipart/mixed", "parts": []}), "")
+
+    def test_declared_charset(self):
+        part = text_part("Café crème", charset="iso-8859-1")
+
+        self.assertEqual(part_charset(part), "iso8859-1")
+        self.assertEqual(extract_body(part), "Café crème")
+
+    def test_unknown_charset_falls_back_to_utf8(self):
+        part = text_part("Café")
+        part["headers"] = [
+            {"name": "Content-Type", "value": "text/plain; charset=x-unknown"}
+        ]
+
+        self.assertEqual(part_charset(part), "utf-8")
+        self.assertEqual(extract_body(part), "Café")
+
+    def test_truncates_at_cap(self):
+        self.assertEqual(extract_body(text_part("abcdefghij"), max_chars=4), "abcd")
+
+    @patch("app.services.mime.DECODE_CHUNK_SIZE", 8)
+    def test_incremental_decoding_across_chunks(self):
+        text = "héllo wörld — ünïcode " * 20
+
+        self.assertEqual(decode_body(encode(text)), text)
+        self.assertEqual(decode_body(encode(text), max_chars=25), text[:25])
+
+    def test_parse_raw(self):
+        headers, body = parse_raw(encode_raw(RAW_MESSAGE))
+
+        self.assertEqual(headers["from"], "Renée <renee@example.com>")
+        self.assertEqual(headers["subject"], "Quarterly report")
+        self.assertEqual(headers["date"], "Mon, 01 Jan 2024 10:00:00 +0000")
+        self.assertEqual(body.strip(), "Café figures attached")
+
+    def test_parse_raw_headers_only(self):
+        headers, body = parse_raw(encode_raw(RAW_MESSAGE), headers_only=True)
+
+        self.assertEqual(headers["to"], "me@example.com")
+        self.assertEqual(body, "")
+
+    def test_parse_raw_html_only(self):
+        message = (
+            b"Subject: Sale\r\nContent-Type: text/html\r\n\r\n"
+            b"<style>p {}</style><p>50% off</p><p>today</p>"
+        )
+
+        self.assertEqual(parse_raw(encode_raw(message))[1], "50% off\ntoday")
+        self.assertEqual(parse_raw(encode_raw(message), max_chars=3)[1], "50%")
+
+
+if __name__ == "__main__":
+    unittest.main()
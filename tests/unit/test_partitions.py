@@ -0,0 +1,127 @@
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from app.services.partitions import (
+    DEFAULT_MONTHS_STATEMENT,
+    PartitionService,
+    add_months,
+    partition_month,
+    partition_name,
+)
+
+
+def postgres_session(partitions=(), default_months=()):
+    db = MagicMock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+
+    def execute(statement, *args):
+        result = MagicMock()
+        rows = default_months if statement is DEFAULT_MONTHS_STATEMENT else partitions
+        result.scalars.return_value = list(rows)
+        return result
+
+    db.execute.side_effect = execute
+    return db
+
+
+def statements(db):
+    return [
+        str(call.args[0])
+        for call in db.execute.call_args_list[1:]
+        if call.args[0] is not DEFAULT_MONTHS_STATEMENT
+    ]
+
+
+class TestPartitionNames(unittest.TestCase):
+    def test_add_months(self):
+        self.assertEqual(add_months(datetime(2024, 11, 1), 3), datetime(2025, 2, 1))
+        self.assertEqual(add_months(datetime(2024, 1, 1), -1), datetime(2023, 12, 1))
+
+    def test_partition_name(self):
+        name = partition_name(datetime(2024, 3, 15, 12))
+
+        self.assertEqual(name, "emails_y2024m03")
+        self.assertEqual(partition_month(name), datetime(2024, 3, 1))
+        self.assertIsNone(partition_month("emails_default"))
+
+
+class TestPartitionService(unittest.TestCase):
+    @patch("app.services.partitions.datetime")
+    def test_ensure_partitions(self, mock_datetime):
+        mock_datetime.side_effect = datetime
+        mock_datetime.utcnow.return_value = datetime(2024, 12, 20)
+        db = postgres_session(["emails_y2024m12", "emails_default"])
+
+        created = PartitionService.ensure_partitions(db, months_ahead=2)
+
+        self.assertEqual(created, ["emails_y2025m01", "emails_y2025m02"])
+        self.assertEqual(
+            statements(db)[0],
+            "CREATE TABLE IF NOT EXISTS emails_y2025m01 PARTITION OF emails "
+            "FOR VALUES FROM ('2025-01-01T00:00:00') TO ('2025-02-01T00:00:00')",
+        )
+        db.commit.assert_called_once()
+
+    @patch("app.services.partitions.datetime")
+    def test_ensure_partitions_moves_rows_out_of_default(self, mock_datetime):
+        mock_datetime.side_effect = datetime
+        mock_datetime.utcnow.return_value = datetime(2024, 12, 20)
+        db = postgres_session(
+            ["emails_y2024m12", "emails_default"], [datetime(2023, 5, 1)]
+        )
+
+        created = PartitionService.ensure_partitions(db, months_ahead=0)
+
+        self.assertEqual(created, ["emails_y2023m05"])
+        self.assertEqual(
+            statements(db),
+            [
+                "CREATE TABLE emails_y2023m05 (LIKE emails INCLUDING DEFAULTS)",
+                "WITH moved AS (DELETE FROM emails_default "
+                "WHERE received_date >= '2023-05-01T00:00:00' "
+                "AND received_date < '2023-06-01T00:00:00' "
+                "RETURNING *) INSERT INTO emails_y2023m05 SELECT * FROM moved",
+                "ALTER TABLE emails ATTACH PARTITION emails_y2023m05 "
+                "FOR VALUES FROM ('2023-05-01T00:00:00') TO ('2023-06-01T00:00:00')",
+            ],
+        )
+        db.commit.assert_called_once()
+
+    def test_drop_partitions_before(self):
+        db = postgres_session(
+            ["emails_default", "emails_y2023m12", "emails_y2024m01", "emails_y2024m02"]
+        )
+
+        dropped = PartitionService.drop_partitions_before(db, datetime(2024, 2, 1))
+
+        self.assertEqual(dropped, ["emails_y2023m12", "emails_y2024m01"])
+        self.assertEqual(
+            statements(db)[:2],
+            [
+                "ALTER TABLE emails DETACH PARTITION emails_y2023m12",
+                "DROP TABLE emails_y2023m12",
+            ],
+        )
+        self.assertTrue(statements(db)[2].startswith("DELETE FROM email_ids"))
+        self.assertEqual(
+            statements(db)[3],
+            "DELETE FROM email_body_archive "
+            "WHERE email_body_archive.received_date >= :received_date_1 "
+            "AND email_body_archive.received_date < :received_date_2",
+        )
+
+    def test_other_databases(self):
+        db = MagicMock()
+        db.get_bind.return_value.dialect.name = "sqlite"
+
+        self.assertEqual(PartitionService.ensure_partitions(db), [])
+        self.assertEqual(
+            PartitionService.maintain(db, retention_months=12),
+            {"created": [], "dropped": []},
+        )
+        db.execute.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
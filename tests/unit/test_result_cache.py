@@ -0,0 +1,114 @@
+import unittest
+from datetime import datetime, timedelta
+
+from app.core.result_cache import RuleResultCache, prepare_rules
+from app.core.rule_engine import CompiledAction, CompiledCondition, CompiledRule
+
+
+def make_rule(value="invoice", field="subject", predicate="contains", unit=None):
+    return CompiledRule(
+        id="rule1",
+        match_type="all",
+        conditions=(CompiledCondition(field, predicate, value, unit),),
+        actions=(CompiledAction("mark_as_read", None),),
+    )
+
+
+class TestRuleResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = RuleResultCache(max_entries=2)
+        self.rules = [make_rule()]
+        self.email = {
+            "id": "msg1",
+            "from": "billing@example.com",
+            "subject": "Your invoice",
+            "message": "Body",
+            "received_date": datetime(2024, 1, 1),
+        }
+
+    def test_prepare_rules(self):
+        rule_set = prepare_rules(self.rules)
+
+        self.assertEqual(rule_set.fields, ("subject",))
+        self.assertFalse(rule_set.time_based)
+        self.assertEqual(rule_set.version, prepare_rules([make_rule()]).version)
+        self.assertNotEqual(
+            rule_set.version, prepare_rules([make_rule("receipt")]).version
+        )
+
+    def test_hit_after_miss(self):
+        first = self.cache.process_emails(self.rules, [self.email])[0]
+        second = self.cache.process_emails(self.rules, [dict(self.email, id="x")])[0]
+
+        self.assertEqual(first, second)
+        self.assertEqual(second[0]["type"], "mark_as_read")
+        metrics = self.cache.metrics()
+        self.assertEqual((metrics["hits"], metrics["misses"]), (1, 1))
+
+        # Cached actions are copies
+        second[0]["type"] = "changed"
+        third = self.cache.process_emails(self.rules, [self.email])[0]
+        self.assertEqual(third[0]["type"], "mark_as_read")
+
+    def test_unreferenced_fields_share_entries(self):
+        self.cache.process_emails(self.rules, [self.email])
+        self.cache.process_emails(self.rules, [dict(self.email, message="Other")])
+
+        self.assertEqual(self.cache.metrics()["hits"], 1)
+
+    def test_label_rules_key_on_label_ids(self):
+        rules = [make_rule("INBOX", field="label")]
+        inbox = dict(self.email, label_ids=["INBOX"])
+
+        self.assertTrue(self.cache.process_emails(rules, [inbox])[0])
+        self.assertFalse(
+            self.cache.process_emails(rules, [dict(inbox, label_ids=[])])[0]
+        )
+        self.assertEqual(self.cache.metrics()["hits"], 0)
+
+    def test_rule_change_misses(self):
+        self.cache.process_emails(self.rules, [self.email])
+        actions = self.cache.process_emails([make_rule("receipt")], [self.email])[0]
+
+        self.assertEqual(actions, [])
+        self.assertEqual(self.cache.metrics()["misses"], 2)
+
+    def test_lru_eviction(self):
+        for subject in ("a", "b", "c"):
+            self.cache.process_emails(self.rules, [dict(self.email, subject=subject)])
+
+        metrics = self.cache.metrics()
+        self.assertEqual(metrics["size"], 2)
+        self.assertEqual(metrics["evictions"], 1)
+
+    def test_time_based_results_expire_at_next_flip(self):
+        rules = [make_rule("2", "received_date", "less_than", "days")]
+        received = self.email["received_date"]
+
+        fresh = self.cache.process_emails(
+            rules, [self.email], as_of=received + timedelta(days=1)
+        )[0]
+        cached = self.cache.process_emails(
+            rules, [self.email], as_of=received + timedelta(days=1, hours=23)
+        )[0]
+        stale = self.cache.process_emails(
+            rules, [self.email], as_of=received + timedelta(days=2)
+        )[0]
+
+        self.assertEqual(len(fresh), 1)
+        self.assertEqual(cached, fresh)
+        self.assertEqual(stale, [])
+        metrics = self.cache.metrics()
+        self.assertEqual((metrics["hits"], metrics["expired"]), (1, 1))
+
+    def test_disabled_cache(self):
+        cache = RuleResultCache(max_entries=0)
+
+        actions = cache.process_emails(self.rules, [self.email])[0]
+
+        self.assertEqual(len(actions), 1)
+        self.assertEqual(cache.metrics()["size"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
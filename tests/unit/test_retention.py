@@ -0,0 +1,100 @@
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from app.core.compression import decompress
+from app.services.retention import RetentionService, body_hash, decode_body
+
+
+def row(gmail_id, body, received_date=datetime(2023, 1, 1)):
+    return SimpleNamespace(
+        id=f"id-{gmail_id}", gmail_id=gmail_id, received_date=received_date, body=body
+    )
+
+
+class TestRetentionService(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.as_of = datetime(2024, 1, 1)
+
+    def run_batches(self, batches, **kwargs):
+        self.db.execute.return_value.all.side_effect = batches
+        return RetentionService.archive_bodies(
+            self.db, older_than_days=30, as_of=self.as_of, **kwargs
+        )
+
+    def executed(self):
+        # The select runs first in each batch; writes follow it
+        return [call.args for call in self.db.execute.call_args_list]
+
+    def test_archive_bodies(self):
+        summary = self.run_batches(
+            [[row("msg1", "Old body"), row("msg2", None)]], batch_size=10
+        )
+
+        self.assertEqual(
+            summary, {"mode": "archive", "emails": 2, "archived": 1, "bytes": 8}
+        )
+        _, (_, archived), (_, values) = self.executed()
+        self.assertEqual(len(archived), 1)
+        self.assertEqual(decompress(archived[0]["body"]), b"Old body")
+        self.assertEqual(archived[0]["email_id"], "id-msg1")
+        self.assertEqual(
+            values[0],
+            {
+                "id": "id-msg1",
+                "received_date": datetime(2023, 1, 1),
+                "body": None,
+                "body_hash": body_hash(b"Old body"),
+                "body_archived_at": self.as_of,
+            },
+        )
+        self.assertIsNone(values[1]["body_hash"])
+        self.db.commit.assert_called_once()
+
+    def test_drop_bodies(self):
+        summary = self.run_batches([[row("msg1", "Old body")]], mode="drop")
+
+        self.assertEqual(summary["archived"], 0)
+        self.assertEqual(len(self.executed()), 2)
+
+    def test_batches_until_exhausted(self):
+        summary = self.run_batches(
+            [[row("msg1", "a"), row("msg2", "b")], [row("msg3", "c")]],
+            batch_size=2,
+        )
+
+        self.assertEqual(summary["emails"], 3)
+        self.assertEqual(self.db.commit.call_count, 2)
+
+    def test_cutoff_filters_on_partition_key(self):
+        self.run_batches([[]])
+
+        stmt = self.executed()[0][0]
+        cutoff = stmt.whereclause.clauses[0].right.value
+        self.assertEqual(cutoff, self.as_of - timedelta(days=30))
+
+    def test_disabled(self):
+        summary = RetentionService.archive_bodies(self.db, older_than_days=0)
+
+        self.assertEqual(summary["emails"], 0)
+        self.db.execute.assert_not_called()
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            RetentionService.archive_bodies(self.db, mode="shred")
+
+    def test_get_archived_body(self):
+        self.run_batches([[row("msg1", "Old body ✓")]])
+        archived = self.executed()[1][1][0]["body"]
+        self.db.execute.return_value.scalar.return_value = archived
+
+        self.assertEqual(
+            RetentionService.get_archived_body(self.db, "id-msg1"), "Old body ✓"
+        )
+        self.assertEqual(decode_body(archived), "Old body ✓")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,9 @@
 import unittest
-from datetime import datetime, timedelta
-from unittest.mock import MagicMock
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
 
-from app.core.rule_engine import RuleEngine
+from app.core.config import settings
+from app.core.rule_engine import CompiledCondition, CompiledRule, RuleEngine
 from app.models.rule import Rule, Condition, Action
 
 
@@ -87,6 +88,27 @@ class TestRuleEngine(unittest.TestCase):
         result = RuleEngine.evaluate_condition(condition, self.email)
         self.assertFalse(result)
 
+    def test_evaluate_condition_equals_parsed_sender(self):
+        email = {"from": '"Test User" <Test@TenMiles.com>'}
+        condition = {
+            "field": "from",
+            "predicate": "equals",
+            "value": "test@tenmiles.com",
+        }
+        self.assertTrue(RuleEngine.evaluate_condition(condition, email))
+
+        condition["value"] = '"Test User" <test@tenmiles.com>'
+        self.assertTrue(RuleEngine.evaluate_condition(condition, email))
+
+        condition["value"] = "@tenmiles.com"
+        self.assertTrue(RuleEngine.evaluate_condition(condition, email))
+
+        condition["value"] = "@miles.com"
+        self.assertFalse(RuleEngine.evaluate_condition(condition, email))
+
+        condition["predicate"] = "does_not_equal"
+        self.assertTrue(RuleEngine.evaluate_condition(condition, email))
+
     def test_evaluate_condition_does_not_equal(self):
         condition = {
             "field": "from",
@@ -174,6 +196,129 @@ class TestRuleEngine(unittest.TestCase):
         actions = RuleEngine.process_email(rules, self.email)
         self.assertEqual(len(actions), 0)
 
+    def test_reduce_actions_deduplicates(self):
+        actions = [
+            {"type": "mark_as_read", "target": None, "rule_id": "1"},
+            {"type": "move_message", "target": "Archive", "rule_id": "1"},
+            {"type": "mark_as_read", "target": None, "rule_id": "2"},
+            {"type": "move_message", "target": "Archive", "rule_id": "2"},
+        ]
+
+        reduced = RuleEngine.reduce_actions(actions, precedence="first")
+
+        self.assertEqual(
+            reduced,
+            [
+                {"type": "move_message", "target": "Archive", "rule_id": "1"},
+                {"type": "mark_as_read", "target": None, "rule_id": "1"},
+            ],
+        )
+
+    def test_reduce_actions_precedence(self):
+        actions = [
+            {"type": "mark_as_read", "target": None, "rule_id": "1"},
+            {"type": "move_message", "target": "Archive", "rule_id": "1"},
+            {"type": "mark_as_unread", "target": None, "rule_id": "2"},
+            {"type": "move_message", "target": "Receipts", "rule_id": "2"},
+        ]
+
+        first = RuleEngine.reduce_actions(actions, precedence="first")
+        self.assertEqual(
+            [(a["type"], a["target"]) for a in first],
+            [("move_message", "Archive"), ("mark_as_read", None)],
+        )
+
+        last = RuleEngine.reduce_actions(actions, precedence="last")
+        self.assertEqual(
+            [(a["type"], a["target"]) for a in last],
+            [("move_message", "Receipts"), ("mark_as_unread", None)],
+        )
+
+    def test_reduce_actions_invalid_precedence(self):
+        with self.assertRaises(ValueError):
+            RuleEngine.reduce_actions([], precedence="priority")
+
+    def test_as_of_is_truncated_to_bucket(self):
+        with patch.object(settings, "RULE_DATE_BUCKET", 60):
+            as_of = RuleEngine.as_of(datetime(2024, 1, 1, 12, 30, 45, 500))
+        self.assertEqual(as_of, datetime(2024, 1, 1, 12, 30))
+
+    def test_evaluate_condition_as_of(self):
+        condition = {
+            "field": "received_date",
+            "predicate": "less_than",
+            "value": "2",
+            "unit": "days",
+        }
+        email = {"received_date": datetime(2024, 1, 1, tzinfo=timezone.utc)}
+
+        self.assertTrue(
+            RuleEngine.evaluate_condition(condition, email, datetime(2024, 1, 2))
+        )
+        self.assertFalse(
+            RuleEngine.evaluate_condition(condition, email, datetime(2024, 1, 3))
+        )
+
+    def test_next_flip(self):
+        received = datetime(2024, 1, 1)
+        email = dict(self.email, received_date=received)
+
+        self.assertEqual(
+            RuleEngine.next_flip([self.rule], email, as_of=received),
+            received + timedelta(days=2),
+        )
+        self.assertIsNone(
+            RuleEngine.next_flip([self.rule], email, as_of=received + timedelta(days=3))
+        )
+        self.assertIsNone(
+            RuleEngine.next_flip([self.rule], {"subject": "No date"}, as_of=received)
+        )
+
+    def test_evaluate_condition_label(self):
+        email = dict(self.email, label_ids=["INBOX", "Label_12"])
+        condition = {"field": "label", "predicate": "contains", "value": "INBOX"}
+
+        self.assertTrue(RuleEngine.evaluate_condition(condition, email))
+        self.assertFalse(RuleEngine.evaluate_condition(condition, self.email))
+
+        condition.update(value="inbox")
+        self.assertFalse(RuleEngine.evaluate_condition(condition, email))
+
+        condition.update(predicate="does_not_contain", value="Label_1")
+        self.assertTrue(RuleEngine.evaluate_condition(condition, email))
+
+    def test_evaluate_condition_archived_message(self):
+        email = dict(self.email, message=None)
+
+        for predicate in ("contains", "does_not_contain", "equals", "does_not_equal"):
+            condition = {"field": "message", "predicate": predicate, "value": "x"}
+            self.assertFalse(RuleEngine.evaluate_condition(condition, email))
+
+    def test_received_window(self):
+        as_of = datetime(2024, 1, 10)
+        older = CompiledRule(
+            "2",
+            "all",
+            (CompiledCondition("received_date", "greater_than", "30", "days"),),
+            (),
+        )
+
+        self.assertEqual(
+            RuleEngine.received_window([self.rule], as_of),
+            (as_of - timedelta(days=2), None),
+        )
+        self.assertEqual(
+            RuleEngine.received_window([older], as_of),
+            (None, as_of - timedelta(days=30)),
+        )
+        # Either rule can match, so neither side is bounded
+        self.assertEqual(
+            RuleEngine.received_window([self.rule, older], as_of), (None, None)
+        )
+
+        self.rule.match_type = "any"
+        self.assertEqual(RuleEngine.received_window([self.rule], as_of), (None, None))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -4,7 +4,7 @@ from uuid import uuid4
 
 from app.models.rule import Rule, Condition, Action
 from app.schemas.rule import RuleCreate, RuleUpdate, ConditionCreate, ActionCreate
-from app.services.rule import RuleService
+from app.services.rule import RULE_BY_ID_STATEMENT, RULES_STATEMENT, RuleService
 
 
 class TestRuleService(unittest.TestCase):
@@ -55,9 +55,7 @@ class TestRuleService(unittest.TestCase):
 
     def test_get_rules(self):
         # Mock the database query
-        self.db.query.return_value.offset.return_value.limit.return_value.all.return_value = [
-            self.rule
-        ]
+        self.db.execute.return_value.scalars.return_value.all.return_value = [self.rule]
 
         # Call the service method
         rules = RuleService.get_rules(self.db)
@@ -66,16 +64,14 @@ class TestRuleService(unittest.TestCase):
         self.assertEqual(len(rules), 1)
         self.assertEqual(rules[0], self.rule)
 
-        # Verify the database query
-        self.db.query.assert_called_once_with(Rule)
-        self.db.query.return_value.offset.assert_called_once_with(0)
-        self.db.query.return_value.offset.return_value.limit.assert_called_once_with(
-            100
+        # Verify the prebuilt statement is reused with bound parameters
+        self.db.execute.assert_called_once_with(
+            RULES_STATEMENT, {"skip": 0, "limit": 100}
         )
 
     def test_get_rule(self):
         # Mock the database query
-        self.db.query.return_value.filter.return_value.first.return_value = self.rule
+        self.db.execute.return_value.scalars.return_value.first.return_value = self.rule
 
         # Call the service method
         rule = RuleService.get_rule(self.db, self.rule_id)
@@ -83,9 +79,10 @@ class TestRuleService(unittest.TestCase):
         # Verify the result
         self.assertEqual(rule, self.rule)
 
-        # Verify the database query
-        self.db.query.assert_called_once_with(Rule)
-        self.db.query.return_value.filter.assert_called_once()
+        # Verify the prebuilt statement is reused with bound parameters
+        self.db.execute.assert_called_once_with(
+            RULE_BY_ID_STATEMENT, {"rule_id": self.rule_id}
+        )
 
     def test_create_rule(self):
         # Create a rule creation schema
@@ -0,0 +1,101 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.rule_engine import CompiledAction, CompiledCondition, CompiledRule
+from app.models.email import Email
+from app.services.scheduler import SchedulerService
+
+
+def archive_after(days):
+    return CompiledRule(
+        id="00000000-0000-0000-0000-000000000001",
+        match_type="all",
+        conditions=(
+            CompiledCondition("received_date", "greater_than", str(days), "days"),
+        ),
+        actions=(CompiledAction("move_message", "Archive"),),
+    )
+
+
+class TestSchedulerService(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.rules = [archive_after(30)]
+        self.received = datetime(2024, 1, 1)
+        self.email = Email(
+            gmail_id="msg1",
+            from_address="news@example.com",
+            subject="Newsletter",
+            body="Body",
+            received_date=self.received,
+        )
+
+    def test_next_evaluation(self):
+        data = SchedulerService.rule_input(self.email)
+
+        self.assertEqual(
+            SchedulerService.next_evaluation(self.rules, data, self.received),
+            self.received + timedelta(days=30),
+        )
+        self.assertIsNone(
+            SchedulerService.next_evaluation(
+                self.rules, data, self.received + timedelta(days=31)
+            )
+        )
+
+    def test_next_evaluation_is_after_as_of(self):
+        data = SchedulerService.rule_input(self.email)
+        flip = self.received + timedelta(days=30)
+
+        self.assertGreater(
+            SchedulerService.next_evaluation(self.rules, data, flip), flip
+        )
+
+    def test_schedule(self):
+        SchedulerService.schedule(
+            self.db, [self.email], rules=self.rules, as_of=self.received
+        )
+
+        self.assertEqual(
+            self.email.next_evaluation_at, self.received + timedelta(days=30)
+        )
+        self.db.commit.assert_called_once()
+
+    @patch("app.services.scheduler.ActionLogService")
+    @patch("app.services.scheduler.RuleService.get_rules")
+    def test_process_due(self, mock_get_rules, mock_action_log):
+        mock_get_rules.return_value = self.rules
+        mock_action_log.record_actions.return_value = {}
+        self.email.next_evaluation_at = self.received + timedelta(days=30)
+        self.db.execute.return_value.scalars.return_value.all.return_value = [
+            self.email
+        ]
+        as_of = self.received + timedelta(days=31)
+
+        summary = SchedulerService.process_due(self.db, as_of=as_of)
+
+        self.assertEqual(summary["evaluated"], 1)
+        self.assertEqual(summary["matched"], 1)
+        self.assertIsNone(self.email.next_evaluation_at)
+        actions = mock_action_log.record_actions.call_args.args[1]
+        self.assertEqual(actions["msg1"][0]["target"], "Archive")
+
+        stmt = self.db.execute.call_args.args[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        self.assertIn("next_evaluation_at <=", sql)
+        self.assertIn("FOR UPDATE SKIP LOCKED", sql)
+
+    def test_process_due_nothing_due(self):
+        self.db.execute.return_value.scalars.return_value.all.return_value = []
+
+        summary = SchedulerService.process_due(self.db)
+
+        self.assertEqual(summary["evaluated"], 0)
+        self.db.rollback.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from uuid import uuid4
+
+from app.core import serialization
+from app.core.serialization import FastJSONResponse, dumps
+from app.models.email import Email
+
+
+class TestSerialization(unittest.TestCase):
+    def setUp(self):
+        self.email = Email(
+            id=uuid4(),
+            gmail_id="msg1",
+            thread_id="thread1",
+            from_address="sender@example.com",
+            to_address="recipient@example.com",
+            subject="Test Email",
+            body="This is a test email body",
+            snippet="This is a test",
+            received_date=datetime(2023, 11, 15, 14, 30),
+            label_ids=["INBOX"],
+            created_at=datetime(2023, 11, 15, 14, 31),
+            updated_at=datetime(2023, 11, 15, 14, 31),
+        )
+
+    def test_to_dict_body_key(self):
+        self.assertEqual(self.email.to_dict()["message"], self.email.body)
+
+        result = self.email.to_dict(body_key="body")
+        self.assertEqual(result["body"], self.email.body)
+        self.assertNotIn("message", result)
+
+    def test_dumps_email(self):
+        data = json.loads(dumps(self.email.to_dict(body_key="body")))
+        self.assertEqual(data["id"], str(self.email.id))
+        self.assertEqual(data["received_date"], "2023-11-15T14:30:00")
+        self.assertEqual(data["label_ids"], ["INBOX"])
+
+    def test_dumps_without_orjson(self):
+        content = {
+            "id": uuid4(),
+            "received_date": datetime(2023, 11, 15, 14, 30),
+            "labels": {"INBOX"},
+            "subject": "Café",
+        }
+        with patch.object(serialization, "orjson", None):
+            fallback = json.loads(dumps(content))
+        self.assertEqual(fallback, json.loads(dumps(content)))
+        self.assertEqual(fallback["subject"], "Café")
+
+    def test_dumps_unsupported_type(self):
+        with patch.object(serialization, "orjson", None):
+            with self.assertRaises(TypeError):
+                dumps({"value": object()})
+
+    def test_response(self):
+        actions = [{"type": "mark_as_read", "target": None}]
+        response = FastJSONResponse(actions, status_code=201)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.media_type, "application/json")
+        self.assertEqual(json.loads(response.body), actions)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.result_cache import rule_result_cache
+from app.core.rule_engine import CompiledAction, CompiledCondition, CompiledRule
+from app.services.processing import ProcessingService
+from app.services.thread import ThreadService
+
+RULE = CompiledRule(
+    id="00000000-0000-0000-0000-000000000001",
+    match_type="all",
+    conditions=(CompiledCondition("subject", "contains", "invoice", None),),
+    actions=(CompiledAction("move_message", "Billing"),),
+)
+
+
+def message(message_id, thread_id, subject, hours):
+    return {
+        "id": message_id,
+        "thread_id": thread_id,
+        "from": "billing@example.com",
+        "subject": subject,
+        "message": "",
+        "received_date": datetime(2024, 1, 1) + timedelta(hours=hours),
+    }
+
+
+class TestThreadService(unittest.TestCase):
+    def setUp(self):
+        rule_result_cache.clear()
+        self.messages = [
+            message("a1", "a", "Question", 1),
+            message("a2", "a", "Re: Question, invoice attached", 3),
+            message("b1", "b", "Invoice", 2),
+            message("b2", "b", "Re: Invoice", 0),
+            message("c1", "", "Invoice reminder", 5),
+        ]
+
+    def test_group_messages(self):
+        threads = ThreadService.group_messages(self.messages)
+
+        self.assertEqual(list(threads), ["a", "b", "c1"])
+        self.assertEqual([m["id"] for m in threads["a"]], ["a2", "a1"])
+        self.assertEqual([m["id"] for m in threads["b"]], ["b1", "b2"])
+
+    def test_group_messages_mixed_time_zones(self):
+        messages = [
+            message("x1", "x", "First", 0),
+            dict(
+                message("x2", "x", "Second", 0),
+                received_date=datetime(2024, 1, 1, 1, tzinfo=timezone.utc),
+            ),
+        ]
+
+        self.assertEqual(ThreadService.group_messages(messages)["x"][0]["id"], "x2")
+
+    @patch("app.core.result_cache.RuleEngine.process_email")
+    def test_evaluate_once_per_thread(self, mock_process_email):
+        mock_process_email.side_effect = lambda rules, email, as_of: (
+            [{"type": "move_message", "target": "Billing", "rule_id": RULE.id}]
+            if "nvoice" in email["subject"]
+            else []
+        )
+
+        actions = ThreadService.evaluate([RULE], self.messages)
+
+        self.assertEqual(mock_process_email.call_count, 3)
+        evaluated = [call.args[1]["id"] for call in mock_process_email.call_args_list]
+        self.assertEqual(evaluated, ["a2", "b1", "c1"])
+        self.assertEqual(set(actions), {"a1", "a2", "b1", "b2", "c1"})
+        self.assertEqual(actions["a1"], actions["a2"])
+        self.assertEqual(actions["b2"][0]["target"], "Billing")
+
+    def test_get_threads_query(self):
+        db = MagicMock()
+        db.execute.return_value.all.return_value = []
+
+        ThreadService.get_threads(db, limit=20)
+
+        sql = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        self.assertIn(
+            "row_number() OVER (PARTITION BY coalesce(nullif(emails.thread_id", sql
+        )
+        self.assertIn("count(*) OVER (PARTITION BY", sql)
+
+    def test_iter_stored_threads_query(self):
+        db = MagicMock()
+        db.execute.return_value.all.return_value = []
+
+        self.assertEqual(list(ThreadService.iter_stored_threads(db)), [])
+
+        sql = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        self.assertIn(
+            "SELECT DISTINCT ON (coalesce(nullif(emails.thread_id, ''), "
+            "emails.gmail_id))",
+            sql,
+        )
+        self.assertNotIn("row_number()", sql)
+
+    def test_get_thread_matches_gmail_id_fallback(self):
+        db = MagicMock()
+        db.execute.return_value.scalars.return_value = []
+
+        ThreadService.get_thread(db, "a1")
+
+        sql = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        self.assertIn("emails.thread_id = %(thread_id_1)s OR emails.gmail_id =", sql)
+        self.assertIn("coalesce(nullif(emails.thread_id", sql)
+
+    @patch("app.services.processing.ActionLogService")
+    @patch("app.services.processing.RuleService.get_rules")
+    @patch("app.services.thread.ThreadService.iter_stored_threads")
+    def test_apply_rules_to_stored_threads(
+        self, mock_iter_threads, mock_get_rules, mock_action_log
+    ):
+        mock_get_rules.return_value = [RULE]
+        mock_iter_threads.return_value = [
+            [
+                (message("a2", "a", "Re: invoice", 3), ["a1", "a2"]),
+                (message("b1", "b", "Hello", 2), ["b1"]),
+                (message("c2", "c", "Invoice", 4), ["c1", "c2"]),
+            ]
+        ]
+        mock_action_log.get_processed_gmail_ids.return_value = {"c1", "c2"}
+        mock_action_log.record_actions.return_value = {}
+
+        summary = ProcessingService.apply_rules_to_stored_threads(
+            MagicMock(), execute=False
+        )
+
+        recorded = mock_action_log.record_actions.call_args.args[1]
+        self.assertEqual(set(recorded), {"a1", "a2"})
+        self.assertEqual(summary["threads"], 2)
+        self.assertEqual(summary["evaluated"], 3)
+        self.assertEqual(summary["matched"], 2)
+        self.assertEqual(summary["skipped"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()